@@ -0,0 +1,187 @@
+import math
+import os
+import threading
+import time
+from collections import Counter
+from app.metrics import ANALYZE_REQUESTS
+
+# Single-flight and admission control for /analyze-cv. Requests for the same
+# (user, job, CV version, job version) share one analysis; new analyses are
+# admitted only while the user and the whole process are under their limits.
+# A batch request (/analyze-job, /analyze-user) holds one slot of its owner's
+# for as long as it streams.
+
+# Analyses one user may have queued or running at once
+ANALYZE_USER_LIMIT = int(os.getenv("ANALYZE_USER_LIMIT", "3"))
+# Analyses queued or running in this process, across all users
+ANALYZE_GLOBAL_LIMIT = int(os.getenv("ANALYZE_GLOBAL_LIMIT", "50"))
+# Retry-After estimate (seconds) until an analysis has been timed
+ANALYZE_RETRY_AFTER = float(os.getenv("ANALYZE_RETRY_AFTER", "10"))
+# A flight nobody finished (e.g. its queue job was lost) stops counting after this
+ANALYZE_FLIGHT_TTL = float(os.getenv("ANALYZE_FLIGHT_TTL", "900"))
+
+
+class Overloaded(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Flight:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.started = time.monotonic()
+        self.ready = threading.Event()
+        self.analysis_id: str | None = None
+        self.error: BaseException | None = None
+        # Only flights that launched an analysis count against the limits
+        self.admitted = False
+
+
+class AnalysisFlights:
+    def __init__(self, user_limit: int = ANALYZE_USER_LIMIT, global_limit: int = ANALYZE_GLOBAL_LIMIT,
+                 ttl: float = ANALYZE_FLIGHT_TTL):
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self._keys: dict[str, tuple] = {}
+        self._mean_seconds = ANALYZE_RETRY_AFTER
+        self._outcomes = Counter()
+
+    def run(self, key: tuple, find, create, launch) -> tuple[str, bool]:
+        """(analysis_id, shared) for key = (user_id, job_id, cv_version, job_version).
+
+        Joins the in-flight analysis for key if there is one. Otherwise find()
+        looks for a stored one (a row dict with id and status, or None), and if
+        there is none and the limits allow, create() inserts a new analysis and
+        launch(analysis_id) queues it; Overloaded if the limits don't allow.
+        """
+        with self._lock:
+            self._prune()
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(key[0])
+
+        if not leader:
+            flight.ready.wait()
+            if flight.error is not None:
+                raise flight.error
+            self._count("joined")
+            return flight.analysis_id, True
+
+        try:
+            existing = find()
+            if existing is not None:
+                flight.analysis_id = existing["id"]
+                self._count("existing")
+                if existing.get("status") in ("done", "failed"):
+                    self._drop(key)
+                else:
+                    self._track(key, flight)
+                return flight.analysis_id, True
+
+            self._admit(flight)
+            flight.analysis_id = create()
+            # Tracked before it is queued, so a quick finish() can't miss it
+            self._track(key, flight)
+            launch(flight.analysis_id)
+            self._count("started")
+            return flight.analysis_id, False
+        except BaseException as e:
+            flight.error = e
+            self._drop(key)
+            raise
+        finally:
+            flight.ready.set()
+
+    def admit_batch(self, user_id: str) -> tuple:
+        """Admit a batch request as one of user_id's flights; Overloaded past the limits.
+
+        Returns the key to hand to finish_batch() once the batch has streamed.
+        """
+        flight = _Flight(user_id)
+        key = ("batch", user_id, id(flight))
+        with self._lock:
+            self._prune()
+            self._flights[key] = flight
+        try:
+            self._admit(flight)
+        except Overloaded:
+            self._drop(key)
+            raise
+        flight.ready.set()
+        self._count("batch")
+        return key
+
+    def finish_batch(self, key: tuple) -> None:
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def finish(self, analysis_id: str) -> None:
+        """The analysis reached done or failed: later requests look it up instead of joining."""
+        with self._lock:
+            key = self._keys.pop(analysis_id, None)
+            flight = self._flights.pop(key, None) if key else None
+            if flight is not None and flight.admitted:
+                # Queue wait included: that is what a rejected client would wait for
+                elapsed = time.monotonic() - flight.started
+                self._mean_seconds = 0.8 * self._mean_seconds + 0.2 * elapsed
+
+    def stats(self) -> dict:
+        with self._lock:
+            admitted = [flight for flight in self._flights.values() if flight.admitted]
+            return {
+                "in_flight": len(admitted),
+                "users": len({flight.user_id for flight in admitted}),
+                "user_limit": self.user_limit,
+                "global_limit": self.global_limit,
+                "mean_seconds": round(self._mean_seconds, 3),
+                **self._outcomes,
+            }
+
+    def _admit(self, flight: _Flight) -> None:
+        with self._lock:
+            admitted = [other for other in self._flights.values() if other.admitted]
+            mine = [other for other in admitted if other.user_id == flight.user_id]
+            if len(mine) >= self.user_limit:
+                self._outcomes["rejected_user"] += 1
+                ANALYZE_REQUESTS.inc(outcome="rejected_user")
+                raise Overloaded("Previše analiza u toku za ovog korisnika", self._retry_after(mine))
+            if len(admitted) >= self.global_limit:
+                self._outcomes["rejected_global"] += 1
+                ANALYZE_REQUESTS.inc(outcome="rejected_global")
+                raise Overloaded("Server je preopterećen, pokušajte kasnije", self._retry_after(admitted))
+            flight.admitted = True
+
+    def _retry_after(self, flights: list[_Flight]) -> int:
+        # Roughly when the oldest of them should be done and free a slot
+        oldest = min(flight.started for flight in flights)
+        return max(1, math.ceil(self._mean_seconds - (time.monotonic() - oldest)))
+
+    def _track(self, key: tuple, flight: _Flight) -> None:
+        with self._lock:
+            self._keys[flight.analysis_id] = key
+
+    def _drop(self, key: tuple) -> None:
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            if flight is not None and flight.analysis_id:
+                self._keys.pop(flight.analysis_id, None)
+
+    def _count(self, outcome: str) -> None:
+        ANALYZE_REQUESTS.inc(outcome=outcome)
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key, flight in list(self._flights.items()):
+            if flight.ready.is_set() and now - flight.started > self.ttl:
+                del self._flights[key]
+                self._keys.pop(flight.analysis_id, None)
+
+
+analysis_flights = AnalysisFlights()
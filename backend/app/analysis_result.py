@@ -0,0 +1,397 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pydantic import BaseModel, ValidationError, field_validator
+from app.llm_providers import get_llm
+
+ANALYSIS_REPAIR_ATTEMPTS = int(os.getenv("ANALYSIS_REPAIR_ATTEMPTS", "2"))
+
+# Section columns in display order, with the headings the rendered text uses
+SECTION_TITLES = {
+    "competencies": "1. Kompetencije",
+    "experience": "2. Iskustvo",
+    "education": "3. Edukacija",
+    "compatibility": "4. Kompatibilnost",
+    "strengths": "5. Prednosti kandidata",
+    "weaknesses": "6. Nedostaci kandidata",
+    "recommendations": "7. Preporuke",
+}
+LIST_SECTIONS = ("strengths", "weaknesses")
+
+ANALYSIS_FIELDS = ["score", *SECTION_TITLES]
+
+# Gemini (google-generativeai 0.8) has no propertyOrdering and writes object
+# properties sorted by name, so the keys the model sees carry their position:
+# a_score streams first and the sections follow in display order. load_fields
+# maps them back to the field names used everywhere else.
+WIRE_KEYS = {field: f"{chr(ord('a') + i)}_{field}" for i, field in enumerate(ANALYSIS_FIELDS)}
+FIELD_NAMES = {key: field for field, key in WIRE_KEYS.items()}
+
+# Gemini response_schema: the score and every section as its own field
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        WIRE_KEYS["score"]: {"type": "number"},
+        **{
+            WIRE_KEYS[key]: {"type": "array", "items": {"type": "string"}} if key in LIST_SECTIONS else {"type": "string"}
+            for key in SECTION_TITLES
+        },
+    },
+    "required": list(WIRE_KEYS.values()),
+}
+
+ANALYSIS_RULES = (
+    "📌 Upute za analizu:\n"
+    f"🔹 Vrati JSON objekt sa poljima redom: {', '.join(f'`{key}`' for key in WIRE_KEYS.values())}.\n"
+    f"🔹 `{WIRE_KEYS['score']}` je ocjena prikladnosti kandidata od 0 do 10 sa jednom decimalom (npr. 7.5).\n"
+    "🔹 Odgovor mora biti **100% zasnovan isključivo** na podacima iz CV-a i opisa posla. Nemoj izmišljati informacije koje nisu navedene.\n"
+    "🔹 Ostala polja su **DETALJNA i STRUKTURIRANA** analiza po sekcijama:\n"
+    f"- `{WIRE_KEYS['competencies']}`: kompetencije\n"
+    f"- `{WIRE_KEYS['experience']}`: iskustvo\n"
+    f"- `{WIRE_KEYS['education']}`: edukacija\n"
+    f"- `{WIRE_KEYS['compatibility']}`: kompatibilnost sa opisom posla\n"
+    f"- `{WIRE_KEYS['strengths']}`: lista prednosti kandidata (najmanje 3)\n"
+    f"- `{WIRE_KEYS['weaknesses']}`: lista nedostataka kandidata (najmanje 3)\n"
+    f"- `{WIRE_KEYS['recommendations']}`: preporuke\n"
+    "🔹 Piši isključivo na **bosanskom jeziku**.\n"
+)
+
+
+# Stamped on every scored row, so scores from different prompts or models are not
+# compared. The rules and schema are hashed in; bump the revision for changes
+# to the prompt text around them (build_prompt, the batch prompts).
+ANALYSIS_PROMPT_REVISION = "1"
+ANALYSIS_PROMPT_VERSION = ANALYSIS_PROMPT_REVISION + "-" + hashlib.sha1(
+    (ANALYSIS_RULES + json.dumps(ANALYSIS_SCHEMA, sort_keys=True)).encode("utf-8")
+).hexdigest()[:8]
+
+
+def model_version(answers: list[str] | None = None) -> str:
+    """The providers in answers (from record_answers), or the primary one that scores by default."""
+    if answers:
+        return ",".join(dict.fromkeys(answers))
+    primary = get_llm().primary
+    return f"{primary.name}:{primary.model}"
+
+
+def scoring_stamp(mode: str = "", answers: list[str] | None = None) -> dict:
+    """prompt_version, model_version and scored_at columns for a row being scored now.
+
+    answers are the providers that answered while scoring it, recorded with
+    record_answers(), so a fallback model's score is not stamped as the primary's.
+    """
+    return {
+        "prompt_version": f"{ANALYSIS_PROMPT_VERSION}+{mode}" if mode else ANALYSIS_PROMPT_VERSION,
+        "model_version": model_version(answers),
+        "scored_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class AnalysisSchemaError(ValueError):
+    """The model's answer still misses required fields after the repair calls."""
+
+
+class AnalysisResult(BaseModel):
+    score: float
+    competencies: str
+    experience: str
+    education: str
+    compatibility: str
+    strengths: list[str]
+    weaknesses: list[str]
+    recommendations: str
+
+    @field_validator("score")
+    @classmethod
+    def score_in_range(cls, value: float) -> float:
+        if not 0 <= value <= 10:
+            raise ValueError("ocjena mora biti između 0 i 10")
+        return round(value, 1)
+
+    @field_validator("competencies", "experience", "education", "compatibility", "recommendations")
+    @classmethod
+    def non_empty_section(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("sekcija je prazna")
+        return value
+
+    @field_validator(*LIST_SECTIONS)
+    @classmethod
+    def non_empty_points(cls, values: list[str]) -> list[str]:
+        points = [value.strip() for value in values if value.strip()]
+        if not points:
+            raise ValueError("lista je prazna")
+        return points
+
+    def columns(self) -> dict:
+        """Row fields for application_analysis: score, sections and the rendered text."""
+        return {**self.model_dump(), "analysis": render_analysis(self)}
+
+
+def render_analysis(result: AnalysisResult) -> str:
+    """The text shown to users (and kept in `analysis`), same layout as the streamed preview."""
+    parts = [f"{result.score}\n"]
+    for key, title in SECTION_TITLES.items():
+        value = getattr(result, key)
+        body = "".join(f"- {point}\n" for point in value) if key in LIST_SECTIONS else f"{value}\n"
+        parts.append(f"\n{title}:\n{body}")
+    return "".join(parts)
+
+
+def check_fields(fields: dict) -> tuple[AnalysisResult | None, list[str]]:
+    """The validated result, or None and the names of the fields that failed."""
+    try:
+        return AnalysisResult.model_validate(fields), []
+    except ValidationError as e:
+        failed = {str(error["loc"][0]) for error in e.errors() if error["loc"]}
+        return None, [field for field in ANALYSIS_FIELDS if field in failed]
+
+
+def to_wire(fields: dict) -> dict:
+    return {WIRE_KEYS.get(key, key): value for key, value in fields.items()}
+
+
+def from_wire(data: dict) -> dict:
+    """An answer object with its WIRE_KEYS renamed to field names; other keys (e.g. a batch id) stay."""
+    return {FIELD_NAMES.get(key, key): value for key, value in data.items()}
+
+
+def load_fields(raw: str) -> dict:
+    """Top-level fields of one analysis object; a cut-off answer keeps its finished fields."""
+    raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        reader = StreamingAnalysis()
+        reader.feed(raw)
+        return reader.fields
+    return from_wire(data) if isinstance(data, dict) else {}
+
+
+def parse_analysis(raw: str) -> AnalysisResult:
+    return AnalysisResult.model_validate(load_fields(raw))
+
+
+def is_complete(raw: str) -> bool:
+    return check_fields(load_fields(raw))[0] is not None
+
+
+def repair_schema(failed: list[str], item_id: str | None = None) -> dict:
+    properties = {WIRE_KEYS[field]: ANALYSIS_SCHEMA["properties"][WIRE_KEYS[field]] for field in failed}
+    required = list(properties)
+    if item_id is not None:
+        properties = {"id": {"type": "string"}, **properties}
+        required.insert(0, "id")
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def repair_prompt(prompt: str, valid: dict, failed: list[str], item_id: str | None = None) -> str:
+    target = f" za par sa id `{item_id}`" if item_id is not None else ""
+    return (
+        f"{prompt}\n\n"
+        f"🔁 Dio analize{target} je već urađen:\n{json.dumps(to_wire(valid), ensure_ascii=False)}\n\n"
+        f"🔹 Vrati JSON objekt samo sa poljima koja nedostaju ili nisu ispravna: "
+        f"{', '.join(f'`{WIRE_KEYS[f]}`' for f in failed)}.\n"
+        f"🔹 `{WIRE_KEYS['score']}` mora biti broj od 0 do 10, a sekcije i liste ne smiju biti prazne.\n"
+    )
+
+
+def _repair_step(prompt: str, fields: dict, item_id: str | None):
+    result, failed = check_fields(fields)
+    if result:
+        return result, None
+    valid = {key: value for key, value in fields.items() if key in ANALYSIS_FIELDS and key not in failed}
+    print(f"🔁 Analiza: ponavljam samo polja {', '.join(failed)}")
+    return valid, (repair_prompt(prompt, valid, failed, item_id), repair_schema(failed, item_id))
+
+
+def complete_analysis(prompt: str, fields: dict, tags=(), item_id: str | None = None,
+                      attempts: int = ANALYSIS_REPAIR_ATTEMPTS, llm=None) -> AnalysisResult:
+    """Validate fields; ask the model again only for the ones that fail.
+
+    prompt is the original analysis prompt, so the repair call has the same
+    context; llm is the router that answered it (default: get_llm()). Raises
+    AnalysisSchemaError when fields are still missing.
+    """
+    llm = llm or get_llm()
+    for _ in range(attempts):
+        valid, repair = _repair_step(prompt, fields, item_id)
+        if repair is None:
+            return valid
+        fields = {**valid, **llm.generate(
+            repair[0], schema=repair[1], tags=tags, variant="analysis-repair", parse=load_fields
+        )}
+    return _finish(fields)
+
+
+async def acomplete_analysis(prompt: str, fields: dict, tags=(), item_id: str | None = None,
+                             attempts: int = ANALYSIS_REPAIR_ATTEMPTS, llm=None) -> AnalysisResult:
+    llm = llm or get_llm()
+    for _ in range(attempts):
+        valid, repair = _repair_step(prompt, fields, item_id)
+        if repair is None:
+            return valid
+        fields = {**valid, **await llm.agenerate(
+            repair[0], schema=repair[1], tags=tags, variant="analysis-repair", parse=load_fields
+        )}
+    return _finish(fields)
+
+
+def _finish(fields: dict) -> AnalysisResult:
+    result, failed = check_fields(fields)
+    if not result:
+        raise AnalysisSchemaError(f"Neispravna polja analize: {', '.join(failed)}")
+    return result
+
+
+WHITESPACE = " \t\r\n"
+
+
+class StreamingAnalysis:
+    """Reads the analysis JSON as it streams in.
+
+    feed() returns the newly readable text, laid out like render_analysis(),
+    so progress events show sections instead of raw JSON. fields holds every
+    top-level value read to the end (by field name, see WIRE_KEYS), and score
+    is set as soon as it arrives.
+    """
+
+    def __init__(self):
+        self.fields: dict = {}
+        self.score: float | None = None
+        self._state = "start"
+        self._key = None
+        self._raw: list[str] = []
+        self._escape: str | None = None
+        self._high = ""
+        self._items: list | None = None
+        self._skip_depth = 0
+        self._skip_string = False
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for char in chunk:
+            self._step(char, out)
+        return "".join(out)
+
+    def _shown(self) -> bool:
+        return self._key in SECTION_TITLES
+
+    def _step(self, char: str, out: list) -> None:
+        state = self._state
+        if state == "start":
+            if char == "{":
+                self._state = "object"
+        elif state == "object":
+            if char == '"':
+                self._raw, self._state = [], "key"
+            elif char == "}":
+                self._state = "end"
+        elif state in ("key", "string"):
+            self._string_char(char, out)
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+        elif state == "value":
+            if char in WHITESPACE:
+                return
+            if self._shown():
+                out.append(f"\n{SECTION_TITLES[self._key]}:\n")
+            if char == '"':
+                self._raw, self._state = [], "string"
+            elif char == "[":
+                self._items, self._state = [], "array"
+            elif char == "{":
+                self._skip_depth, self._skip_string, self._state = 1, False, "skip"
+            else:
+                self._raw, self._state = [char], "scalar"
+        elif state == "array":
+            if char == '"':
+                if self._shown():
+                    out.append("- ")
+                self._raw, self._state = [], "string"
+            elif char == "]":
+                self._set(self._items, out)
+                self._items = None
+            elif char not in WHITESPACE and char != ",":
+                self._raw, self._state = [char], "scalar"
+        elif state == "scalar":
+            if char in WHITESPACE or char in ",}]":
+                try:
+                    value = json.loads("".join(self._raw))
+                except json.JSONDecodeError:
+                    value = None
+                if self._items is not None:
+                    self._items.append(value)
+                    self._state = "array"
+                else:
+                    self._set(value, out)
+                self._step(char, out)
+            else:
+                self._raw.append(char)
+        elif state == "skip":
+            self._skip_char(char)
+
+    def _string_char(self, char: str, out: list) -> None:
+        if self._escape is not None:
+            self._escape += char
+            if len(self._escape) < (6 if self._escape.startswith("\\u") else 2):
+                return
+            self._raw.append(self._escape)
+            text = json.loads(f'"{self._escape}"')
+            self._escape = None
+            if "\ud800" <= text <= "\udbff":
+                self._high = text
+                return
+            if self._high:
+                text = (self._high + text).encode("utf-16", "surrogatepass").decode("utf-16")
+                self._high = ""
+            self._emit(text, out)
+        elif char == "\\":
+            self._escape = char
+        elif char == '"':
+            value = json.loads('"' + "".join(self._raw) + '"')
+            if self._state == "key":
+                self._key, self._state = FIELD_NAMES.get(value, value), "colon"
+            elif self._items is not None:
+                self._items.append(value)
+                self._emit("\n", out)
+                self._state = "array"
+            else:
+                self._set(value, out)
+        else:
+            self._raw.append(char)
+            self._emit(char, out)
+
+    def _emit(self, text: str, out: list) -> None:
+        if self._state == "string" and self._shown():
+            out.append(text)
+
+    def _set(self, value, out: list) -> None:
+        self.fields[self._key] = value
+        if self._key == "score" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.score = round(float(value), 1)
+            out.append(f"{self.score}\n")
+        elif self._shown() and isinstance(value, str):
+            out.append("\n")
+        self._state = "object"
+
+    def _skip_char(self, char: str) -> None:
+        if self._skip_string:
+            if self._escape is not None:
+                self._escape = None
+            elif char == "\\":
+                self._escape = char
+            elif char == '"':
+                self._skip_string = False
+        elif char == '"':
+            self._skip_string = True
+        elif char in "{[":
+            self._skip_depth += 1
+        elif char in "}]":
+            self._skip_depth -= 1
+            if not self._skip_depth:
+                self._state = "object"
@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from fastapi import APIRouter, HTTPException, Request, Response
+from app.repository import repo
+
+router = APIRouter()
+
+APPLICATIONS_CACHE_TTL = float(os.getenv("APPLICATIONS_CACHE_TTL", "15"))
+APPLICATIONS_PAGE_SIZE = int(os.getenv("APPLICATIONS_PAGE_SIZE", "20"))
+APPLICATIONS_MAX_PAGE_SIZE = 100
+
+# Dashboard rows carry the score and a short summary; the full analysis text
+# only when asked for with fields=full
+COLUMNS = {
+    "summary": "id, job_id, user_id, score, status, summary, created_at, "
+               "jobs!inner(id, title, user_id), users(id, name, surname, email)",
+    "full": "id, job_id, user_id, score, status, summary, analysis, error, created_at, "
+            "competencies, experience, education, compatibility, strengths, weaknesses, recommendations, "
+            "jobs!inner(id, title, job_type, user_id), users(id, name, surname, email, telephone, cv_url)",
+}
+
+
+class PageCache:
+    """Short-lived rendered pages, dropped whenever an analysis is written."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._pages: dict[tuple, tuple[float, str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> tuple[str, bytes] | None:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry and entry[0] > time.time():
+                return entry[1], entry[2]
+            self._pages.pop(key, None)
+            return None
+
+    def put(self, key: tuple, etag: str, body: bytes) -> None:
+        with self._lock:
+            now = time.time()
+            self._pages = {k: v for k, v in self._pages.items() if v[0] > now}
+            self._pages[key] = (now + self.ttl, etag, body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+
+page_cache = PageCache(APPLICATIONS_CACHE_TTL)
+repo.on_analysis_change(page_cache.clear)
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row.get("score"), row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        score, analysis_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (None if score is None else float(score)), str(analysis_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Neispravan cursor")
+
+
+def attach_cv_urls(rows: list[dict]) -> None:
+    """Add users.cv_signed_url to every row, signing the page's CVs in one request."""
+    users = [row["users"] for row in rows if row.get("users")]
+    urls = repo.signed_cv_urls([user.get("cv_url") for user in users])
+    for user in users:
+        user["cv_signed_url"] = urls.get(user.get("cv_url"))
+
+
+@router.get("/applications/by_hr/{hr_id}")
+def get_applications_by_hr(
+    hr_id: str,
+    request: Request,
+    limit: int = APPLICATIONS_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: str = "summary",
+    min_score: float | None = None,
+):
+    if fields not in COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Nepoznat fields: {fields}")
+    limit = max(1, min(limit, APPLICATIONS_MAX_PAGE_SIZE))
+
+    key = (hr_id, limit, cursor, fields, min_score)
+    cached = page_cache.get(key)
+    if cached:
+        etag, body = cached
+    else:
+        after = decode_cursor(cursor) if cursor else None
+        # One extra row tells whether there is a next page
+        rows = repo.applications_page(hr_id, COLUMNS[fields], limit + 1, after, min_score)
+        page = rows[:limit]
+        if fields == "full":
+            attach_cv_urls(page)
+        body = json.dumps({
+            "items": page,
+            "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+        }, ensure_ascii=False, default=str).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        page_cache.put(key, etag, body)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,323 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from uuid import uuid4
+import asyncio
+import json
+import os
+import re
+from app.gemini import fetch_cv_text
+from app.repository import repo, supabase, analysis_versions_of
+from app.admission import analysis_flights, Overloaded
+from app.llm_providers import get_llm, record_answers
+from app.job_queue import RUNNING, DONE, FAILED
+from app.compaction import compact, CV_TOKEN_BUDGET, JOB_TOKEN_BUDGET
+from app.analysis_result import ANALYSIS_SCHEMA, ANALYSIS_RULES, acomplete_analysis, from_wire, scoring_stamp
+from app.metrics import log_event
+
+router = APIRouter()
+
+# How many (CV, job) pairs go into one LLM request, and how many requests run at once
+BATCH_PAIRS_PER_PROMPT = int(os.getenv("BATCH_PAIRS_PER_PROMPT", "3"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+# Pairs one batch request may score; each request also takes one admission slot
+BATCH_MAX_PAIRS = int(os.getenv("BATCH_MAX_PAIRS", "100"))
+
+BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"id": {"type": "string"}, **ANALYSIS_SCHEMA["properties"]},
+        "required": ["id", *ANALYSIS_SCHEMA["required"]],
+    },
+}
+
+BATCH_RULES = (
+    "🔹 Vrati JSON listu sa jednim objektom za svaki par; svaki objekat ima polje `id` para i polja analize.\n"
+    "🔹 Svaki par analiziraj zasebno i vrati rezultat za svaki `id`.\n\n"
+    f"{ANALYSIS_RULES}"
+)
+
+
+class BatchJobsRequest(BaseModel):
+    job_ids: list[str]
+
+
+def build_job_batch_prompt(job_description: str, candidates: list[dict]) -> str:
+    job = compact(job_description, JOB_TOKEN_BUDGET)
+    cvs = [compact(c["cv_text"], CV_TOKEN_BUDGET) for c in candidates]
+    report_saved(job, *cvs)
+    cv_blocks = "\n\n".join(f"📄 CV kandidata (id: {c['analysis_id']}):\n{cv.text}" for c, cv in zip(candidates, cvs))
+    return f"📄 Opis posla:\n{job.text}\n\n{cv_blocks}\n\n{BATCH_RULES}"
+
+
+def build_cv_batch_prompt(cv_text: str, jobs: list[dict]) -> str:
+    cv = compact(cv_text, CV_TOKEN_BUDGET)
+    descriptions = [compact(j["job_description"], JOB_TOKEN_BUDGET) for j in jobs]
+    report_saved(cv, *descriptions)
+    job_blocks = "\n\n".join(f"📄 Opis posla (id: {j['analysis_id']}):\n{d.text}" for j, d in zip(jobs, descriptions))
+    return f"📄 CV kandidata:\n{cv.text}\n\n{job_blocks}\n\n{BATCH_RULES}"
+
+
+def report_saved(*parts) -> None:
+    before = sum(p.tokens_before for p in parts)
+    after = sum(p.tokens_after for p in parts)
+    print(f"✂️ Batch prompt: {before} -> {after} tokena (ušteđeno {before - after})")
+
+
+def parse_batch_results(raw: str) -> dict[str, dict]:
+    """Fields per pair id; each pair is validated (and repaired) on its own later."""
+    raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    items = json.loads(raw)
+    if not isinstance(items, list):
+        raise ValueError("Odgovor nije JSON lista")
+    return {str(item["id"]): from_wire(item) for item in items if isinstance(item, dict) and item.get("id") is not None}
+
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def score_chunk(prompt: str, chunk: list[dict], semaphore: asyncio.Semaphore) -> list[dict]:
+    tags = {f"user:{pair['user_id']}" for pair in chunk} | {f"job:{pair['job_id']}" for pair in chunk}
+    # Providers that answered, per pair: the batch call's plus the pair's own repairs
+    answered: dict[str, list[str]] = {}
+    try:
+        with record_answers() as batch_answers:
+            async with semaphore:
+                results = await get_llm().agenerate(
+                    prompt, schema=BATCH_SCHEMA, tags=tags, variant="batch", parse=parse_batch_results
+                )
+    except Exception as e:
+        error = f"Greška pri AI analizi: {str(e)}"
+        results = [error] * len(chunk)
+    else:
+        # A pair with missing or invalid fields gets a repair call for just those fields
+        async def complete(pair):
+            try:
+                with record_answers() as repair_answers:
+                    async with semaphore:
+                        result = await acomplete_analysis(
+                            prompt, results.get(pair["analysis_id"], {}), tags=tags, item_id=pair["analysis_id"]
+                        )
+            except Exception as e:
+                return f"Model nije vratio ispravan rezultat za ovaj par: {str(e)}"
+            answered[pair["analysis_id"]] = batch_answers + repair_answers
+            return result
+
+        results = await asyncio.gather(*(complete(pair) for pair in chunk))
+
+    items = []
+    for pair, result in zip(chunk, results):
+        if isinstance(result, str):
+            update = {"status": FAILED, "error": result}
+        else:
+            stamp = scoring_stamp("batch", answered.get(pair["analysis_id"]))
+            update = {**result.columns(), **stamp, **pair["versions"], "status": DONE, "error": None}
+        items.append({
+            "analysis_id": pair["analysis_id"],
+            "user_id": pair["user_id"],
+            "job_id": pair["job_id"],
+            **update,
+        })
+
+    # Scored rows go out in one upsert; failed rows are grouped by error message
+    await asyncio.to_thread(repo.save_analyses, [
+        {"id": item["analysis_id"], **{k: v for k, v in item.items() if k != "analysis_id"}}
+        for item in items if item["status"] == DONE
+    ])
+    failures = {}
+    for item in items:
+        if item["status"] == FAILED:
+            failures.setdefault(item["error"], []).append(item["analysis_id"])
+    for error, analysis_ids in failures.items():
+        await asyncio.to_thread(repo.update_analyses, analysis_ids, {"status": FAILED, "error": error})
+    for item in items:
+        log_event("analysis", mode="batch", analysis_id=item["analysis_id"], user_id=item["user_id"],
+                  job_id=item["job_id"], status=item["status"], score=item.get("score"), error=item.get("error"))
+    return items
+
+
+async def load_cv_texts(pairs: list[dict]) -> list[dict]:
+    """Attach cv_text to every pair, downloading and parsing each CV once."""
+    paths = {pair["cv_path"] for pair in pairs}
+
+    async def load(cv_path):
+        try:
+            return cv_path, await asyncio.to_thread(fetch_cv_text, cv_path)
+        except Exception as e:
+            print("⚠️ Batch CV load failed:", cv_path, str(e))
+            return cv_path, ""
+
+    texts = dict(await asyncio.gather(*(load(path) for path in paths)))
+    for pair in pairs:
+        pair["cv_text"] = texts[pair["cv_path"]]
+    return pairs
+
+
+async def stream_results(prompts: list[tuple[str, list[dict]]], skipped: list[dict], admission: tuple):
+    try:
+        for item in skipped:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        tasks = [asyncio.create_task(score_chunk(prompt, chunk, semaphore)) for prompt, chunk in prompts]
+        for finished in asyncio.as_completed(tasks):
+            for item in await finished:
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+    finally:
+        analysis_flights.finish_batch(admission)
+
+
+def admit(owner_id: str, pairs: int) -> tuple:
+    """Cap the batch and take one of the owner's admission slots, as /analyze-cv does per analysis."""
+    if pairs > BATCH_MAX_PAIRS:
+        raise HTTPException(status_code=400, detail=f"Najviše {BATCH_MAX_PAIRS} parova po zahtjevu")
+    try:
+        return analysis_flights.admit_batch(owner_id)
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def mark_skipped(pairs: list[dict], error: str) -> list[dict]:
+    await asyncio.to_thread(repo.update_analyses, [pair["analysis_id"] for pair in pairs], {"status": FAILED, "error": error})
+    return [
+        {"analysis_id": pair["analysis_id"], "user_id": pair["user_id"], "job_id": pair["job_id"],
+         "status": FAILED, "error": error}
+        for pair in pairs
+    ]
+
+
+async def set_running(pairs: list[dict]):
+    # Stamped now, so /analyze-cv for the same versions joins the running row instead of starting another
+    await asyncio.to_thread(repo.save_analyses, [
+        {"id": pair["analysis_id"], "user_id": pair["user_id"], "job_id": pair["job_id"],
+         **pair["versions"], "status": RUNNING, "error": None}
+        for pair in pairs
+    ])
+
+
+@router.post("/analyze-job/{job_id}")
+async def analyze_job_applicants(job_id: str):
+    job = await asyncio.to_thread(
+        lambda: supabase.table("jobs").select("id, description, user_id").eq("id", job_id).single().execute()
+    )
+    if not job.data or not job.data.get("description"):
+        raise HTTPException(status_code=404, detail="Posao nije pronađen")
+
+    rows = await asyncio.to_thread(
+        lambda: supabase.table("application_analysis")
+        .select("id, user_id, users(cv_url)")
+        .eq("job_id", job_id)
+        .execute()
+    )
+
+    # One analysis per applicant, even if they applied more than once
+    pairs = {}
+    for row in rows.data or []:
+        pairs[row["user_id"]] = {
+            "analysis_id": row["id"],
+            "user_id": row["user_id"],
+            "job_id": job_id,
+            "cv_path": (row.get("users") or {}).get("cv_url"),
+        }
+    pairs = list(pairs.values())
+    if not pairs:
+        raise HTTPException(status_code=404, detail="Nema prijava za ovaj posao")
+    for pair in pairs:
+        pair["versions"] = analysis_versions_of(pair["cv_path"], job.data["description"])
+
+    # The job's HR user owns the batch; admitted before any CV is downloaded
+    admission = admit(job.data.get("user_id") or job_id, len(pairs))
+    try:
+        prompts, skipped = await prepare_job_batch(job.data["description"], pairs)
+    except BaseException:
+        analysis_flights.finish_batch(admission)
+        raise
+    return StreamingResponse(stream_results(prompts, skipped, admission), media_type="application/x-ndjson")
+
+
+async def prepare_job_batch(description: str, pairs: list[dict]):
+    skipped = await mark_skipped([p for p in pairs if not p["cv_path"]], "CV nije pronađen u bazi")
+    pairs = await load_cv_texts([p for p in pairs if p["cv_path"]])
+    skipped += await mark_skipped([p for p in pairs if not p["cv_text"].strip()], "CV je prazan")
+    pairs = [p for p in pairs if p["cv_text"].strip()]
+
+    await set_running(pairs)
+    prompts = [
+        (build_job_batch_prompt(description, chunk), chunk)
+        for chunk in chunked(pairs, BATCH_PAIRS_PER_PROMPT)
+    ]
+    return prompts, skipped
+
+
+@router.post("/analyze-user/{user_id}")
+async def analyze_user_jobs(user_id: str, request: BatchJobsRequest):
+    job_ids = list(dict.fromkeys(request.job_ids))
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="Lista poslova je prazna")
+
+    user = await asyncio.to_thread(
+        lambda: supabase.table("users").select("id, cv_url").eq("id", user_id).single().execute()
+    )
+    if not user.data or not user.data.get("cv_url"):
+        raise HTTPException(status_code=404, detail="CV nije pronađen u bazi")
+
+    admission = admit(user_id, len(job_ids))
+    try:
+        prompts, skipped = await prepare_user_batch(user_id, user.data["cv_url"], job_ids)
+    except BaseException:
+        analysis_flights.finish_batch(admission)
+        raise
+    return StreamingResponse(stream_results(prompts, skipped, admission), media_type="application/x-ndjson")
+
+
+async def prepare_user_batch(user_id: str, cv_path: str, job_ids: list[str]):
+    try:
+        cv_text = await asyncio.to_thread(fetch_cv_text, cv_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Greška pri čitanju CV-a: {str(e)}")
+    if not cv_text.strip():
+        raise HTTPException(status_code=400, detail="CV je prazan")
+
+    jobs, existing = await asyncio.gather(
+        asyncio.to_thread(
+            lambda: supabase.table("jobs").select("id, description").in_("id", job_ids).execute()
+        ),
+        asyncio.to_thread(
+            lambda: supabase.table("application_analysis").select("id, job_id")
+            .eq("user_id", user_id).in_("job_id", job_ids).execute()
+        ),
+    )
+    descriptions = {job["id"]: job.get("description") for job in jobs.data or []}
+    analysis_ids = {row["job_id"]: row["id"] for row in existing.data or []}
+    versions = {job_id: analysis_versions_of(cv_path, description) for job_id, description in descriptions.items()}
+
+    new_rows = [
+        {"id": str(uuid4()), "user_id": user_id, "job_id": job_id, "analysis": None, "score": None,
+         "status": RUNNING, **versions[job_id]}
+        for job_id in job_ids
+        if job_id not in analysis_ids and descriptions.get(job_id)
+    ]
+    if new_rows:
+        await asyncio.to_thread(repo.insert_analyses, new_rows)
+        analysis_ids.update({row["job_id"]: row["id"] for row in new_rows})
+
+    skipped = [
+        {"analysis_id": None, "user_id": user_id, "job_id": job_id, "status": FAILED, "error": "Posao nije pronađen"}
+        for job_id in job_ids if not descriptions.get(job_id)
+    ]
+    pairs = [
+        {"analysis_id": analysis_ids[job_id], "user_id": user_id, "job_id": job_id,
+         "job_description": descriptions[job_id], "versions": versions[job_id]}
+        for job_id in job_ids if descriptions.get(job_id)
+    ]
+
+    await set_running(pairs)
+    prompts = [
+        (build_cv_batch_prompt(cv_text, chunk), chunk)
+        for chunk in chunked(pairs, BATCH_PAIRS_PER_PROMPT)
+    ]
+    return prompts, skipped
@@ -1,5 +1,4 @@
-import requests
-import os
+from app.llm_providers import get_llm, LLMError
 
 """"
 TESTIRANJE
@@ -24,28 +23,17 @@ def analyze_With_ollama(text:str, prompt: str):
 
         """
 
-def analyze_With_ollama(text: str, prompt: str):
-    TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")  
-    full_prompt = f"{prompt}\n\n{text}"
-
-    headers = {
-        "Authorization": f"Bearer {TOGETHER_API_KEY}",
-        "Content-Type": "application/json"
-    }
+# Provider chain for the test route in request_service; its repairs use the same one
+TEST_PROVIDERS = "together"
 
-    payload = {
-        "model": "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-        "messages": [
-            {"role": "system", "content": "Ti si AI asistent koji ocjenjuje CV na osnovu opisa posla."},
-            {"role": "user", "content": full_prompt}
-        ]
-    }
 
-    response = requests.post("https://api.together.xyz/v1/chat/completions", json=payload, headers=headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
-    else:
-        return f"Error: {response.status_code} - {response.text}"
+def analyze_With_ollama(text: str, prompt: str):
+    full_prompt = f"{prompt}\n\n{text}"
 
+    try:
+        return get_llm(TEST_PROVIDERS).generate(
+            full_prompt,
+            system="Ti si AI asistent koji ocjenjuje CV na osnovu opisa posla.",
+        )
+    except LLMError as e:
+        return f"Error: {e}"
@@ -0,0 +1,168 @@
+import os
+import re
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+# Input tokens are most of the cost and time-to-first-token of an analysis,
+# so CV and job texts are cleaned up and cut to a budget before prompting.
+CV_TOKEN_BUDGET = int(os.getenv("CV_TOKEN_BUDGET", "1500"))
+JOB_TOKEN_BUDGET = int(os.getenv("JOB_TOKEN_BUDGET", "800"))
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+PHONE = re.compile(r"(?<!\w)(?:\+|00)\d[\d\s/().-]{7,}\d(?!\w)|(?<!\w)0\d{1,2}[\s/.-]?\d{3}[\s/.-]?\d{3,4}(?!\w)")
+PAGE_NUMBER = re.compile(r"^(?:page|stranica|str\.?)\s*\d+(?:\s*(?:/|of|od)\s*\d+)?$|^\d+\s*/\s*\d+$", re.IGNORECASE)
+# Matched against whole lines: a CV title, a references note or a consent clause.
+# A line that only mentions GDPR or consent (e.g. a GDPR project) is content.
+BOILERPLATE = re.compile(
+    r"curriculum vitae|životopis|cv|"
+    r"(?:references?|reference) (?:are |su )?(?:available|dostupne)(?: (?:up)?on request| na zahtjev)?|"
+    r"(?:(?:i )?(?:hereby )?(?:give (?:my )?)?consent|(?:ja )?(?:dajem )?(?:saglasnost|suglasnost)|"
+    r"(?:saglasan|suglasan|saglasna|suglasna) sam)\b.{0,300}?\b(?:obra[dđ]\w*|processing)\b.*",
+    re.IGNORECASE,
+)
+# Page separator in parsed documents (see document_parser)
+PAGE_BREAK = "\f"
+# Lines checked at the top and bottom of every page for running headers and footers
+PAGE_EDGE_LINES = 3
+CONTACT_LABEL = re.compile(
+    r"^(?:e-?mail|mail|tel(?:efon)?|phone|mob(?:itel|ile)?|adresa|address|linkedin|github|web(?:site)?)\s*:?\s*$",
+    re.IGNORECASE,
+)
+
+
+class Compacted(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE count: one token per short word or word piece of up to 4 letters, and per symbol."""
+    return len(re.findall(r"\w{1,4}|[^\w\s]", text))
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace; page breaks are kept as lines of their own."""
+    text = text.replace("\u00a0", " ").replace("\r", "\n")
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [re.sub(r"[ \t\v]+", " ", line).strip() for line in page.split("\n")]
+        pages.append(re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip())
+    return f"\n{PAGE_BREAK}\n".join(pages).strip()
+
+
+def page_edges(lines: list[str]) -> tuple[set[str], set[str]]:
+    """The first and the last PAGE_EDGE_LINES non-empty lines of a page."""
+    filled = [line for line in lines if line]
+    return set(filled[:PAGE_EDGE_LINES]), set(filled[-PAGE_EDGE_LINES:])
+
+
+def running_lines(pages: list[list[str]]) -> set[str]:
+    """Short lines at the top (or the bottom) of two or more pages: headers and footers."""
+    headers, footers = Counter(), Counter()
+    for lines in pages:
+        top, bottom = page_edges(lines)
+        headers.update(top)
+        footers.update(bottom)
+    repeated = {line for edge in (headers, footers) for line, count in edge.items() if count > 1}
+    return {line for line in repeated if len(line) < 80 and not line.endswith(":")}
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop contact details, page numbers, running headers/footers and consent clauses."""
+    pages = [page.split("\n") for page in text.split(f"\n{PAGE_BREAK}\n")]
+    running = running_lines(pages) if len(pages) > 1 else set()
+    seen = set()
+    kept = []
+    for lines in pages:
+        top, bottom = page_edges(lines) if running else (set(), set())
+        edges = top | bottom
+        for line in lines:
+            if line in running and line in edges:
+                # Keep the first copy, e.g. the candidate's name in the header
+                if line in seen:
+                    continue
+                seen.add(line)
+            cleaned = PHONE.sub("", URL.sub("", EMAIL.sub("", line)))
+            if cleaned != line:
+                cleaned = cleaned.strip(" |,;•-–")
+            if line and (not cleaned or PAGE_NUMBER.match(cleaned) or CONTACT_LABEL.match(cleaned)
+                         or BOILERPLATE.fullmatch(cleaned.strip(" .!:"))):
+                continue
+            kept.append(cleaned)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def truncate(text: str, budget: int) -> str:
+    """Fit the text into budget tokens, shortening the longest sections first.
+
+    Sections (blocks between blank lines) under their fair share are kept
+    whole; the rest are cut at a line boundary so every section keeps its start.
+    """
+    sections = [s for s in text.split("\n\n") if s.strip()]
+    sizes = [estimate_tokens(s) for s in sections]
+    if sum(sizes) <= budget:
+        return text
+
+    shares = {}
+    remaining, open_sections = budget, set(range(len(sections)))
+    while open_sections:
+        share = remaining // len(open_sections)
+        small = {i for i in open_sections if sizes[i] <= share}
+        if not small:
+            shares.update({i: share for i in open_sections})
+            break
+        for i in small:
+            shares[i] = sizes[i]
+            remaining -= sizes[i]
+        open_sections -= small
+
+    out = []
+    for i, section in enumerate(sections):
+        if sizes[i] <= shares[i]:
+            out.append(section)
+            continue
+        kept, used = [], 0
+        for line in section.split("\n"):
+            cost = estimate_tokens(line)
+            if used + cost > shares[i]:
+                words = []
+                for word in line.split(" "):
+                    used += estimate_tokens(word)
+                    if used > shares[i]:
+                        break
+                    words.append(word)
+                if words:
+                    kept.append(" ".join(words))
+                break
+            kept.append(line)
+            used += cost
+        if kept:
+            out.append("\n".join(kept) + " …")
+    return "\n\n".join(out)
+
+
+_lock = threading.Lock()
+stats = {"texts": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def compact(text: str, budget: int) -> Compacted:
+    before = estimate_tokens(text or "")
+    result = truncate(strip_boilerplate(normalize(text or "")), budget)
+    compacted = Compacted(result, before, estimate_tokens(result))
+    with _lock:
+        stats["texts"] += 1
+        stats["tokens_before"] += compacted.tokens_before
+        stats["tokens_after"] += compacted.tokens_after
+    return compacted
+
+
+def compaction_stats() -> dict:
+    with _lock:
+        return {**stats, "tokens_saved": stats["tokens_before"] - stats["tokens_after"]}
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Extracted CV text is keyed by a SHA-256 of the file bytes. Storage paths
+# ("<user_id>/cv_<timestamp>_<name>") are already versioned by the upload
+# timestamp, so a path maps to exactly one content hash.
+CV_CACHE_MAX_BYTES = int(os.getenv("CV_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CV_CACHE_DIR = os.getenv("CV_CACHE_DIR")  # optional on-disk tier
+
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class CVTextCache:
+    def __init__(self, max_bytes: int, disk_dir: str | None = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._texts: OrderedDict[str, str] = OrderedDict()
+        self._paths: dict[str, str] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._path_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            (self.disk_dir / "paths").mkdir(parents=True, exist_ok=True)
+
+    def get(self, cv_path: str) -> str | None:
+        key = self._paths.get(cv_path) or self._read_disk_path(cv_path)
+        text = self._get_content(key) if key else None
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return text
+
+    def put(self, cv_path: str, data: bytes, text: str) -> None:
+        self.put_key(cv_path, content_key(data), text)
+
+    def put_key(self, cv_path: str, key: str, text: str) -> None:
+        """put() for callers that hashed the content while streaming it."""
+        self._put_content(key, text)
+        self._bind(cv_path, key)
+
+    def load(self, cv_path: str, download, parse) -> str:
+        """Return the text for cv_path, downloading and parsing at most once."""
+        text = self.get(cv_path)
+        if text is not None:
+            return text
+
+        with self._lock_for(cv_path):
+            key = self._paths.get(cv_path)
+            text = self._get_content(key) if key else None
+            if text is not None:
+                return text
+
+            data = download()
+            key = content_key(data)
+            text = self._get_content(key)
+            if text is None:
+                text = parse(data)
+                self._put_content(key, text)
+            self._bind(cv_path, key)
+            return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._texts),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _lock_for(self, cv_path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(cv_path, threading.Lock())
+
+    def _bind(self, cv_path: str, key: str) -> None:
+        with self._lock:
+            self._paths[cv_path] = key
+            self._path_locks.pop(cv_path, None)
+        if self.disk_dir:
+            self._path_file(cv_path).write_text(key, encoding="utf-8")
+
+    def _get_content(self, key: str) -> str | None:
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+                return text
+
+        if not self.disk_dir:
+            return None
+        text_file = self.disk_dir / f"{key}.txt"
+        if not text_file.exists():
+            return None
+        text = text_file.read_text(encoding="utf-8")
+        self._remember(key, text)
+        return text
+
+    def _put_content(self, key: str, text: str) -> None:
+        self._remember(key, text)
+        if self.disk_dir:
+            (self.disk_dir / f"{key}.txt").write_text(text, encoding="utf-8")
+
+    def _remember(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._texts:
+                self._texts.move_to_end(key)
+                return
+            self._texts[key] = text
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._texts.popitem(last=False)
+                self._size -= len(evicted.encode("utf-8"))
+
+    def _path_file(self, cv_path: str) -> Path:
+        return self.disk_dir / "paths" / hashlib.sha1(cv_path.encode("utf-8")).hexdigest()
+
+    def _read_disk_path(self, cv_path: str) -> str | None:
+        if not self.disk_dir:
+            return None
+        path_file = self._path_file(cv_path)
+        if not path_file.exists():
+            return None
+        key = path_file.read_text(encoding="utf-8").strip()
+        with self._lock:
+            self._paths[cv_path] = key
+        return key
+
+
+cv_text_cache = CVTextCache(CV_CACHE_MAX_BYTES, CV_CACHE_DIR)
@@ -0,0 +1,73 @@
+import re
+from pydantic import BaseModel, field_validator
+from app.compaction import compact, CV_TOKEN_BUDGET
+
+CV_CATEGORIES = ["it", "administracija", "ugostiteljstvo", "proizvodnja", "obrazovanje", "zdravstvo"]
+SENIORITY_LEVELS = ["student", "junior", "medior", "senior", "lead"]
+
+# Gemini response_schema: category, keywords, seniority and skills in one call
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": CV_CATEGORIES},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "seniority": {"type": "string", "enum": SENIORITY_LEVELS},
+        "skills": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["category", "keywords", "seniority", "skills"],
+}
+
+
+class CVProfile(BaseModel):
+    category: str = "nepoznato"
+    keywords: list[str]
+    seniority: str | None = None
+    skills: list[str] = []
+
+    @field_validator("category")
+    @classmethod
+    def known_category(cls, value: str) -> str:
+        value = value.strip().lower()
+        return value if value in CV_CATEGORIES else "nepoznato"
+
+    @field_validator("seniority")
+    @classmethod
+    def known_seniority(cls, value: str | None) -> str | None:
+        value = (value or "").strip().lower()
+        return value if value in SENIORITY_LEVELS else None
+
+    @field_validator("keywords", "skills")
+    @classmethod
+    def clean_terms(cls, values: list[str]) -> list[str]:
+        seen = set()
+        cleaned = []
+        for value in values:
+            term = value.strip()
+            if term and term.lower() not in seen:
+                seen.add(term.lower())
+                cleaned.append(term)
+        return cleaned
+
+
+def profile_prompt(cv_text: str) -> str:
+    cv_text = compact(cv_text, CV_TOKEN_BUDGET).text
+    return f"""
+    Analiziraj sljedeći CV kandidata i vrati JSON objekt sa poljima:
+    - "category": jedna kategorija zanimanja koja najbolje opisuje CV ({', '.join(CV_CATEGORIES)})
+    - "keywords": najrelevantnije ključne riječi (pojedinačne riječi ili kratke fraze od 1-3 riječi)
+      koje predstavljaju vještine, tehnologije, alate, pozicije ili industrijske izraze
+    - "seniority": nivo iskustva kandidata ({', '.join(SENIORITY_LEVELS)})
+    - "skills": konkretne vještine i tehnologije koje kandidat posjeduje
+
+    Ključne riječi i vještine piši na jeziku na kojem su i u originalnom tekstu (npr. "React", "računovodstvo").
+    Ne koristi rečenice niti objašnjenja.
+
+    Tekst CV-a:
+    \"\"\"{cv_text}\"\"\"
+    """
+
+
+def parse_profile(raw: str) -> CVProfile:
+    # Strip a ```json fence in case the model adds one despite the mime type
+    raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    return CVProfile.model_validate_json(raw)
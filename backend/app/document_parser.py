@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from app.metrics import span, PARSE_SECONDS, PARSE_PAGE_SECONDS
+from app.compaction import PAGE_BREAK
+
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "2"))
+PARSER_MAX_BYTES = int(os.getenv("PARSER_MAX_BYTES", str(10 * 1024 * 1024)))
+PARSER_MAX_PAGES = int(os.getenv("PARSER_MAX_PAGES", "30"))
+PARSER_TIMEOUT = float(os.getenv("PARSER_TIMEOUT", "60"))
+
+# OCR for scanned PDF pages and image CVs. Lower DPI is faster, 300 reads small fonts better.
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "10"))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "180"))
+OCR_CACHE_PAGES = int(os.getenv("OCR_CACHE_PAGES", "256"))
+# Pages with less extracted text than this are treated as scans
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+TESSERACT_CMD = os.getenv("TESSERACT_CMD")
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PNG = "image/png"
+JPEG = "image/jpeg"
+IMAGES = (PNG, JPEG)
+
+MIME_TYPES = {
+    "pdf": PDF,
+    "docx": DOCX,
+    "png": PNG,
+    "jpg": JPEG,
+    "jpeg": JPEG,
+}
+
+
+class UnsupportedDocument(ValueError):
+    pass
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+class OCRUnavailable(UnsupportedDocument):
+    pass
+
+
+# Leading bytes of each supported format; DOCX is a zip container
+SIGNATURES = {
+    PDF: (b"%PDF-",),
+    DOCX: (b"PK\x03\x04",),
+    PNG: (b"\x89PNG\r\n\x1a\n",),
+    JPEG: (b"\xff\xd8\xff",),
+}
+
+
+def sniff_mime(head: bytes) -> str | None:
+    for mime, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            return mime
+    return None
+
+
+def mime_for(filename: str) -> str:
+    ext = filename.split("?")[0].split(".")[-1].lower()
+    mime = MIME_TYPES.get(ext)
+    if not mime:
+        raise UnsupportedDocument("Nepodržan format fajla: ." + ext)
+    return mime
+
+
+def _check_size(source: bytes | str) -> None:
+    size = os.path.getsize(source) if isinstance(source, str) else len(source)
+    if size > PARSER_MAX_BYTES:
+        raise DocumentTooLarge(f"Fajl je veći od {PARSER_MAX_BYTES} bajtova")
+
+
+def _read(source: bytes | str) -> bytes:
+    # A path lets the worker read the file itself instead of receiving it pickled
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    return source
+
+
+def iter_pages(data: bytes, mime: str, max_pages: int = PARSER_MAX_PAGES):
+    """Yield the text layer of each page. DOCX has no pages and images no text layer, so they yield once."""
+    _check_size(data)
+
+    if mime == PDF:
+        import pdfplumber
+
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            for page in pdf.pages[:max_pages]:
+                yield page.extract_text() or ""
+
+    elif mime == DOCX:
+        from docx import Document
+
+        doc = Document(io.BytesIO(data))
+        yield "\n".join(paragraph.text for paragraph in doc.paragraphs)
+
+    elif mime in IMAGES:
+        yield ""
+
+    else:
+        raise UnsupportedDocument("Nepodržan format fajla: " + mime)
+
+
+def _extract_pages(source: bytes | str, mime: str, max_pages: int) -> tuple[list[str], list[float]]:
+    """Page texts and the seconds each page took, measured in the worker."""
+    pages, seconds = [], []
+    started = time.perf_counter()
+    for text in iter_pages(_read(source), mime, max_pages):
+        pages.append(text)
+        seconds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+    return pages, seconds
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+def _tesseract(image) -> str:
+    import pytesseract
+
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    try:
+        return pytesseract.image_to_string(image.convert("L"), lang=OCR_LANG)
+    except pytesseract.TesseractNotFoundError:
+        raise OCRUnavailable("OCR nije dostupan: tesseract nije instaliran")
+
+
+def _ocr_pdf_page(data: bytes, page_number: int, dpi: int) -> str:
+    from pdf2image import convert_from_bytes
+    from pdf2image.exceptions import PDFInfoNotInstalledError
+
+    try:
+        images = convert_from_bytes(data, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    except PDFInfoNotInstalledError:
+        raise OCRUnavailable("OCR nije dostupan: poppler nije instaliran")
+    return "\n".join(_tesseract(image) for image in images)
+
+
+def _ocr_image(data: bytes) -> str:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        return _tesseract(image)
+
+
+_ocr_cache: OrderedDict[str, str] = OrderedDict()
+_ocr_cache_lock = threading.Lock()
+
+
+def _ocr_tasks(pages: list[str], source: bytes | str, mime: str) -> list[tuple[int, str, tuple]]:
+    """(page index, cache key, worker call) for each page that still needs OCR; cached pages are filled in."""
+    if mime not in IMAGES and mime != PDF:
+        return []
+    if all(len(text.strip()) >= OCR_MIN_CHARS for text in pages):
+        return []
+    data = _read(source)
+    digest = hashlib.sha256(data).hexdigest()
+    tasks = []
+    for index, text in enumerate(pages):
+        if len(text.strip()) >= OCR_MIN_CHARS:
+            continue
+        if len(tasks) >= OCR_MAX_PAGES:
+            break
+        if mime == PDF:
+            key = f"{digest}:{index}:{OCR_DPI}:{OCR_LANG}"
+            call = (_ocr_pdf_page, data, index + 1, OCR_DPI)
+        else:
+            key = f"{digest}:{OCR_LANG}"
+            call = (_ocr_image, data)
+        with _ocr_cache_lock:
+            cached = _ocr_cache.get(key)
+            if cached is not None:
+                _ocr_cache.move_to_end(key)
+                pages[index] = cached
+                continue
+        tasks.append((index, key, call))
+    return tasks
+
+
+def _ocr_done(pages: list[str], index: int, key: str, result: tuple[str, float], mime: str) -> None:
+    text, seconds = result
+    PARSE_PAGE_SECONDS.observe(seconds, mime=mime, method="ocr")
+    if text.strip():
+        pages[index] = text
+    with _ocr_cache_lock:
+        _ocr_cache[key] = text
+        while len(_ocr_cache) > OCR_CACHE_PAGES:
+            _ocr_cache.popitem(last=False)
+
+
+def _text_layer_done(result: tuple[list[str], list[float]], mime: str) -> list[str]:
+    pages, seconds = result
+    for value in seconds:
+        PARSE_PAGE_SECONDS.observe(value, mime=mime, method="text")
+    return pages
+
+
+def _join(pages: list[str]) -> str:
+    # Page breaks are kept so compaction can tell running headers/footers from content
+    return PAGE_BREAK.join(f"{text}\n" for text in pages if text)
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded uvicorn process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def extract_text(source: bytes | str, mime: str, max_pages: int = PARSER_MAX_PAGES) -> str:
+    """Parse file bytes (or a file path) in the worker pool and block the calling thread until done.
+
+    Pages without a text layer are then OCR'd in parallel, one pool task per page.
+    """
+    # Reject oversized files before paying for the pickling round trip
+    _check_size(source)
+    with span("parse", PARSE_SECONDS, mime=mime):
+        pool = get_pool()
+        pages = _text_layer_done(
+            pool.submit(_extract_pages, source, mime, max_pages).result(timeout=PARSER_TIMEOUT), mime
+        )
+
+        tasks = _ocr_tasks(pages, source, mime)
+        futures = [pool.submit(_timed, *call) for _, _, call in tasks]
+        _, pending = wait(futures, timeout=OCR_TIMEOUT)
+        for future in pending:
+            future.cancel()
+        if pending:
+            raise TimeoutError("OCR nije završen na vrijeme")
+        for (index, key, _), future in zip(tasks, futures):
+            _ocr_done(pages, index, key, future.result(), mime)
+        return _join(pages)
+
+
+async def extract_text_async(source: bytes | str, mime: str, max_pages: int = PARSER_MAX_PAGES) -> str:
+    _check_size(source)
+    with span("parse", PARSE_SECONDS, mime=mime):
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        pages = _text_layer_done(await asyncio.wait_for(
+            loop.run_in_executor(pool, _extract_pages, source, mime, max_pages),
+            timeout=PARSER_TIMEOUT,
+        ), mime)
+
+        tasks = _ocr_tasks(pages, source, mime)
+        if tasks:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(loop.run_in_executor(pool, _timed, *call) for _, _, call in tasks)),
+                timeout=OCR_TIMEOUT,
+            )
+            for (index, key, _), result in zip(tasks, results):
+                _ocr_done(pages, index, key, result, mime)
+        return _join(pages)
@@ -0,0 +1,322 @@
+import asyncio
+import copy
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+# In-memory stand-in for the parts of the Supabase client this app uses, for
+# running the repository, benchmarks and scripts without a project:
+#   repo = Repository(FakeSupabase())
+# AsyncFakeSupabase(fake) serves the same data to code that uses the async client.
+# Embedded selects ("*, jobs!inner(*), users(cv_url)") follow the <table>_id convention.
+
+
+class FakeQuery:
+    def __init__(self, db, table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters = []
+        self.order_by = []
+        self.row_limit = None
+        self.one = False
+
+    def select(self, columns: str = "*", **kwargs):
+        self.action, self.columns = "select", columns
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", **kwargs):
+        self.action, self.payload, self.conflict = "upsert", payload, on_conflict
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def _filter(self, column, test):
+        self.filters.append((column, test))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        return self._filter(column, lambda v: v is None if value in (None, "null") else v == value)
+
+    def ilike(self, column, pattern):
+        regex = re.compile("^" + re.escape(pattern).replace("%", ".*").replace("_", ".") + "$", re.IGNORECASE)
+        return self._filter(column, lambda v: v is not None and bool(regex.match(str(v))))
+
+    def or_(self, filters: str, **kwargs):
+        """PostgREST logic tree, e.g. "score.lt.5,and(score.eq.5,id.lt.x)"."""
+        tests = [_parse_condition(part) for part in _split_top_level(filters)]
+        self.filters.append(("", lambda row: any(test(row) for test in tests)))
+        return self
+
+    def order(self, column, desc: bool = False, nullsfirst: bool | None = None, **kwargs):
+        self.order_by.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, count: int, **kwargs):
+        self.row_limit = count
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    maybe_single = single
+
+    def execute(self):
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        with self.db.lock:
+            self.db.requests += 1
+            rows = self.db.tables.setdefault(self.table, [])
+
+            if self.action == "insert":
+                new = copy.deepcopy(self.payload if isinstance(self.payload, list) else [self.payload])
+                rows.extend(new)
+                return SimpleNamespace(data=copy.deepcopy(new))
+
+            if self.action == "upsert":
+                new = self.payload if isinstance(self.payload, list) else [self.payload]
+                keys = self.conflict.split(",")
+                for row in copy.deepcopy(new):
+                    existing = next((r for r in rows if all(r.get(k) == row.get(k) for k in keys)), None)
+                    if existing is not None:
+                        existing.update(row)
+                    else:
+                        rows.append(row)
+                return SimpleNamespace(data=copy.deepcopy(new))
+
+            if self.action in ("update", "delete"):
+                targets = [row for row in rows if self._matches(self._embed(row))]
+                for row in targets:
+                    if self.action == "update":
+                        row.update(copy.deepcopy(self.payload))
+                    else:
+                        rows.remove(row)
+                return SimpleNamespace(data=copy.deepcopy(targets))
+
+            matched = [row for row in map(self._embed, rows) if self._matches(row)]
+            for column, desc, nullsfirst in reversed(self.order_by):
+                # Postgres default: nulls sort as the largest value
+                present = [r for r in matched if r.get(column) is not None]
+                missing = [r for r in matched if r.get(column) is None]
+                present.sort(key=lambda r: r.get(column), reverse=desc)
+                if nullsfirst is None:
+                    nullsfirst = desc
+                matched = missing + present if nullsfirst else present + missing
+            if self.row_limit is not None:
+                matched = matched[: self.row_limit]
+            matched = [_project(row, self.columns) for row in matched]
+            if self.one:
+                return SimpleNamespace(data=matched[0] if matched else None)
+            return SimpleNamespace(data=matched)
+
+    def _embed(self, row: dict) -> dict:
+        row = copy.deepcopy(row)
+        for name in re.findall(r"(\w+)(?:!\w+)?\(", self.columns):
+            key = row.get(name.rstrip("s") + "_id")
+            row[name] = next((copy.deepcopy(r) for r in self.db.tables.get(name, []) if r.get("id") == key), None)
+        return row
+
+    def _matches(self, row: dict) -> bool:
+        for column, test in self.filters:
+            if not test(_lookup(row, column) if column else row):
+                return False
+        return True
+
+
+def _lookup(row: dict, column: str):
+    value = row
+    for part in column.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _project(row: dict, columns: str) -> dict:
+    """Keep only the selected columns; embedded tables get their own column list."""
+    if row is None:
+        return None
+    selected = {}
+    for part in _split_top_level(columns):
+        embed = re.match(r"(\w+)(?:!\w+)?\((.*)\)$", part)
+        if embed:
+            selected[embed.group(1)] = _project(row.get(embed.group(1)), embed.group(2))
+        elif part == "*":
+            selected.update({k: v for k, v in row.items() if k not in selected})
+        else:
+            selected[part] = row.get(part)
+    return selected
+
+
+def _split_top_level(text: str) -> list[str]:
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parse_condition(text: str):
+    for logic, combine in (("and(", all), ("or(", any)):
+        if text.startswith(logic):
+            tests = [_parse_condition(part) for part in _split_top_level(text[len(logic):-1])]
+            return lambda row: combine(test(row) for test in tests)
+
+    column, op, value = text.split(".", 2)
+    compare = {
+        "eq": lambda v: v is not None and str(v) == value,
+        "neq": lambda v: v is not None and str(v) != value,
+        "is": lambda v: v is None if value == "null" else str(v).lower() == value,
+    }
+    ordered = {"lt": lambda a, b: a < b, "lte": lambda a, b: a <= b, "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b}
+
+    def test(row):
+        v = _lookup(row, column)
+        if op in ordered:
+            if v is None:
+                return False
+            other = type(v)(value) if isinstance(v, (int, float)) else value
+            return ordered[op](v, other)
+        return compare[op](v)
+
+    return test
+
+
+class FakeBucket:
+    def __init__(self, db, name: str):
+        self.db = db
+        self.name = name
+
+    def upload(self, path: str, data, *args, **kwargs):
+        if hasattr(data, "read"):
+            data = data.read()
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        self.db.files[(self.name, path)] = bytes(data)
+        return {"path": path}
+
+    def download(self, path: str) -> bytes:
+        if self.db.latency:
+            time.sleep(self.db.latency)
+        return self.db.files[(self.name, path)]
+
+    def create_signed_url(self, path: str, expires_in: int, *args, **kwargs):
+        url = f"fake://{self.name}/{path}?expires_in={expires_in}"
+        return {"signedURL": url, "signedUrl": url}
+
+    def create_signed_urls(self, paths: list[str], expires_in: int, *args, **kwargs):
+        return [{"path": path, **self.create_signed_url(path, expires_in)} for path in paths]
+
+
+class FakeStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self.db, bucket)
+
+
+class FakeSupabase:
+    def __init__(self, tables: dict | None = None, latency: float = 0.0):
+        self.tables: dict[str, list[dict]] = copy.deepcopy(tables or {})
+        self.files: dict[tuple[str, str], bytes] = {}
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.RLock()
+        self.storage = FakeStorage(self)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    from_ = table
+
+
+class AsyncFakeQuery:
+    """FakeQuery whose execute() is awaited, like the async client's builders."""
+
+    def __init__(self, query: FakeQuery):
+        self._query = query
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        def chain(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+
+        return chain
+
+    async def execute(self):
+        return await asyncio.to_thread(self._query.execute)
+
+
+class AsyncFakeBucket:
+    def __init__(self, bucket: FakeBucket):
+        self._bucket = bucket
+
+    def __getattr__(self, name):
+        method = getattr(self._bucket, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+class AsyncFakeStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket: str) -> AsyncFakeBucket:
+        return AsyncFakeBucket(FakeBucket(self.db, bucket))
+
+
+class AsyncFakeSupabase:
+    def __init__(self, db: FakeSupabase):
+        self.db = db
+        self.storage = AsyncFakeStorage(db)
+
+    def table(self, name: str) -> AsyncFakeQuery:
+        return AsyncFakeQuery(FakeQuery(self.db, name))
+
+    from_ = table
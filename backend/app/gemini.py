@@ -1,91 +1,147 @@
 from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, HTTPException
-from uuid import uuid4
+from fastapi.responses import StreamingResponse
 import os
-import re
-import time
-from pathlib import Path
-from dotenv import load_dotenv
-from supabase import create_client, Client
-import google.generativeai as genai
-import pdfplumber
+import asyncio
 import json
-from docx import Document
-import io
-import requests
-from datetime import datetime
-from PIL import Image
-import pytesseract
+import time
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+# Loads app/.env, so it goes before modules that read settings at import
+from app.repository import repo, supabase, get_async_supabase, CV_BUCKET
+from app.cv_cache import cv_text_cache
+from app.document_parser import (
+    extract_text, extract_text_async, mime_for, sniff_mime, UnsupportedDocument, DocumentTooLarge, PARSER_MAX_BYTES,
+)
+from app.job_queue import worker_pool, PermanentJobError, QUEUED, DONE, FAILED
+from app.progress import progress
+from app.admission import analysis_flights, Overloaded, ANALYZE_FLIGHT_TTL
+from app.job_index import job_index, JOB_COLUMNS
+from app import recommendations
+from app.llm_cache import llm_cache
+from app.llm_providers import get_llm, record_answers
+from app.compaction import compact, CV_TOKEN_BUDGET, JOB_TOKEN_BUDGET
+from app.metrics import span, tracing, stage_totals, log_event, ANALYSIS_SECONDS, MATCH_SECONDS
+from app.cv_profile import CVProfile, PROFILE_SCHEMA, profile_prompt, parse_profile
+from app.analysis_result import (
+    ANALYSIS_SCHEMA, ANALYSIS_RULES, SECTION_TITLES, StreamingAnalysis, complete_analysis, is_complete, scoring_stamp,
+)
 
 router = APIRouter()
 
-# ENV VARS
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-pytesseract.pytesseract.tesseract_cmd = r"C:\Tesseract\tesseract.exe"
-os.environ['TESSDATA_PREFIX'] = r"C:\Tesseract"
 
 
 
 
+UPLOAD_CHUNK = 64 * 1024
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(PARSER_MAX_BYTES)))
+
+
+async def spool_upload(file: UploadFile, expected_mime: str) -> tuple[str, str]:
+    """Copy the upload to a temp file chunk by chunk; returns (path, sha256).
+
+    Stops as soon as the size limit is passed, and checks the first bytes
+    against the file extension before anything reaches storage.
+    """
+    fd, path = tempfile.mkstemp(prefix="cv_upload_")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK):
+                if size == 0 and sniff_mime(chunk) != expected_mime:
+                    raise HTTPException(status_code=415, detail="Sadržaj fajla ne odgovara ekstenziji")
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Fajl je veći od {UPLOAD_MAX_BYTES} bajtova")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Fajl je prazan")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
 
 @router.post("/upload-cv")
-async def upload_cv(user_id: str = Form(...), file: UploadFile = File(...)):
+async def upload_cv(background_tasks: BackgroundTasks, user_id: str = Form(...), file: UploadFile = File(...)):
+    try:
+        mime = mime_for(file.filename)
+    except UnsupportedDocument as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    spool_path, content_key = await spool_upload(file, mime)
+    # Parsing starts now, alongside the storage upload, from the same local copy
+    parse_task = asyncio.create_task(extract_text_async(spool_path, mime))
     try:
         # Create a unique filename based on user ID and timestamp
-        ext = os.path.splitext(file.filename)[-1].lower()
         filename = f"{user_id}/cv_{int(time.time())}_{file.filename}"
-        file_bytes = await file.read()
 
-        # Upload file to Supabase Storage
-        upload_response = supabase.storage.from_("user-uploads").upload(filename, file_bytes)
+        # Upload file to Supabase Storage, streamed from disk
+        client = await get_async_supabase()
+        with open(spool_path, "rb") as f:
+            await client.storage.from_(CV_BUCKET).upload(filename, f, {"content-type": mime})
+        log_event("cv_upload", user_id=user_id, path=filename, mime=mime)
 
-        print("📦 Upload result:", upload_response)
-        print("🔢 Type:", type(upload_response))
-        print("🔎 Dict:", upload_response.__dict__)
+        # Store the relative path in the database (NOT the full signed URL!)
+        await client.table("users").update({"cv_url": filename}).eq("id", user_id).execute()
+        llm_cache.invalidate(f"user:{user_id}")
 
-        
-        signed_response = supabase.storage.from_("user-uploads").create_signed_url(filename, 3600 * 24)
-        if not signed_response or not signed_response.get("signedUrl"):
-            raise HTTPException(status_code=500, detail="Failed to generate signed URL")
+    except Exception as e:
+        parse_task.cancel()
+        os.unlink(spool_path)
+        print("⚠️ upload_cv ERROR:", str(e))
+        raise HTTPException(status_code=500, detail="Error: " + str(e))
 
-        signed_url = signed_response["signedUrl"]
-        print("🔐 Signed URL:", signed_url)
+    # Keyword and category analysis runs after the response is sent
+    background_tasks.add_task(refresh_job_profile, user_id, filename, content_key, parse_task, spool_path)
 
-        # Store the relative path in the database (NOT the full signed URL!)
-        supabase.table("users").update({"cv_url": filename}).eq("id", user_id).execute()
+    # The storage path; the frontend downloads through the Supabase client
+    return {"success": True, "cv_url": filename}
 
-        # Run job analysis with Gemini
-        print("🧠 Running job analysis for:", user_id)
-        analysis = find_my_jobs(user_id)
-        print("🎯 AI result:", analysis)
 
-        # Update database with analysis results
-        update_result = supabase.table("users").update({
-            "job_keywords": analysis["keywords"],
-            "job_category": analysis["category"],
+async def refresh_job_profile(user_id: str, cv_path: str, content_key: str, parse_task: asyncio.Task, spool_path: str):
+    try:
+        # Seed the text cache with what the upload already parsed, so later
+        # analyses don't download and parse the same file again
+        cv_text = await parse_task
+        cv_text_cache.put_key(cv_path, content_key, cv_text)
+        if not cv_text.strip():
+            print("⚠️ CV je prazan:", cv_path)
+            return
+
+        print("🧠 Running job analysis for:", user_id)
+        profile = await profile_cv_async(cv_text)
+        print("🎯 AI result:", profile)
+
+        client = await get_async_supabase()
+        await client.table("users").update({
+            "job_keywords": profile.keywords,
+            "job_category": profile.category,
+            "job_seniority": profile.seniority,
+            "job_skills": profile.skills,
             "job_analysis_last_updated": datetime.utcnow().isoformat()
         }).eq("id", user_id).execute()
-
-        print("📝 UPDATE RESULT:", update_result)
-
-        return {"success": True, "cv_url": signed_url}
+        await asyncio.to_thread(recommendations.recompute, supabase, user_id, profile.keywords, profile.category)
 
     except Exception as e:
-        print("⚠️ upload_cv ERROR:", str(e))
-        raise HTTPException(status_code=500, detail="Error: " + str(e))
+        print("⚠️ refresh_job_profile ERROR:", str(e))
+    finally:
+        if os.path.exists(spool_path):
+            os.unlink(spool_path)
 
 
+MATCH_MODES = ("keywords", "semantic")
 
 
 @router.get("/user-job-analysis/{user_id}")
-def get_user_job_analysis(user_id: str):
+def get_user_job_analysis(user_id: str, mode: str = "keywords"):
+    if mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Nepoznat mode: {mode}")
     try:
 
-        user = supabase.table("users").select("job_category, job_keywords").eq("id", user_id).single().execute()
+        user = supabase.table("users").select("job_category, job_keywords, cv_url").eq("id", user_id).single().execute()
 
         if not user.data:
             print("❌ Nema korisničkih podataka u bazi.")
@@ -94,173 +150,341 @@ def get_user_job_analysis(user_id: str):
         category = user.data.get("job_category")
         keywords = user.data.get("job_keywords")
 
+        if mode == "semantic":
+            if not user.data.get("cv_url"):
+                raise HTTPException(status_code=404, detail="CV nije pronađen u bazi")
+            results = semantic_jobs(fetch_cv_text(user.data["cv_url"]), category)
+            return {
+                "mode": semantic_mode(),
+                "category": category,
+                "keywords": keywords,
+                "results": results
+            }
 
         if not category or not keywords:
             raise HTTPException(status_code=404, detail="Nema spremljene analize")
 
-        jobs_response = supabase.table("jobs").select("*").ilike("job_type", category).execute()
-        jobs = jobs_response.data if jobs_response.data else []
-
-        def match_score(job):
-            combined = f"{job['title']} {job['description']}".lower()
-            return sum(1 for kw in keywords if kw.lower() in combined)
-
-        ranked = sorted(jobs, key=match_score, reverse=True)
-
         return {
+            "mode": mode,
             "category": category,
             "keywords": keywords,
-            "results": ranked[:10]
+            "results": fetch_ranked_jobs(recommendations.recommended(supabase, user_id, keywords, category))
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(" BACKEND ERROR:", str(e))
         raise HTTPException(status_code=500, detail=f"Greška: {str(e)}")
 
 
+def top_jobs(keywords: list, category: str, k: int = 10) -> list:
+    with span("match.keywords", MATCH_SECONDS, mode="keywords"):
+        job_index.refresh(supabase)
+        ranked = job_index.search(keywords, category, k)
+    return fetch_ranked_jobs(ranked)
+
+
+def semantic_jobs(cv_text: str, category: str | None = None, k: int = 10) -> list:
+    """Nearest jobs by embedding similarity; no LLM call involved."""
+    # numpy (and the embedding model) load with the first semantic search, not at import
+    from app.job_vectors import get_job_vectors, embed_cv
+
+    with span("match.semantic", MATCH_SECONDS, mode="semantic"):
+        vectors = get_job_vectors()
+        vectors.refresh(supabase)
+        vector = embed_cv(cv_text)
+        ranked = vectors.search(vector, category, k)
+        if category and len(ranked) < k:
+            # A small category is padded with the closest jobs from the rest
+            seen = {job_id for job_id, _ in ranked}
+            others = [item for item in vectors.search(vector, None, 2 * k) if item[0] not in seen]
+            ranked += others[: k - len(ranked)]
+    return fetch_ranked_jobs(ranked)
+
+
+def semantic_mode() -> str:
+    """The mode semantic results are reported under: "hashing" when the embedding model is missing."""
+    from app.job_vectors import get_job_vectors
+
+    return "semantic" if get_job_vectors().embedder.semantic else "hashing"
+
+
+def fetch_ranked_jobs(ranked: list) -> list:
+    if not ranked:
+        return []
+
+    ids = [job_id for job_id, _ in ranked]
+    rows = supabase.table("jobs").select("*").in_("id", ids).execute().data or []
+    by_id = {str(row["id"]): row for row in rows}
+    return [by_id[job_id] for job_id in ids if job_id in by_id]
+
+
+def forget_job_text(job_id: str, old_category: str | None = None) -> None:
+    """Drop what was derived from a job's old text; the index calls this for edits and deletes it syncs."""
+    llm_cache.invalidate(f"job:{job_id}")
+    repo.notify_job_changed(job_id)
+
+
+job_index.on_change(forget_job_text)
+
+
+@router.post("/jobs/{job_id}/reindex")
+def reindex_job(job_id: str):
+    """Hook for job create/update/delete (e.g. a Supabase database webhook).
+
+    Optional: the periodic index refresh picks up the same changes through
+    jobs.updated_at; this applies one right away.
+    """
+    from app.job_vectors import get_job_vectors
+
+    job = supabase.table("jobs").select(JOB_COLUMNS).eq("id", job_id).execute()
+    vectors = get_job_vectors()
+    job_index.refresh(supabase)
+    old_category = job_index.category_of(job_id)
+    if job.data:
+        job_index.upsert(job.data[0])
+        vectors.upsert_many(job.data)
+    else:
+        job_index.remove(job_id)
+        vectors.remove(job_id)
+    forget_job_text(job_id)
+    updated = recommendations.apply_job_change(supabase, job_id, old_category)
+    return {"indexed": bool(job.data), "jobs": len(job_index), "recommendations_updated": updated}
+
+
 @router.post("/analyze-cv/{user_id}/{job_id}")
-def analyze_cv(user_id: str, job_id: str, background_tasks: BackgroundTasks):
-    analysis_id = str(uuid4())
-    
-    user_lookup = supabase.table("users").select("id").eq("id", user_id).single().execute()
-    if not user_lookup.data:
+def analyze_cv(user_id: str, job_id: str):
+    versions = repo.analysis_versions(user_id, job_id)
+    if versions is None:
         raise HTTPException(status_code=404, detail="Korisnik nije pronađen")
 
-    real_user_id = user_lookup.data["id"]
+    def create():
+        analysis_id = repo.create_analysis(user_id, job_id, QUEUED, versions)
+        if not analysis_id:
+            raise HTTPException(status_code=404, detail="Korisnik nije pronađen")
+        return analysis_id
 
-    supabase.table("application_analysis").insert({
-        "id": analysis_id,
-        "user_id": real_user_id,
-        "job_id": job_id,
-        "analysis": None,
-        "score": None
-    }).execute()
+    def launch(analysis_id):
+        progress.publish(analysis_id, QUEUED)
+        worker_pool.submit("analyze_cv", {"analysis_id": analysis_id}, provider=get_llm().primary.name)
 
-    background_tasks.add_task(run_analysis_task, analysis_id)
-    return {"analysis_id": analysis_id}
+    # A double click or a retry gets the analysis already running (or done) for
+    # this CV and job version instead of another LLM call
+    key = (user_id, job_id, versions["cv_version"], versions["job_version"])
+    try:
+        analysis_id, shared = analysis_flights.run(
+            key,
+            lambda: repo.find_analysis(user_id, job_id, versions, ANALYZE_FLIGHT_TTL),
+            create,
+            launch,
+        )
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return {"analysis_id": analysis_id, "deduplicated": shared}
 
 
 
 
 def run_analysis_task(analysis_id: str):
-    result = supabase.table("application_analysis").select("*").eq("id", analysis_id).execute()
-    record = result.data[0] if result.data else None
+    """One analysis job, traced; ends with a structured log line of where its time went."""
+    summary = {"analysis_id": analysis_id}
+    outcome = FAILED
+    started = time.perf_counter()
+    with tracing() as spans:
+        try:
+            analyze_and_store(analysis_id, summary)
+            outcome = DONE
+            analysis_flights.finish(analysis_id)
+        except Exception as e:
+            summary["error"] = str(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            ANALYSIS_SECONDS.observe(elapsed, outcome=outcome)
+            llm_calls = [item for item in spans if item["name"].startswith("llm.") and "tokens_in" in item]
+            log_event(
+                "analysis",
+                **summary,
+                status=outcome,
+                duration_ms=round(elapsed * 1000, 3),
+                stages=stage_totals(spans),
+                llm_calls=len(llm_calls),
+                tokens_in=sum(item["tokens_in"] for item in llm_calls),
+                tokens_out=sum(item["tokens_out"] for item in llm_calls),
+                cost_usd=round(sum(item["cost_usd"] for item in llm_calls), 6),
+            )
+
+
+def analyze_and_store(analysis_id: str, summary: dict):
+    record = repo.analysis_context(analysis_id)
     if not record:
-        return
+        raise PermanentJobError(f"Analiza {analysis_id} ne postoji")
 
     user_id = record["user_id"]
     job_id = record["job_id"]
+    summary.update(user_id=user_id, job_id=job_id)
 
-    for _ in range(5):
-        job_data = supabase.from_("jobs").select("description").eq("id", job_id).single().execute()
-        if job_data.data and job_data.data.get("description"):
-            break
-        time.sleep(1)
-
-    user_data = supabase.table("users").select("cv_url").eq("id", user_id).single().execute()
-    if not user_data.data or not user_data.data.get("cv_url"):
-        return
+    job_description = record["job_description"] or repo.wait_for_job_description(job_id)
+    if not job_description:
+        raise RuntimeError(f"Opis posla {job_id} nije dostupan")
 
-    cv_path = user_data.data["cv_url"]
+    cv_path = record["cv_path"]
+    if not cv_path:
+        raise PermanentJobError("CV nije pronađen u bazi")
 
     try:
-        signed = supabase.storage.from_("user-uploads").create_signed_url(cv_path, 3600)
-        cv_signed_url = signed.get("signedURL") or signed.get("signedUrl")
+        cv_text = fetch_cv_text(cv_path, on_stage=lambda stage: progress.publish(analysis_id, stage))
+    except (UnsupportedDocument, DocumentTooLarge) as e:
+        raise PermanentJobError(str(e))
 
+    if not cv_text.strip():
+        raise PermanentJobError("CV je prazan")
 
-        if not cv_signed_url:
-            return
+    prompt = build_prompt(job_description, cv_text)
 
-        file_response = requests.get(cv_signed_url)
-        file_response.raise_for_status()
-    except Exception:
-        return
+    # Errors propagate so the worker pool retries with backoff
+    progress.publish(analysis_id, "generating")
+    tags = (f"user:{user_id}", f"job:{job_id}")
+    reader = StreamingAnalysis()
+    score_sent = False
+    with record_answers() as answers:
+        for chunk in get_llm().stream(prompt, tags=tags, variant="analysis", schema=ANALYSIS_SCHEMA, accept=is_complete):
+            text = reader.feed(chunk)
+            if text:
+                progress.publish(analysis_id, "token", {"text": text})
+            if reader.score is not None and not score_sent:
+                score_sent = True
+                progress.publish(analysis_id, "score", {"score": reader.score})
 
-    try:
-        ext = cv_path.split("?")[0].split(".")[-1].lower()
-        cv_text = ""
-
-        if ext == "pdf":
-            with pdfplumber.open(io.BytesIO(file_response.content)) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        cv_text += text + "\n"
-
-        elif ext == "docx":
-            doc = Document(io.BytesIO(file_response.content))
-            for paragraph in doc.paragraphs:
-                cv_text += paragraph.text + "\n"
-        else:
-            return
+        # Only fields that are missing or fail validation go back to the model
+        result = complete_analysis(prompt, reader.fields, tags=tags)
+    summary["score"] = result.score
+    columns = result.columns()
+    repo.update_analysis(analysis_id, {**columns, **scoring_stamp(answers=answers), "status": DONE, "error": None})
+    progress.publish(analysis_id, DONE, {"analysis": columns["analysis"], "score": result.score})
 
-    except Exception:
-        return
 
-    if not cv_text.strip():
-        return
+def update_analysis_status(payload: dict, status: str, error: str | None):
+    if status == FAILED:
+        analysis_flights.finish(payload["analysis_id"])
+    progress.publish(payload["analysis_id"], status, {"error": error})
+    repo.update_analysis(payload["analysis_id"], {"status": status, "error": error})
 
-    job_description = job_data.data["description"]
-    prompt = build_prompt(job_description, cv_text)
 
-    try:
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        analysis_result = response.text if hasattr(response, "text") else str(response)
-    except Exception as e:
-        analysis_result = f"Greška pri AI analizi: {str(e)}"
+# Rows created before this process started can't belong to its own requests or batches
+PROCESS_STARTED = datetime.now(timezone.utc).isoformat()
 
-    score_match = re.search(r"(\d{1,2}\.\d)", analysis_result)
-    score = float(score_match.group(1)) if score_match else 0.0
 
-    supabase.table("application_analysis").update({
-        "analysis": analysis_result,
-        "score": score
-    }).eq("id", analysis_id).execute()
+def pending_analysis_jobs() -> list[tuple[dict, str]]:
+    """analyze_cv jobs for rows an earlier process left queued or running.
 
+    The SQLite queue lives on the instance disk, which Render's free plan
+    wipes on every deploy and restart; the rows in Supabase survive.
+    """
+    provider = get_llm().primary.name
+    return [({"analysis_id": analysis_id}, provider) for analysis_id in repo.pending_analyses(PROCESS_STARTED)]
 
 
-def parse_pdf(file_path: str):
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-    return text
+worker_pool.register(
+    "analyze_cv",
+    lambda payload: run_analysis_task(payload["analysis_id"]),
+    on_status=update_analysis_status,
+    recover=pending_analysis_jobs,
+)
 
 
-def parse_image(image_path: str):
-    image = Image.open(image_path)
-    return pytesseract.image_to_string(image)
 
+def fetch_cv_text(cv_path: str, on_stage=None) -> str:
+    mime = mime_for(cv_path)
+    on_stage = on_stage or (lambda stage: None)
 
-def parse_docx(file_path: str) -> str:
-    text = ""
-    try:
-        doc = Document(file_path)
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-    except Exception as e:
-        print(f"Greška pri čitanju .docx fajla: {e}")
-    return text
+    def download():
+        on_stage("downloading")
+        return repo.download_cv(cv_path)
+
+    def parse(file_bytes):
+        on_stage("parsing")
+        return extract_text(file_bytes, mime)
+
+    return cv_text_cache.load(cv_path, download=download, parse=parse)
 
 
 @router.get("/get-analysis/{analysis_id}")
 def get_analysis(analysis_id: str):
     try:
-        result = supabase.table("application_analysis").select("analysis, score").eq("id", analysis_id).execute()
+        result = supabase.table("application_analysis").select(
+            f"analysis, score, status, error, {', '.join(SECTION_TITLES)}"
+        ).eq("id", analysis_id).execute()
         if not result.data:
             raise HTTPException(status_code=404, detail="Nema analize")
         record = result.data[0]
         return {
             "analysis": record["analysis"],
             "score": record["score"],
+            "sections": {key: record.get(key) for key in SECTION_TITLES},
+            "status": record.get("status"),
+            "error": record.get("error"),
         }
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Greška prilikom dohvata analize")
 
 
+@router.get("/analysis-stream/{analysis_id}")
+async def analysis_stream(analysis_id: str):
+    return StreamingResponse(
+        analysis_events(analysis_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def analysis_events(analysis_id: str):
+    async def stored():
+        result = await asyncio.to_thread(
+            lambda: supabase.table("application_analysis").select("analysis, score, status, error")
+            .eq("id", analysis_id).execute()
+        )
+        return result.data[0] if result.data else None
+
+    # Analyses finished before this process started are answered from the table
+    if not progress.known(analysis_id):
+        record = await stored()
+        if not record:
+            yield sse(FAILED, {"error": "Nema analize"})
+            return
+        if record.get("analysis") is not None:
+            yield sse(DONE, {"analysis": record["analysis"], "score": record["score"]})
+            return
+        if record.get("status") == FAILED:
+            yield sse(FAILED, {"error": record.get("error")})
+            return
+
+    async for event, data in progress.subscribe(analysis_id):
+        if event is None:
+            # Keep-alive; also catches work finished or failed by another process
+            # (or by a failure whose event this one missed), so the client isn't left waiting
+            record = await stored()
+            if not record:
+                yield sse(FAILED, {"error": "Nema analize"})
+                return
+            if record.get("analysis") is not None:
+                yield sse(DONE, {"analysis": record["analysis"], "score": record["score"]})
+                return
+            if record.get("status") == FAILED:
+                yield sse(FAILED, {"error": record.get("error")})
+                return
+            yield ": ping\n\n"
+            continue
+        yield sse(event, data)
+
+
 @router.get("/get-existing-analysis/{user_id}/{job_id}")
 def get_existing_analysis(user_id: str, job_id: str):
     try:
@@ -284,36 +508,21 @@ def get_existing_analysis(user_id: str, job_id: str):
 
 
 def build_prompt(job_description: str, cv_text: str) -> str:
+    job = compact(job_description, JOB_TOKEN_BUDGET)
+    cv = compact(cv_text, CV_TOKEN_BUDGET)
+    print(f"✂️ Prompt: {job.tokens_before + cv.tokens_before} -> {job.tokens_after + cv.tokens_after} tokena (ušteđeno {job.saved + cv.saved})")
     return (
-        f"📄 Opis posla:\n{job_description}\n\n"
-        f"📄 CV kandidata:\n{cv_text}\n\n"
+        f"📄 Opis posla:\n{job.text}\n\n"
+        f"📄 CV kandidata:\n{cv.text}\n\n"
         "🔍 Sada slijedi analiza životopisa kandidata u odnosu na opis posla.\n\n"
-        "📌 Upute za analizu:\n"
-        "🔹 Na prvoj liniji **OBAVEZNO** napiši samo brojčanu ocjenu prikladnosti kandidata (npr. `7.5`).\n"
-        "🔹 Koristi decimalnu vrijednost sa jednom decimalom (obavezno).\n"
-        "🔹 Odgovor mora biti **100% zasnovan isključivo** na podacima iz CV-a i opisa posla. Nemoj izmišljati informacije koje nisu navedene.\n\n"
-        "🔹 Nakon toga napiši **DETALJNU i STRUKTURIRANU** analizu kandidata.\n"
-        "🔹 Tvoj odgovor treba biti organizovan u sljedeće sekcije (podnaslove):\n"
-        "1. Kompetencije\n"
-        "2. Iskustvo\n"
-        "3. Edukacija\n"
-        "4. Kompatibilnost\n"
-        "5. Prednosti kandidata (navedi najmanje 3)\n"
-        "6. Nedostaci kandidata (navedi najmanje 3)\n"
-        "7. Preporuke\n\n"
-        "🔹 Piši isključivo na **bosanskom jeziku**.\n"
-        "🔹 Format odgovora:\n"
-        "```\n"
-        "8.3\n"
-        "1. Kompetencije:\n...\n"
-        "2. Iskustvo:\n...\n"
-        "...\n"
-        "```"
+        f"{ANALYSIS_RULES}"
     )
 
 # testing find my job 
 @router.get("/find-my-jobs/{user_id}")
-def find_my_jobs(user_id: str):
+def find_my_jobs(user_id: str, mode: str = "keywords"):
+    if mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Nepoznat mode: {mode}")
     try:
         result = supabase.table("users").select("cv_url").eq("id", user_id).single().execute()
         if not result.data or not result.data.get("cv_url"):
@@ -322,125 +531,50 @@ def find_my_jobs(user_id: str):
         cv_path = result.data["cv_url"]
 
         try:
-            signed = supabase.storage.from_("user-uploads").create_signed_url(cv_path, 3600)
-            cv_signed_url = signed.get("signedURL") or signed.get("signedUrl")
-
-
-            if not cv_signed_url:
-                raise HTTPException(status_code=500, detail="Ne mogu generisati URL za CV")
-
-            file_response = requests.get(cv_signed_url)
-            file_response.raise_for_status()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Greška pri preuzimanju CV-a: {str(e)}")
-
-        try:
-            ext = cv_path.split("?")[0].split(".")[-1].lower()
-            cv_text = ""
-
-            if ext == "pdf":
-                with pdfplumber.open(io.BytesIO(file_response.content)) as pdf:
-                    for page in pdf.pages:
-                        text = page.extract_text()
-                        if text:
-                            cv_text += text + "\n"
-
-            elif ext == "docx":
-                doc = Document(io.BytesIO(file_response.content))
-                for paragraph in doc.paragraphs:
-                    cv_text += paragraph.text + "\n"
-            else:
-                raise Exception("Nepodržan format fajla: ." + ext)
-
+            cv_text = fetch_cv_text(cv_path)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Greška pri čitanju CV-a: {str(e)}")
 
         if not cv_text.strip():
             raise HTTPException(status_code=400, detail="CV je prazan")
 
-        category = detect_cv_category(cv_text)
-
-        prompt = f"""
-        Tvoj zadatak je da automatski izvučeš najrelevantnije ključne riječi iz sljedećeg CV-a kandidata.
-
-        Tekst CV-a:
-        \"\"\"{cv_text}\"\"\"
-
-        Pravila za izdvajanje ključnih riječi:
-        1. Ključne riječi moraju biti pojedinačne riječi ili kratke fraze (1-3 riječi).
-        2. Ne koristi rečenice, opise niti nepotrebne informacije.
-        3. Vrati isključivo listu ključnih riječi u JSON formatu: ["riječ1", "riječ2", "fraza 3", ...]
-        4. Ključne riječi treba da predstavljaju vještine, tehnologije, alate, pozicije ili industrijske izraze.
-        5. Piši ih na jeziku na kojem su i u originalnom tekstu (npr. "React", "računovodstvo").
-
-        Output mora izgledati ovako:
-        ["javascript", "sql", "računovodstvo", "administracija", "komunikacija"]
+        if mode == "semantic":
+            ranked_jobs = semantic_jobs(cv_text)
+            mode = semantic_mode()
+            log_event("find_my_jobs", user_id=user_id, mode=mode, jobs=len(ranked_jobs))
+            return {"mode": mode, "results": ranked_jobs}
 
-        Nemoj dodavati nikakva pojašnjenja, samo vrati listu kao JSON niz.
-        """
-
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        keywords_raw = response.text.strip()
-
-        try:
-            keywords = json.loads(keywords_raw)
-        except:
-            keywords = [kw.strip().lower() for kw in re.findall(r'\w+', keywords_raw)]
+        profile = profile_cv(cv_text)
+        category = profile.category
+        keywords = profile.keywords
 
         if not keywords:
             raise HTTPException(status_code=400, detail="Nema pronađenih ključnih riječi")
 
-        jobs_response = supabase.table("jobs").select("*").ilike("job_type", category).execute()
-        jobs = jobs_response.data if jobs_response.data else []
-
-        def match_score(job):
-            combined_text = f"{job['title']} {job['description']}".lower()
-            return sum(1 for kw in keywords if kw.lower() in combined_text)
+        ranked_jobs = top_jobs(keywords, category)
 
-        ranked_jobs = sorted(jobs, key=match_score, reverse=True)
-
-        print("DETECTED CATEGORY:", category, flush=True)
-        print("KEYWORDS:", keywords, flush=True)
-        print("JOBS FOUND:", len(jobs), flush=True)
+        log_event("find_my_jobs", user_id=user_id, mode=mode, category=category, keywords=keywords, jobs=len(ranked_jobs))
 
         return {
+            "mode": mode,
             "keywords": keywords,
             "category": category,
-            "results": ranked_jobs[:10]
+            "seniority": profile.seniority,
+            "skills": profile.skills,
+            "results": ranked_jobs
         }
     except Exception as e:
         print(" ERROR:", str(e), flush=True)
         raise HTTPException(status_code=500, detail=f"Greška: {str(e)}")
 
 
-def detect_cv_category(cv_text: str) -> str:
-    categories = ["it", "administracija", "ugostiteljstvo", "proizvodnja", "obrazovanje", "zdravstvo"]
-
-    prompt = f"""
-    Na osnovu sadržaja životopisa kandidata, odaberi samo jednu kategoriju zanimanja koja najbolje opisuje ovaj CV.
-
-    Dostupne kategorije su:
-    {', '.join(categories)}
+def profile_cv(cv_text: str) -> CVProfile:
+    return get_llm().generate(profile_prompt(cv_text), schema=PROFILE_SCHEMA, variant="profile", parse=parse_profile)
 
-    Tekst CV-a:
-    \"\"\"
-    {cv_text}
-    \"\"\"
 
-    Pravila:
-    - Odgovori isključivo jednom od ponuđenih kategorija (ništa više).
-    - Odgovor treba biti samo jedna riječ: it, administracija, ugostiteljstvo, proizvodnja, obrazovanje ili zdravstvo.
-    - Ne dodaji objašnjenja.
-
-    Samo rezultat:
-    """
-
-    try:
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        category = response.text.strip().lower()
-        return category if category in categories else "nepoznato"
-    except Exception as e:
-        print(f"[Kategorija AI fallback] Greška: {e}")
-        return "nepoznato"
+async def profile_cv_async(cv_text: str) -> CVProfile:
+    return await get_llm().agenerate(
+        profile_prompt(cv_text), schema=PROFILE_SCHEMA, variant="profile", parse=parse_profile
+    )
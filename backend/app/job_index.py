@@ -0,0 +1,226 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+JOB_INDEX_REFRESH = float(os.getenv("JOB_INDEX_REFRESH", "60"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+JOB_COLUMNS = "id, title, description, job_type, created_at, updated_at"
+
+# Inflectional endings, longest first; only stripped when a 3+ letter stem remains
+SUFFIXES = sorted([
+    "ovima", "evima", "anje", "enje", "ijom", "ama", "ima", "om", "em", "og", "eg",
+    "oj", "ih", "im", "iju", "ju", "ost", "a", "e", "i", "o", "u",
+], key=len, reverse=True)
+
+STOP_WORDS = {
+    "i", "u", "na", "za", "sa", "od", "do", "se", "je", "su", "da", "ili", "kao", "koji", "koja",
+    "koje", "the", "and", "of", "to", "in", "for", "with", "a", "an",
+}
+
+
+def fold(text: str) -> str:
+    """Lowercase and drop diacritics: "Računovođa" -> "racunovodja"."""
+    text = text.lower().replace("đ", "dj")
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(word) for word in re.findall(r"\w+", fold(text or "")) if word not in STOP_WORDS]
+
+
+def job_updated_at(job: dict) -> str:
+    return job.get("updated_at") or job.get("created_at") or ""
+
+
+def fetch_changed_jobs(client, since: str | None) -> list[dict]:
+    """Jobs created or edited after since (all jobs when since is None)."""
+    query = client.table("jobs").select(JOB_COLUMNS)
+    if since:
+        query = query.gt("updated_at", since)
+    return query.execute().data or []
+
+
+def live_job_ids(client) -> set[str]:
+    """Ids of every job still in the table; what a local copy lacks here was deleted."""
+    return {str(row["id"]) for row in client.table("jobs").select("id").execute().data or []}
+
+
+def _terms(keywords: list[str]) -> set[str]:
+    terms = set()
+    for keyword in keywords:
+        terms.update(tokenize(keyword))
+    return terms
+
+
+class JobIndex:
+    """Inverted index over job titles and descriptions with BM25 scoring."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._postings: dict[str, dict[str, int]] = {}
+        self._doc_terms: dict[str, Counter] = {}
+        self._doc_len: dict[str, int] = {}
+        self._categories: dict[str, set[str]] = {}
+        self._doc_category: dict[str, str] = {}
+        self._doc_updated: dict[str, str] = {}
+        self._total_len = 0
+        self._listeners = []
+        self.last_synced: float | None = None
+        self.last_updated_at: str | None = None
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def upsert(self, job: dict) -> None:
+        job_id = str(job["id"])
+        terms = Counter(tokenize(f"{job.get('title', '')} {job.get('description', '')}"))
+        category = (job.get("job_type") or "").strip().lower()
+        with self._lock:
+            self._remove(job_id)
+            self._doc_terms[job_id] = terms
+            self._doc_len[job_id] = sum(terms.values())
+            self._total_len += self._doc_len[job_id]
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[job_id] = tf
+            self._doc_category[job_id] = category
+            self._doc_updated[job_id] = job_updated_at(job)
+            self._categories.setdefault(category, set()).add(job_id)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            self._remove(str(job_id))
+
+    def category_of(self, job_id: str) -> str | None:
+        with self._lock:
+            return self._doc_category.get(str(job_id))
+
+    def changed_since(self, updated_at: str | None, category: str | None = None) -> list[str]:
+        """Ids of jobs (optionally in a category) created or edited after updated_at."""
+        with self._lock:
+            pool = self._categories.get(category.strip().lower(), set()) if category else self._doc_len.keys()
+            return [job_id for job_id in pool if not updated_at or self._doc_updated.get(job_id, "") > updated_at]
+
+    def on_change(self, listener) -> None:
+        """Call listener(job_id, old_category) for every edit or delete a refresh picks up."""
+        self._listeners.append(listener)
+
+    def score(self, keywords: list[str], job_ids) -> dict[str, float]:
+        """BM25 score of the given jobs only, for delta updates of stored rankings."""
+        terms = _terms(keywords)
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return {}
+            avg_len = self._total_len / n_docs
+            scores = {}
+            for job_id in map(str, job_ids):
+                doc_terms = self._doc_terms.get(job_id)
+                if doc_terms is None:
+                    continue
+                scores[job_id] = 0.0
+                for term in terms:
+                    tf = doc_terms.get(term)
+                    if tf:
+                        scores[job_id] += self._bm25(term, tf, job_id, n_docs, avg_len)
+            return scores
+
+    def search(self, keywords: list[str], category: str | None = None, k: int = 10) -> list[tuple[str, float]]:
+        """Top-k (job_id, score). Jobs in the category without any match pad the list, as before."""
+        terms = _terms(keywords)
+
+        with self._lock:
+            allowed = self._categories.get(category.strip().lower(), set()) if category else None
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: dict[str, float] = {}
+            for term in terms:
+                for job_id, tf in self._postings.get(term, {}).items():
+                    if allowed is not None and job_id not in allowed:
+                        continue
+                    scores[job_id] = scores.get(job_id, 0.0) + self._bm25(term, tf, job_id, n_docs, avg_len)
+
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            if len(top) < k:
+                pool = allowed if allowed is not None else self._doc_len.keys()
+                for job_id in pool:
+                    if len(top) >= k:
+                        break
+                    if job_id not in scores:
+                        top.append((job_id, 0.0))
+            return top
+
+    def refresh(self, client, force: bool = False) -> None:
+        """Full build on first use, then pick up jobs created or edited since the last
+        sync (jobs.updated_at) and drop the ones that were deleted."""
+        if not force and self._fresh():
+            return
+        # Callers wait for the first build; later refreshes run in the background of one caller
+        if not self._sync_lock.acquire(blocking=self.last_synced is None or force):
+            return
+        try:
+            if not force and self._fresh():
+                return
+            incremental = self.last_updated_at is not None and not force
+            jobs = fetch_changed_jobs(client, self.last_updated_at if incremental else None)
+            live = live_job_ids(client) if incremental else {str(job["id"]) for job in jobs}
+            changed = []
+            with self._lock:
+                for job in jobs:
+                    job_id = str(job["id"])
+                    if job_id in self._doc_len and self._doc_updated[job_id] != job_updated_at(job):
+                        changed.append((job_id, self._doc_category[job_id]))
+                    self.upsert(job)
+                    self.last_updated_at = max(self.last_updated_at or "", job_updated_at(job)) or None
+                for job_id in self._doc_len.keys() - live:
+                    changed.append((job_id, self._doc_category[job_id]))
+                    self._remove(job_id)
+            for job_id, old_category in changed:
+                for listener in self._listeners:
+                    listener(job_id, old_category)
+            self.last_synced = time.time()
+        finally:
+            self._sync_lock.release()
+
+    def _fresh(self) -> bool:
+        return self.last_synced is not None and time.time() - self.last_synced < JOB_INDEX_REFRESH
+
+    def _bm25(self, term: str, tf: int, job_id: str, n_docs: int, avg_len: float) -> float:
+        df = len(self._postings[term])
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[job_id] / avg_len)
+        return idf * tf * (BM25_K1 + 1) / norm
+
+    def _remove(self, job_id: str) -> None:
+        terms = self._doc_terms.pop(job_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings:
+                postings.pop(job_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(job_id)
+        category = self._doc_category.pop(job_id)
+        self._doc_updated.pop(job_id, None)
+        self._categories.get(category, set()).discard(job_id)
+
+
+job_index = JobIndex()
@@ -0,0 +1,295 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+from pathlib import Path
+from uuid import uuid4
+
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB") or str(Path(__file__).parent / "job_queue.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "2"))
+# "gemini=2,together=1": max jobs per provider running at the same time
+PROVIDER_LIMITS = os.getenv("PROVIDER_LIMITS", "gemini=2,together=1,ollama=1")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (missing rows, empty CV)."""
+
+
+def parse_limits(spec: str) -> dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class SQLiteJobQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_at)")
+
+    def enqueue(self, kind: str, payload: dict, provider: str = "default",
+                max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        job_id = str(uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, provider, status, max_attempts, run_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), provider, QUEUED, max_attempts, now, now, now),
+            )
+        return job_id
+
+    def claim(self, exclude_providers=()) -> dict | None:
+        now = time.time()
+        excluded = list(exclude_providers)
+        placeholders = ",".join("?" for _ in excluded)
+        query = "SELECT * FROM jobs WHERE status = ? AND run_at <= ?"
+        if excluded:
+            query += f" AND provider NOT IN ({placeholders})"
+        query += " ORDER BY run_at LIMIT 1"
+
+        with self._lock:
+            row = self._conn.execute(query, (QUEUED, now, *excluded)).fetchone()
+            if not row:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, now, row["id"]),
+            )
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def unclaim(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts - 1, updated_at = ? WHERE id = ?",
+                (QUEUED, time.time(), job_id),
+            )
+
+    def complete(self, job_id: str) -> None:
+        self._set(job_id, DONE, None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._set(job_id, FAILED, error)
+
+    def retry(self, job_id: str, error: str, delay: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, run_at = ?, updated_at = ? WHERE id = ?",
+                (QUEUED, error, time.time() + delay, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Put jobs left running by a crashed process back in the queue."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), RUNNING),
+            )
+        return cursor.rowcount
+
+    def pending(self, kind: str) -> list[dict]:
+        """Payloads of the queued and running jobs of one kind."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM jobs WHERE kind = ? AND status IN (?, ?)", (kind, QUEUED, RUNNING)
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def _set(self, job_id: str, status: str, error: str | None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+
+class WorkerPool:
+    def __init__(self, queue: SQLiteJobQueue, workers: int = JOB_WORKERS,
+                 provider_limits: dict[str, int] | None = None,
+                 backoff: float = JOB_BACKOFF_SECONDS, poll_interval: float = 0.5):
+        self.queue = queue
+        self.workers = workers
+        self.provider_limits = provider_limits if provider_limits is not None else parse_limits(PROVIDER_LIMITS)
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._recover = {}
+        self._in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def register(self, kind: str, handler, on_status=None, recover=None) -> None:
+        """handler(payload) does the work and writes its own result.
+
+        on_status(payload, status, error) mirrors the running/queued/failed
+        transitions, e.g. into a status column of the row being processed.
+        recover() lists (payload, provider) for the work the durable store
+        still shows as pending; start() queues the ones this queue doesn't
+        have, e.g. after its file was lost with an ephemeral disk.
+        """
+        self._handlers[kind] = (handler, on_status)
+        if recover is not None:
+            self._recover[kind] = recover
+
+    def submit(self, kind: str, payload: dict, provider: str = "default") -> str:
+        job_id = self.queue.enqueue(kind, payload, provider)
+        self._wake.set()
+        return job_id
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self.queue.requeue_running()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self._recover:
+            # Off the start-up path: it queries the durable store
+            threading.Thread(target=self.recover, name="job-recover", daemon=True).start()
+
+    def recover(self) -> int:
+        """Queue the pending work from every recover() that this queue has lost; returns how many jobs."""
+        recovered = 0
+        for kind, recover in self._recover.items():
+            try:
+                known = self.queue.pending(kind)
+                for payload, provider in recover():
+                    if payload not in known:
+                        self.submit(kind, payload, provider)
+                        known.append(payload)
+                        recovered += 1
+            except Exception as e:
+                print(f"⚠️ Oporavak poslova {kind} nije uspio:", str(e))
+        if recovered:
+            print(f"♻️ Vraćeno u red {recovered} poslova")
+        return recovered
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _saturated(self) -> list[str]:
+        with self._lock:
+            return [
+                provider for provider, limit in self.provider_limits.items()
+                if self._in_flight.get(provider, 0) >= limit
+            ]
+
+    def _acquire(self, provider: str) -> bool:
+        with self._lock:
+            limit = self.provider_limits.get(provider)
+            if limit is not None and self._in_flight.get(provider, 0) >= limit:
+                return False
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+            return True
+
+    def _release(self, provider: str) -> None:
+        with self._lock:
+            self._in_flight[provider] -= 1
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.queue.claim(self._saturated())
+            if not job:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            if not self._acquire(job["provider"]):
+                # Another worker took the last slot between claim and acquire
+                self.queue.unclaim(job["id"])
+                continue
+
+            try:
+                self._execute(job)
+            finally:
+                self._release(job["provider"])
+
+    def _execute(self, job: dict) -> None:
+        handler, on_status = self._handlers.get(job["kind"], (None, None))
+        if handler is None:
+            self.queue.fail(job["id"], f"Nepoznat tip posla: {job['kind']}")
+            return
+
+        def notify(status, error=None):
+            if on_status:
+                try:
+                    on_status(job["payload"], status, error)
+                except Exception as e:
+                    print(f"⚠️ on_status({status}) ERROR:", str(e))
+
+        notify(RUNNING)
+        try:
+            handler(job["payload"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Job {job['kind']} {job['id']} attempt {job['attempts']} failed:", error)
+            if isinstance(e, PermanentJobError) or job["attempts"] >= job["max_attempts"]:
+                if not isinstance(e, PermanentJobError):
+                    traceback.print_exc()
+                self.queue.fail(job["id"], error)
+                notify(FAILED, error)
+            else:
+                delay = self.backoff * 2 ** (job["attempts"] - 1) * random.uniform(0.8, 1.2)
+                self.queue.retry(job["id"], error, delay)
+                notify(QUEUED, error)
+            return
+
+        self.queue.complete(job["id"])
+
+
+job_queue = SQLiteJobQueue(JOB_QUEUE_DB)
+worker_pool = WorkerPool(job_queue)
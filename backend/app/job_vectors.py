@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from app.job_index import JOB_INDEX_REFRESH, fetch_changed_jobs, fold, job_updated_at, live_job_ids
+from app.metrics import log_event
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+JOB_VECTORS_DIR = os.getenv("JOB_VECTORS_DIR") or str(Path(__file__).parent / "job_vectors")
+HASHING_DIM = 512
+
+
+class HashingEmbedder:
+    """Dependency-free fallback: signed hashing of words and character trigrams.
+
+    Catches shared vocabulary and inflections, but not synonyms or translations;
+    install sentence-transformers for that.
+    """
+    name = f"hashing-{HASHING_DIM}"
+    dim = HASHING_DIM
+    semantic = False
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", fold(text)):
+                features = [word] + [word[i:i + 3] for i in range(max(len(word) - 2, 1))]
+                for feature in features:
+                    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                    bucket = int.from_bytes(digest[:4], "little") % self.dim
+                    vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class SentenceEmbedder:
+    """Multilingual sentence-transformers model on CPU."""
+    semantic = True
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def load_embedder():
+    try:
+        return SentenceEmbedder(EMBEDDING_MODEL)
+    except (ImportError, OSError) as e:
+        # Not installed, or the model could not be downloaded: matching still
+        # works, but only on shared words, so this must not go unnoticed
+        print(f"🚨 EMBEDDING MODEL {EMBEDDING_MODEL} NIJE DOSTUPAN ({e!r}): "
+              "semantičko pretraživanje radi samo po riječima (hashing embedder)")
+        log_event("embedder_fallback", model=EMBEDDING_MODEL, error=repr(e))
+        return HashingEmbedder()
+
+
+def job_text(job: dict) -> str:
+    return f"{job.get('title') or ''}\n{job.get('description') or ''}"
+
+
+class JobVectorStore:
+    """Normalized job vectors in a memory-mapped float32 matrix, one row per job."""
+
+    def __init__(self, directory: str, embedder):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._meta_path = self.directory / "meta.json"
+        self._matrix_path = self.directory / "vectors.f32"
+        self.last_synced: float | None = None
+        self.last_updated_at: str | None = None
+        self._load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def upsert_many(self, jobs: list[dict], batch_size: int = 64) -> int:
+        """Embed and store jobs whose title/description changed. Returns how many were embedded."""
+        pending = []
+        for job in jobs:
+            job_id = str(job["id"])
+            digest = hashlib.sha1(job_text(job).encode("utf-8")).hexdigest()
+            category = (job.get("job_type") or "").strip().lower()
+            with self._lock:
+                row = self._rows.get(job_id)
+                if row is not None and self._hashes.get(job_id) == digest:
+                    self._categories[row] = category
+                    continue
+            pending.append((job_id, digest, category, job_text(job)))
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            vectors = self.embedder.embed([text for _, _, _, text in batch])
+            with self._lock:
+                for (job_id, digest, category, _), vector in zip(batch, vectors):
+                    row = self._rows.get(job_id)
+                    if row is None:
+                        row = self._allocate()
+                        self._rows[job_id] = row
+                        self._ids[row] = job_id
+                    self._matrix[row] = vector
+                    self._categories[row] = category
+                    self._hashes[job_id] = digest
+
+        if pending:
+            self._save()
+        return len(pending)
+
+    def remove(self, job_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(str(job_id), None)
+            if row is None:
+                return
+            self._matrix[row] = 0
+            self._ids[row] = None
+            self._categories[row] = ""
+            self._hashes.pop(str(job_id), None)
+            self._free.append(row)
+        self._save()
+
+    def search(self, vector: np.ndarray, category: str | None = None, k: int = 10) -> list[tuple[str, float]]:
+        with self._lock:
+            n = self._size
+            if not n:
+                return []
+            scores = self._matrix[:n] @ vector
+            valid = np.array([job_id is not None for job_id in self._ids[:n]])
+            if category:
+                valid &= np.array(self._categories[:n]) == category.strip().lower()
+            scores = np.where(valid, scores, -np.inf)
+
+            k = min(k, int(valid.sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[row], float(scores[row])) for row in top]
+
+    def refresh(self, client, force: bool = False) -> None:
+        """Same incremental sync as the keyword index; unchanged jobs are not re-embedded."""
+        if not force and self._fresh():
+            return
+        if not self._sync_lock.acquire(blocking=self.last_synced is None or force):
+            return
+        try:
+            if not force and self._fresh():
+                return
+            incremental = self.last_updated_at is not None and not force
+            jobs = fetch_changed_jobs(client, self.last_updated_at if incremental else None)
+            live = live_job_ids(client) if incremental else {str(job["id"]) for job in jobs}
+            self.upsert_many(jobs)
+            # Vectors loaded from disk may belong to jobs deleted while the process was down
+            with self._lock:
+                deleted = self._rows.keys() - live
+            for job_id in deleted:
+                self.remove(job_id)
+            for job in jobs:
+                self.last_updated_at = max(self.last_updated_at or "", job_updated_at(job)) or None
+            self.last_synced = time.time()
+        finally:
+            self._sync_lock.release()
+
+    def _fresh(self) -> bool:
+        return self.last_synced is not None and time.time() - self.last_synced < JOB_INDEX_REFRESH
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._size == self._capacity:
+            self._grow(max(self._capacity * 2, 1024))
+        row = self._size
+        self._size += 1
+        self._ids.append(None)
+        self._categories.append("")
+        return row
+
+    def _grow(self, capacity: int) -> None:
+        self._matrix.flush()
+        del self._matrix
+        with open(self._matrix_path, "r+b") as f:
+            f.truncate(capacity * self.embedder.dim * 4)
+        self._capacity = capacity
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.embedder.dim))
+
+    def _load(self) -> None:
+        meta = json.loads(self._meta_path.read_text()) if self._meta_path.exists() else {}
+        if meta.get("model") != self.embedder.name or not self._matrix_path.exists():
+            # New store, or vectors from a different model: start over
+            meta = {"model": self.embedder.name, "ids": [], "categories": [], "hashes": {}}
+            self._matrix_path.write_bytes(b"")
+        self._ids: list[str | None] = meta["ids"]
+        self._categories: list[str] = meta["categories"]
+        self._hashes: dict[str, str] = meta["hashes"]
+        self._rows = {job_id: row for row, job_id in enumerate(self._ids) if job_id is not None}
+        self._free = [row for row, job_id in enumerate(self._ids) if job_id is None]
+        self._size = len(self._ids)
+        self._capacity = max(self._size, 1024)
+        with open(self._matrix_path, "r+b") as f:
+            f.truncate(self._capacity * self.embedder.dim * 4)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.embedder.dim))
+
+    def _save(self) -> None:
+        with self._lock:
+            self._matrix.flush()
+            meta = {"model": self.embedder.name, "ids": self._ids, "categories": self._categories, "hashes": self._hashes}
+            tmp = self._meta_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(meta))
+            tmp.replace(self._meta_path)
+
+
+_store: JobVectorStore | None = None
+_store_lock = threading.Lock()
+_cv_vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+
+
+def get_job_vectors() -> JobVectorStore:
+    """The store (and the embedding model) is loaded on first semantic request."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobVectorStore(JOB_VECTORS_DIR, load_embedder())
+        return _store
+
+
+def embed_cv(cv_text: str) -> np.ndarray:
+    key = hashlib.sha1(cv_text.encode("utf-8")).hexdigest()
+    with _store_lock:
+        if key in _cv_vectors:
+            _cv_vectors.move_to_end(key)
+            return _cv_vectors[key]
+    vector = get_job_vectors().embedder.embed([cv_text])[0]
+    with _store_lock:
+        _cv_vectors[key] = vector
+        while len(_cv_vectors) > 256:
+            _cv_vectors.popitem(last=False)
+    return vector
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from app.metrics import add_span, LLM_CACHE_HITS
+
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB") or str(Path(__file__).parent / "llm_cache.db")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Indentation and blank-line differences in the f-string prompts don't change the answer
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+class LLMCache:
+    def __init__(self, max_entries: int, ttl: float, db_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, key TEXT NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag)")
+
+    @staticmethod
+    def key(model: str, prompt: str, variant: str = "") -> str:
+        raw = f"{model}\0{variant}\0{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            row = None
+            if self._conn:
+                row = self._conn.execute(
+                    "SELECT response, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            if row:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, tags=()) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            if self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at),
+                )
+                self._conn.executemany("INSERT INTO tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every response that was stored under tag (e.g. "user:<id>")."""
+        with self._lock:
+            keys = self._tags.pop(tag, set())
+            if self._conn:
+                keys |= {row[0] for row in self._conn.execute("SELECT key FROM tags WHERE tag = ?", (tag,))}
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+                self._conn.execute("DELETE FROM tags WHERE tag = ?", (tag,))
+            for key in keys:
+                self._memory.pop(key, None)
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+llm_cache = LLMCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_DB)
+
+
+def record_cache_hit(variant: str) -> None:
+    variant = variant.split(":", 1)[0] or "text"
+    LLM_CACHE_HITS.inc(variant=variant)
+    add_span("llm.cache_hit", 0, variant=variant)
+
+
+def cached_generate(model: str, prompt: str, call, tags=(), variant: str = "", parse=None, accept=None):
+    """Return call()'s text for this (model, prompt), calling the LLM only on a miss.
+
+    With parse, the parsed value is returned and a response is only cached
+    once it parses, so a malformed answer is retried instead of replayed.
+    With accept, a response is only cached when accept(response) is true.
+    """
+    key = llm_cache.key(model, prompt, variant)
+    response = llm_cache.get(key)
+    if response is not None:
+        record_cache_hit(variant)
+        return parse(response) if parse else response
+
+    response = call()
+    result = parse(response) if parse else response
+    if accept is None or accept(response):
+        llm_cache.put(key, response, tags)
+    return result
+
+
+async def cached_generate_async(model: str, prompt: str, call, tags=(), variant: str = "", parse=None,
+                                accept=None):
+    key = llm_cache.key(model, prompt, variant)
+    response = llm_cache.get(key)
+    if response is not None:
+        record_cache_hit(variant)
+        return parse(response) if parse else response
+
+    response = await call()
+    result = parse(response) if parse else response
+    if accept is None or accept(response):
+        llm_cache.put(key, response, tags)
+    return result
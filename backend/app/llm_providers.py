@@ -0,0 +1,599 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+from dotenv import load_dotenv
+from app.llm_cache import llm_cache, cached_generate, cached_generate_async, record_cache_hit
+from app.compaction import estimate_tokens
+from app.metrics import record_llm
+
+env_path = Path(__file__).parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+# Single configuration point: provider order, per-call timeout and hedging delay
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "gemini,together")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "20"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
+TOGETHER_MODEL = os.getenv("TOGETHER_MODEL", "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+
+
+class LLMError(Exception):
+    pass
+
+
+# "name:model" of every provider that answered inside record_answers(), so a
+# scored row is stamped with the model that produced it, not the configured one
+_answers: contextvars.ContextVar[list | None] = contextvars.ContextVar("llm_answers", default=None)
+
+
+@contextmanager
+def record_answers():
+    """Collect the providers that answer the router's calls made in this block (and its tasks)."""
+    answers = []
+    token = _answers.set(answers)
+    try:
+        yield answers
+    finally:
+        _answers.reset(token)
+
+
+def _record_answer(provider) -> None:
+    answers = _answers.get()
+    if answers is not None:
+        answers.append(f"{provider.name}:{provider.model}")
+
+
+class Usage(NamedTuple):
+    tokens_in: int
+    tokens_out: int
+
+
+def usage(tokens_in, tokens_out) -> Usage | None:
+    """The usage a response reported, or None when it had none."""
+    if tokens_in is None or tokens_out is None:
+        return None
+    return Usage(int(tokens_in), int(tokens_out))
+
+
+class Completion(str):
+    """A provider's answer, carrying the token usage its response reported.
+
+    Usage travels with the return value rather than through a contextvar, so
+    it survives asyncio.to_thread and executor hops. Streams yield a Usage
+    after their last chunk instead.
+    """
+
+    def __new__(cls, text: str, usage: Usage | None = None):
+        completion = super().__new__(cls, text)
+        completion.usage = usage
+        return completion
+
+
+def pooled_session(pool_size: int = 10):
+    # requests is only needed by the HTTP providers, so it isn't paid for at import
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class LLMProvider:
+    name = "base"
+
+    def __init__(self, model: str, timeout: float = LLM_TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+
+    def generate(self, prompt: str, schema: dict | None = None, system: str | None = None) -> str:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, schema: dict | None = None, system: str | None = None) -> str:
+        return await asyncio.to_thread(self.generate, prompt, schema, system)
+
+    def stream(self, prompt: str, system: str | None = None, schema: dict | None = None):
+        """Yield text chunks as the model produces them, then the Usage if the response reported one."""
+        text = self.generate(prompt, schema, system)
+        yield str(text)
+        if getattr(text, "usage", None):
+            yield text.usage
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_MODEL, timeout: float = LLM_TIMEOUT):
+        super().__init__(model, timeout)
+        import google.generativeai as genai
+
+        self._genai = genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, system: str | None):
+        with self._lock:
+            if system not in self._models:
+                self._models[system] = self._genai.GenerativeModel(self.model, system_instruction=system)
+            return self._models[system]
+
+    def _config(self, schema: dict | None):
+        if not schema:
+            return None
+        return self._genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+    @staticmethod
+    def _usage(response) -> Usage | None:
+        metadata = getattr(response, "usage_metadata", None)
+        if not metadata:
+            return None
+        return usage(metadata.prompt_token_count, metadata.candidates_token_count)
+
+    def generate(self, prompt, schema=None, system=None):
+        response = self._model(system).generate_content(
+            prompt, generation_config=self._config(schema), request_options={"timeout": self.timeout}
+        )
+        return Completion(response.text, self._usage(response))
+
+    async def agenerate(self, prompt, schema=None, system=None):
+        response = await self._model(system).generate_content_async(
+            prompt, generation_config=self._config(schema), request_options={"timeout": self.timeout}
+        )
+        return Completion(response.text, self._usage(response))
+
+    def stream(self, prompt, system=None, schema=None):
+        response = self._model(system).generate_content(
+            prompt, stream=True, generation_config=self._config(schema), request_options={"timeout": self.timeout}
+        )
+        reported = None
+        for chunk in response:
+            # Every chunk carries the running totals; the last one counts the whole answer
+            reported = self._usage(chunk) or reported
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without parts (e.g. the final safety/usage chunk)
+                continue
+            if text:
+                yield text
+        if reported:
+            yield reported
+
+
+class TogetherProvider(LLMProvider):
+    name = "together"
+    url = "https://api.together.xyz/v1/chat/completions"
+
+    def __init__(self, model: str = TOGETHER_MODEL, timeout: float = LLM_TIMEOUT):
+        super().__init__(model, timeout)
+        self.session = pooled_session()
+        self.session.headers["Authorization"] = f"Bearer {os.getenv('TOGETHER_API_KEY')}"
+
+    def _payload(self, prompt, system):
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return {"model": self.model, "messages": messages}
+
+    def generate(self, prompt, schema=None, system=None):
+        payload = self._payload(prompt, system)
+        if schema:
+            payload["response_format"] = {"type": "json_object", "schema": schema}
+
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        reported = data.get("usage") or {}
+        return Completion(
+            data["choices"][0]["message"]["content"],
+            usage(reported.get("prompt_tokens"), reported.get("completion_tokens")),
+        )
+
+    def stream(self, prompt, system=None, schema=None):
+        payload = {**self._payload(prompt, system), "stream": True}
+        if schema:
+            payload["response_format"] = {"type": "json_object", "schema": schema}
+        reported = None
+        with self.session.post(self.url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                # The last chunk before [DONE] carries the usage of the whole answer
+                totals = event.get("usage") or {}
+                reported = usage(totals.get("prompt_tokens"), totals.get("completion_tokens")) or reported
+                choices = event.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield text
+        if reported:
+            yield reported
+
+
+class OllamaProvider(LLMProvider):
+    name = "ollama"
+
+    def __init__(self, model: str = OLLAMA_MODEL, timeout: float = LLM_TIMEOUT, url: str = OLLAMA_URL):
+        super().__init__(model, timeout)
+        self.url = url
+        self.session = pooled_session()
+
+    def generate(self, prompt, schema=None, system=None):
+        payload = {"model": self.model, "prompt": prompt, "stream": False}
+        if system:
+            payload["system"] = system
+        if schema:
+            payload["format"] = schema
+
+        response = self.session.post(f"{self.url}/api/generate", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return Completion(data.get("response", ""), usage(data.get("prompt_eval_count"), data.get("eval_count")))
+
+    def stream(self, prompt, system=None, schema=None):
+        payload = {"model": self.model, "prompt": prompt, "stream": True}
+        if system:
+            payload["system"] = system
+        if schema:
+            payload["format"] = schema
+
+        with self.session.post(f"{self.url}/api/generate", json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    reported = usage(data.get("prompt_eval_count"), data.get("eval_count"))
+                    if reported:
+                        yield reported
+                    return
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline provider for tests and benchmarks."""
+    name = "fake"
+
+    def __init__(self, model: str = "fake", timeout: float = LLM_TIMEOUT, latency: float = FAKE_LLM_LATENCY):
+        super().__init__(model, timeout)
+        self.latency = latency
+        self.calls = 0
+
+    def generate(self, prompt, schema=None, system=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(prompt, schema)
+
+    async def agenerate(self, prompt, schema=None, system=None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(prompt, schema)
+
+    def stream(self, prompt, system=None, schema=None):
+        self.calls += 1
+        words = self.respond(prompt, schema).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                time.sleep(self.latency / len(words))
+            yield word if i == len(words) - 1 else word + " "
+
+    def respond(self, prompt: str, schema: dict | None) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        score = round(digest[0] / 255 * 10, 1)
+        if schema:
+            return json.dumps(self._sample(schema, digest))
+        return f"{score}\n1. Kompetencije:\nTestna analiza.\n"
+
+    def _sample(self, schema: dict, digest: bytes):
+        kind = schema.get("type")
+        if "enum" in schema:
+            return schema["enum"][digest[1] % len(schema["enum"])]
+        if kind == "object":
+            return {key: self._sample(value, digest) for key, value in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._sample(schema["items"], digest)]
+        if kind in ("number", "integer"):
+            return round(digest[0] / 255 * 10, 1)
+        if kind == "boolean":
+            return bool(digest[2] % 2)
+        return "test"
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "together": TogetherProvider,
+    "ollama": OllamaProvider,
+    "fake": FakeProvider,
+}
+
+
+class LLMRouter:
+    """Calls providers in order, hedging to the next one when a call is slow or fails.
+
+    Responses are cached under the primary provider's model, so only the
+    primary's answers are stored; a fallback's answer is used but not kept.
+    """
+
+    def __init__(self, providers: list[LLMProvider], hedge_after: float = LLM_HEDGE_AFTER):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+    @property
+    def primary(self) -> LLMProvider:
+        return self.providers[0]
+
+    def generate(self, prompt: str, schema: dict | None = None, system: str | None = None,
+                 tags=(), variant: str = "", parse=None):
+        answered = []
+
+        def call():
+            provider, text = self._generate(prompt, schema, system, variant)
+            answered.append(provider)
+            return text
+
+        result = cached_generate(
+            self.primary.model, self._cache_text(prompt, system), call,
+            tags=tags, variant=self._variant(variant, schema), parse=parse,
+            accept=lambda text: answered[0] is self.primary,
+        )
+        # Nothing answered: a cache hit, and only the primary's answers are cached
+        _record_answer(answered[0] if answered else self.primary)
+        return result
+
+    async def agenerate(self, prompt: str, schema: dict | None = None, system: str | None = None,
+                        tags=(), variant: str = "", parse=None):
+        answered = []
+
+        async def call():
+            provider, text = await self._agenerate(prompt, schema, system, variant)
+            answered.append(provider)
+            return text
+
+        result = await cached_generate_async(
+            self.primary.model, self._cache_text(prompt, system), call,
+            tags=tags, variant=self._variant(variant, schema), parse=parse,
+            accept=lambda text: answered[0] is self.primary,
+        )
+        _record_answer(answered[0] if answered else self.primary)
+        return result
+
+    def stream(self, prompt: str, system: str | None = None, tags=(), variant: str = "",
+               schema: dict | None = None, accept=None):
+        """Yield text chunks; cache hits come as one chunk.
+
+        Waiting for the first chunk is hedged like _generate: when it hasn't
+        arrived after hedge_after (or the stream failed before it), the next
+        provider's stream is started too and whichever speaks first is
+        followed. Once a chunk has been yielded there is no failover; an
+        error mid-answer is raised. With accept, the full text is only cached
+        when accept(text) is true.
+        """
+        key = llm_cache.key(self.primary.model, self._cache_text(prompt, system), self._variant(variant, schema))
+        cached = llm_cache.get(key)
+        if cached is not None:
+            record_cache_hit(variant)
+            _record_answer(self.primary)
+            yield cached
+            return
+
+        events = queue.Queue()
+        running = set()
+        remaining = list(self.providers)
+        winner = None
+        stop = threading.Event()
+        errors = []
+
+        def pump(provider):
+            started = time.perf_counter()
+            chunks = provider.stream(prompt, system, schema)
+            try:
+                for chunk in chunks:
+                    if stop.is_set() or winner not in (None, provider):
+                        record_llm(provider.name, variant, time.perf_counter() - started, "cancelled",
+                                   self._tokens(prompt, system))
+                        return
+                    events.put((provider, chunk, None, started))
+            except Exception as e:
+                events.put((provider, None, e, started))
+                return
+            finally:
+                chunks.close()
+            events.put((provider, None, None, started))
+
+        def launch():
+            provider = remaining.pop(0)
+            running.add(provider)
+            # A daemon thread per stream: a slow stream would otherwise hold an executor worker
+            threading.Thread(
+                target=contextvars.copy_context().run, args=(pump, provider),
+                name=f"llm-stream-{provider.name}", daemon=True,
+            ).start()
+
+        launch()
+        parts = []
+        reported = None
+        try:
+            while True:
+                try:
+                    provider, chunk, error, started = events.get(
+                        timeout=self.hedge_after if winner is None and remaining else None
+                    )
+                except queue.Empty:
+                    launch()
+                    continue
+                if winner not in (None, provider):
+                    continue
+                if error is not None:
+                    running.discard(provider)
+                    record_llm(provider.name, variant, time.perf_counter() - started, "error",
+                               self._tokens(prompt, system), estimate_tokens("".join(parts)))
+                    if winner is not None:
+                        raise error
+                    print(f"⚠️ LLM provider {provider.name} failed:", str(error))
+                    errors.append(f"{provider.name}: {error}")
+                    if not running:
+                        if not remaining:
+                            raise LLMError("; ".join(errors))
+                        launch()
+                    continue
+                winner = provider
+                if isinstance(chunk, Usage):
+                    reported = chunk
+                elif chunk is not None:
+                    parts.append(chunk)
+                    yield chunk
+                else:
+                    break
+        finally:
+            # Losing (or abandoned) streams stop at their next chunk
+            stop.set()
+
+        text = "".join(parts)
+        record_llm(provider.name, variant, time.perf_counter() - started, "ok",
+                   *(reported or (self._tokens(prompt, system), estimate_tokens(text))))
+        _record_answer(provider)
+        if provider is self.primary and (accept is None or accept(text)):
+            llm_cache.put(key, text, tags)
+
+    @staticmethod
+    def _cache_text(prompt: str, system: str | None) -> str:
+        return f"{system}\n\n{prompt}" if system else prompt
+
+    @staticmethod
+    def _variant(variant: str, schema: dict | None) -> str:
+        return f"{variant}:{json.dumps(schema, sort_keys=True)}" if schema else variant
+
+    @staticmethod
+    def _tokens(prompt: str, system: str | None) -> int:
+        return estimate_tokens(prompt) + (estimate_tokens(system) if system else 0)
+
+    def _token_counts(self, prompt: str, system: str | None, text: str) -> tuple[int, int]:
+        """(tokens_in, tokens_out) as the provider reported them, else estimated."""
+        return getattr(text, "usage", None) or (self._tokens(prompt, system), estimate_tokens(text))
+
+    def _timed_generate(self, provider, prompt, schema, system, variant):
+        started = time.perf_counter()
+        try:
+            text = provider.generate(prompt, schema, system)
+        except Exception:
+            record_llm(provider.name, variant, time.perf_counter() - started, "error", self._tokens(prompt, system))
+            raise
+        record_llm(provider.name, variant, time.perf_counter() - started, "ok",
+                   *self._token_counts(prompt, system, text))
+        return str(text)
+
+    async def _timed_agenerate(self, provider, prompt, schema, system, variant):
+        started = time.perf_counter()
+        try:
+            text = await provider.agenerate(prompt, schema, system)
+        except Exception:
+            record_llm(provider.name, variant, time.perf_counter() - started, "error", self._tokens(prompt, system))
+            raise
+        record_llm(provider.name, variant, time.perf_counter() - started, "ok",
+                   *self._token_counts(prompt, system, text))
+        return str(text)
+
+    def _generate(self, prompt, schema, system, variant=""):
+        pending = {}
+        errors = []
+        remaining = list(self.providers)
+
+        def launch():
+            provider = remaining.pop(0)
+            # Run in a copy of the caller's context, so the call lands in its trace
+            future = self._executor.submit(
+                contextvars.copy_context().run, self._timed_generate, provider, prompt, schema, system, variant
+            )
+            pending[future] = provider
+
+        launch()
+        while pending:
+            done, _ = wait(pending, timeout=self.hedge_after if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    return provider, future.result()
+                except Exception as e:
+                    print(f"⚠️ LLM provider {provider.name} failed:", str(e))
+                    errors.append(f"{provider.name}: {e}")
+            if not pending and remaining:
+                launch()
+        raise LLMError("; ".join(errors))
+
+    async def _agenerate(self, prompt, schema, system, variant=""):
+        pending = {}
+        errors = []
+        remaining = list(self.providers)
+
+        def launch():
+            provider = remaining.pop(0)
+            pending[asyncio.ensure_future(self._timed_agenerate(provider, prompt, schema, system, variant))] = provider
+
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_after if remaining else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        return provider, task.result()
+                    except Exception as e:
+                        print(f"⚠️ LLM provider {provider.name} failed:", str(e))
+                        errors.append(f"{provider.name}: {e}")
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise LLMError("; ".join(errors))
+
+
+def build_router(names: str = LLM_PROVIDERS) -> LLMRouter:
+    providers = [PROVIDERS[name.strip()]() for name in names.split(",") if name.strip()]
+    if not providers:
+        raise LLMError("LLM_PROVIDERS je prazan")
+    return LLMRouter(providers)
+
+
+_routers: dict[str, LLMRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_llm(names: str = LLM_PROVIDERS) -> LLMRouter:
+    """One shared router (and so one set of pooled sessions) per provider chain."""
+    with _routers_lock:
+        if names not in _routers:
+            _routers[names] = build_router(names)
+        return _routers[names]
@@ -1,28 +1,63 @@
-from fastapi import FastAPI, UploadFile, File, Form
+import time
+
+# Everything below, up to the app object, counts as import time in /startup
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from docx import Document
-import pdfplumber
-#from io import BytesIO
-#import pytesseract
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.gemini import router as gemini_router
-from pathlib import Path
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from app.batch_analysis import router as batch_router
+from app.applications import router as applications_router
+from app.statistics import router as statistics_router
+from app.document_parser import shutdown_pool
+from app.job_queue import worker_pool
+from app.cv_cache import cv_text_cache
+from app.llm_cache import llm_cache
+from app.compaction import compaction_stats
+from app.signed_urls import signed_url_cache
+from app.admission import analysis_flights
+from app import metrics
+from app.startup import startup_report, start_warm_up
+from contextlib import asynccontextmanager
 import os
 
-# OCR setup
-#pytesseract.pytesseract.tesseract_cmd = r"C:\Tesseract\tesseract.exe"
-#os.environ["TESSDATA_PREFIX"] = r"C:\Tesseract"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_report.phase("lifespan"):
+        worker_pool.start()
+    startup_report.mark_ready()
+    # Supabase, the LLM router, parser workers and job vectors are created on
+    # first use; the warm-up only gets there before the first request does
+    start_warm_up()
+    yield
+    worker_pool.stop()
+    shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+startup_report.record("import", time.perf_counter() - _import_started)
 
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
+# Send "X-Trace: 1" (or set METRICS_TRACE=1) to get a Server-Timing header with the request's stages
+METRICS_TRACE = os.getenv("METRICS_TRACE") == "1"
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-app = FastAPI()
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    started = time.perf_counter()
+    with metrics.tracing() as spans:
+        response = await call_next(request)
+        if METRICS_TRACE or request.headers.get("x-trace"):
+            response.headers["Server-Timing"] = metrics.server_timing(spans)
+    route = request.scope.get("route")
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
 
 # CORS for frontend
 app.add_middleware(
@@ -37,12 +72,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.get("/applications/by_hr/{hr_id}")
-def get_applications_by_hr(hr_id: str):
-    response = supabase.from_("application_analysis").select(
-        "*, jobs(*), users(*)"
-    ).eq("jobs.hr_id", hr_id).execute()
-    return response.data
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "cv_text": cv_text_cache.stats(),
+        "llm": llm_cache.stats(),
+        "prompt_compaction": compaction_stats(),
+        "signed_urls": signed_url_cache.stats(),
+        "analyze_admission": analysis_flights.stats(),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/startup")
+def startup():
+    return startup_report.as_dict()
 
 @app.get("/")
 def root():
@@ -50,3 +96,6 @@ def root():
 
 # routes
 app.include_router(gemini_router)
+app.include_router(batch_router)
+app.include_router(applications_router)
+app.include_router(statistics_router)
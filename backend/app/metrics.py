@@ -0,0 +1,279 @@
+import contextvars
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Hot-path timings and token accounting, rendered in the Prometheus text format
+# on /metrics. span() also records into the current trace, if one is active, so
+# a request or an analysis can report where its time went.
+
+# USD per million input:output tokens, per provider
+LLM_PRICES = os.getenv("LLM_PRICES", "gemini=0.30:2.50,together=0:0,ollama=0:0,fake=0:0")
+
+INF = 'le="+Inf"'
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def parse_prices(spec: str) -> dict[str, tuple[float, float]]:
+    prices = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            input_price, _, output_price = value.partition(":")
+            prices[name.strip()] = (float(input_price or 0), float(output_price or 0))
+    return prices
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # labels -> [count per bucket..., sum, count]
+        self._values: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, row in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, row):
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {count:g}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, INF)} {row[-1]:g}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {row[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {row[-1]:g}")
+        return lines
+
+
+HTTP_SECONDS = Histogram("cv_http_request_seconds", "HTTP request latency", ("method", "route", "status"))
+DB_SECONDS = Histogram("cv_db_query_seconds", "Supabase table query latency", ("table", "op"))
+STORAGE_SECONDS = Histogram("cv_storage_seconds", "Supabase storage call latency", ("bucket", "op"))
+PARSE_SECONDS = Histogram("cv_parse_seconds", "CV text extraction latency per document", ("mime",))
+PARSE_PAGE_SECONDS = Histogram("cv_parse_page_seconds", "Text layer or OCR latency per page", ("mime", "method"))
+LLM_SECONDS = Histogram("cv_llm_request_seconds", "LLM provider call latency", ("provider", "variant", "outcome"))
+LLM_TOKENS = Counter("cv_llm_tokens_total", "LLM tokens (estimated), by direction", ("provider", "variant", "direction"))
+LLM_COST = Counter("cv_llm_cost_usd_total", "Estimated LLM spend in USD (LLM_PRICES)", ("provider",))
+LLM_CACHE_HITS = Counter("cv_llm_cache_hits_total", "LLM answers served from the response cache", ("variant",))
+MATCH_SECONDS = Histogram("cv_matching_seconds", "Job matching latency", ("mode",))
+ANALYSIS_SECONDS = Histogram("cv_analysis_seconds", "End-to-end analysis job latency", ("outcome",))
+ANALYZE_REQUESTS = Counter("cv_analyze_requests_total", "/analyze-cv requests by outcome (started, joined, existing, rejected_*)", ("outcome",))
+
+REGISTRY = [
+    HTTP_SECONDS, DB_SECONDS, STORAGE_SECONDS, PARSE_SECONDS, PARSE_PAGE_SECONDS,
+    LLM_SECONDS, LLM_TOKENS, LLM_COST, LLM_CACHE_HITS, MATCH_SECONDS, ANALYSIS_SECONDS, ANALYZE_REQUESTS,
+]
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+_prices = parse_prices(LLM_PRICES)
+
+
+def record_llm(provider: str, variant: str, seconds: float, outcome: str,
+               tokens_in: int = 0, tokens_out: int = 0) -> None:
+    """One provider call: latency, tokens and cost, plus a span in the current trace."""
+    variant = variant.split(":", 1)[0] or "text"
+    LLM_SECONDS.observe(seconds, provider=provider, variant=variant, outcome=outcome)
+    input_price, output_price = _prices.get(provider, (0.0, 0.0))
+    cost = (tokens_in * input_price + tokens_out * output_price) / 1_000_000
+    if tokens_in or tokens_out:
+        LLM_TOKENS.inc(tokens_in, provider=provider, variant=variant, direction="input")
+        LLM_TOKENS.inc(tokens_out, provider=provider, variant=variant, direction="output")
+        LLM_COST.inc(cost, provider=provider)
+    add_span(f"llm.{provider}", seconds, variant=variant, outcome=outcome,
+             tokens_in=tokens_in, tokens_out=tokens_out, cost_usd=cost)
+
+
+# The spans of the request or job running in this context, or None when not tracing
+_trace: contextvars.ContextVar[list | None] = contextvars.ContextVar("trace", default=None)
+
+
+@contextmanager
+def tracing():
+    """Collect the spans recorded inside the block (including threads started via to_thread)."""
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def add_span(name: str, seconds: float, **attrs) -> None:
+    spans = _trace.get()
+    if spans is not None:
+        spans.append({"name": name, "ms": round(seconds * 1000, 3), **attrs})
+
+
+@contextmanager
+def span(name: str, histogram: Histogram | None = None, **labels):
+    """Time the block into histogram{labels} and the current trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+        add_span(name, elapsed, **labels)
+
+
+def stage_totals(spans: list[dict]) -> dict[str, float]:
+    totals = {}
+    for item in spans:
+        totals[item["name"]] = round(totals.get(item["name"], 0) + item["ms"], 3)
+    return totals
+
+
+def server_timing(spans: list[dict]) -> str:
+    """Server-Timing header value, so browser dev tools show the stages of a request."""
+    return ", ".join(f"{name.replace(' ', '_')};dur={ms}" for name, ms in stage_totals(spans).items())
+
+
+def log_event(event: str, **fields) -> None:
+    """One JSON line per event, for log search."""
+    print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, ensure_ascii=False, default=str), flush=True)
+
+
+class _TracedQuery:
+    """Wraps a postgrest request builder; execute() (sync or awaited) is timed per table and operation."""
+
+    OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+
+    def __init__(self, builder, table: str, op: str = "select"):
+        self._builder = builder
+        self._table = table
+        self._op = op
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            # e.g. the not_ modifier, which is a builder property
+            return _TracedQuery(attr, self._table, self._op) if hasattr(attr, "execute") else attr
+        op = name if name in self.OPERATIONS else self._op
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _TracedQuery(result, self._table, op) if hasattr(result, "execute") else result
+
+        return chain
+
+    def _execute(self, *args, **kwargs):
+        return _timed_call(self._builder.execute, args, kwargs, DB_SECONDS, f"db.{self._op} {self._table}",
+                           table=self._table, op=self._op)
+
+
+class _TracedBucket:
+    def __init__(self, bucket, name: str):
+        self._bucket = bucket
+        self._name = name
+
+    def __getattr__(self, name):
+        attr = getattr(self._bucket, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return _timed_call(attr, args, kwargs, STORAGE_SECONDS, f"storage.{name}", bucket=self._name, op=name)
+
+        return call
+
+
+class _TracedStorage:
+    def __init__(self, storage):
+        self._storage = storage
+
+    def from_(self, bucket: str):
+        return _TracedBucket(self._storage.from_(bucket), bucket)
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+
+class InstrumentedClient:
+    """A Supabase client (sync, async or the fake) whose queries and storage calls are timed."""
+
+    def __init__(self, client):
+        self._client = client
+        self.storage = _TracedStorage(client.storage)
+
+    def table(self, name: str):
+        return _TracedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _timed_call(fn, args, kwargs, histogram: Histogram, span_name: str, **labels):
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException:
+        _observe(histogram, span_name, started, labels)
+        raise
+    if inspect.isawaitable(result):
+        async def awaited():
+            try:
+                return await result
+            finally:
+                _observe(histogram, span_name, started, labels)
+
+        return awaited()
+    _observe(histogram, span_name, started, labels)
+    return result
+
+
+def _observe(histogram: Histogram, span_name: str, started: float, labels: dict) -> None:
+    elapsed = time.perf_counter() - started
+    histogram.observe(elapsed, **labels)
+    add_span(span_name, elapsed)
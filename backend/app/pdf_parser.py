@@ -1,25 +1,12 @@
-import pdfplumber
-import pytesseract
-from PIL import Image
-import os
-
-pytesseract.pytesseract.tesseract_cmd = r'C:\Tesseract\tesseract.exe'
-
-os.environ['TESSDATA_PREFIX'] = r'C:\Tesseract'
+from app.document_parser import PDF, extract_text, mime_for
 
 def parse_pdf(file_path: str):
-    with pdfplumber.open(file_path) as pdf:
-        text = ""
-        for page in pdf.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-    return text
+    with open(file_path, "rb") as f:
+        return extract_text(f.read(), PDF)
 
 def parse_image(image_path: str):
-    image = Image.open(image_path)
-    text = pytesseract.image_to_string(image)
-    return text
+    with open(image_path, "rb") as f:
+        return extract_text(f.read(), mime_for(image_path))
 
 def main():
     pdf_path = 'parser_test/Nedim CV - LX.pdf'
@@ -34,4 +21,4 @@ def main():
     print(image_text if image_text.strip() else "Slika možda nema prepoznatljiv tekst.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
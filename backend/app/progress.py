@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+# Status transitions and LLM tokens for running analyses, fanned out to SSE
+# subscribers. Worker threads publish; the event loop consumes.
+TERMINAL_EVENTS = ("done", "failed")
+PROGRESS_TTL = 600
+
+
+class ProgressBroker:
+    def __init__(self, ttl: float = PROGRESS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._channels: dict[str, dict] = {}
+
+    def publish(self, channel: str, event: str, data: dict | None = None) -> None:
+        data = data or {}
+        with self._lock:
+            self._prune()
+            state = self._channels.setdefault(channel, {"events": [], "text": [], "subscribers": set(), "finished_at": None})
+            if event == "token":
+                state["text"].append(data.get("text", ""))
+            else:
+                if event == "generating":
+                    # A retried generation starts over
+                    state["text"] = []
+                state["events"].append((event, data))
+            if event in TERMINAL_EVENTS:
+                state["finished_at"] = time.time()
+            subscribers = list(state["subscribers"])
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def known(self, channel: str) -> bool:
+        with self._lock:
+            return channel in self._channels
+
+    async def subscribe(self, channel: str, heartbeat: float = 15):
+        """Yield (event, data), replaying what was already published, until a terminal event.
+
+        Yields (None, None) every heartbeat seconds without news, so callers
+        can keep the connection alive.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (loop, queue)
+
+        with self._lock:
+            state = self._channels.setdefault(channel, {"events": [], "text": [], "subscribers": set(), "finished_at": None})
+            replay = list(state["events"])
+            text = "".join(state["text"])
+            state["subscribers"].add(subscriber)
+
+        try:
+            for event, data in replay:
+                if event in TERMINAL_EVENTS:
+                    yield event, data
+                    return
+                yield event, data
+            if text:
+                yield "token", {"text": text}
+
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None, None
+                    continue
+                yield event, data
+                if event in TERMINAL_EVENTS:
+                    return
+        finally:
+            with self._lock:
+                state["subscribers"].discard(subscriber)
+
+    def _prune(self) -> None:
+        now = time.time()
+        expired = [
+            channel for channel, state in self._channels.items()
+            if state["finished_at"] and now - state["finished_at"] > self.ttl and not state["subscribers"]
+        ]
+        for channel in expired:
+            del self._channels[channel]
+
+
+progress = ProgressBroker()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from app.job_index import job_index
+
+# Materialized top-N per user in public.user_recommendations. Rows are rebuilt
+# when the user's keywords/category change, when a listed job was deleted or
+# moved category, and after RECOMMENDATIONS_MAX_AGE seconds (stored BM25 scores
+# drift as the corpus' IDF does); new or edited jobs are scored on their own and
+# merged into the stored lists of users in their category.
+RECOMMENDATIONS_TOP_N = int(os.getenv("RECOMMENDATIONS_TOP_N", "10"))
+RECOMMENDATIONS_MAX_AGE = float(os.getenv("RECOMMENDATIONS_MAX_AGE", "3600"))
+TABLE = "user_recommendations"
+
+
+def profile_hash(keywords: list, category: str) -> str:
+    raw = json.dumps([(category or "").strip().lower(), sorted(keywords or [])], ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def recompute(client, user_id: str, keywords: list, category: str) -> list[tuple[str, float]]:
+    job_index.refresh(client)
+    ranked = job_index.search(keywords, category, RECOMMENDATIONS_TOP_N)
+    _store(client, [_row(user_id, keywords, category, ranked)])
+    return ranked
+
+
+def recommended(client, user_id: str, keywords: list, category: str) -> list[tuple[str, float]]:
+    """Stored ranking for the user, catching up on jobs created or edited since it was written."""
+    job_index.refresh(client)
+    rows = client.table(TABLE).select("jobs, profile_hash, as_of, updated_at").eq("user_id", user_id).execute().data
+    if not rows or rows[0]["profile_hash"] != profile_hash(keywords, category) or _expired(rows[0]["updated_at"]):
+        return recompute(client, user_id, keywords, category)
+
+    row = rows[0]
+    ranked = [(item["job_id"], item["score"]) for item in row["jobs"]]
+    wanted = (category or "").strip().lower()
+    for job_id, _ in ranked:
+        current = job_index.category_of(job_id)
+        if current is None or (wanted and current != wanted):
+            # Deleted or moved out of the category: its slot needs a full search to refill
+            return recompute(client, user_id, keywords, category)
+
+    changed_ids = job_index.changed_since(row["as_of"], category)
+    if changed_ids:
+        ranked = _merge(ranked, job_index.score(keywords, changed_ids))
+        _store(client, [_row(user_id, keywords, category, ranked)])
+    return ranked
+
+
+def apply_job_change(client, job_id: str, old_category: str | None) -> int:
+    """Delta update after a job was created, edited or deleted. Returns how many users changed."""
+    job_id = str(job_id)
+    new_category = job_index.category_of(job_id)
+    users = []
+    for category in {old_category, new_category} - {None, ""}:
+        # The index keeps categories lowercased; users.job_category is as typed
+        pattern = category.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        users += client.table("users").select("id, job_keywords, job_category").ilike("job_category", pattern).execute().data or []
+    if not users:
+        return 0
+
+    stored = client.table(TABLE).select("user_id, jobs, profile_hash").in_("user_id", [u["id"] for u in users]).execute().data or []
+    stored = {row["user_id"]: row for row in stored}
+
+    updates = []
+    for user in users:
+        row = stored.get(user["id"])
+        keywords, category = user.get("job_keywords") or [], user.get("job_category")
+        if not row or row["profile_hash"] != profile_hash(keywords, category):
+            # Recomputed on the user's next read anyway
+            continue
+
+        ranked = [(item["job_id"], item["score"]) for item in row["jobs"]]
+        kept = [item for item in ranked if item[0] != job_id]
+        if len(kept) < len(ranked) and new_category != (category or "").strip().lower():
+            # The job left this user's list; refill it from the index
+            updates.append(_row(user["id"], keywords, category, job_index.search(keywords, category, RECOMMENDATIONS_TOP_N)))
+        elif new_category == (category or "").strip().lower():
+            updates.append(_row(user["id"], keywords, category, _merge(kept, job_index.score(keywords, [job_id]))))
+
+    _store(client, updates)
+    return len(updates)
+
+
+def _expired(updated_at: str | None) -> bool:
+    if not updated_at:
+        return True
+    written = datetime.fromisoformat(updated_at)
+    if written.tzinfo is None:
+        written = written.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - written).total_seconds() > RECOMMENDATIONS_MAX_AGE
+
+
+def _merge(ranked: list[tuple[str, float]], scores: dict[str, float]) -> list[tuple[str, float]]:
+    merged = dict(ranked)
+    merged.update(scores)
+    return sorted(merged.items(), key=lambda item: item[1], reverse=True)[:RECOMMENDATIONS_TOP_N]
+
+
+def _row(user_id: str, keywords: list, category: str, ranked: list[tuple[str, float]]) -> dict:
+    return {
+        "user_id": user_id,
+        "profile_hash": profile_hash(keywords, category),
+        "jobs": [{"job_id": job_id, "score": round(score, 4)} for job_id, score in ranked],
+        "as_of": job_index.last_updated_at,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _store(client, rows: list[dict]) -> None:
+    if rows:
+        client.table(TABLE).upsert(rows, on_conflict="user_id").execute()
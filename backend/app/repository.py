@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+from typing import TYPE_CHECKING
+from dotenv import load_dotenv
+from app.signed_urls import signed_url_cache
+from app.metrics import InstrumentedClient
+
+if TYPE_CHECKING:
+    from supabase import Client, AsyncClient
+
+# One Supabase client per process (it keeps a pooled HTTP connection), created
+# on first use, and the queries the analysis path needs, each in as few round
+# trips as possible.
+env_path = Path(__file__).parent / ".env"
+load_dotenv(dotenv_path=env_path)
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+JOB_DESCRIPTION_WAIT = float(os.getenv("JOB_DESCRIPTION_WAIT", "5"))
+JOB_DESCRIPTION_POLL = float(os.getenv("JOB_DESCRIPTION_POLL", "1"))
+CV_BUCKET = "user-uploads"
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def analysis_versions_of(cv_path: str | None, description: str | None) -> dict:
+    """The cv_version/job_version stamps of an analysis of this CV upload and job description."""
+    return {
+        "cv_version": cv_path or "",
+        "job_version": hashlib.sha1((description or "").encode("utf-8")).hexdigest()[:16],
+    }
+
+
+class Repository:
+    def __init__(self, client):
+        self.client = client
+        self._jobs_changed = threading.Condition()
+        self._jobs_version = 0
+        self._analysis_listeners = []
+
+    def on_analysis_change(self, listener) -> None:
+        """Call listener() after every write to application_analysis (e.g. to drop cached pages)."""
+        self._analysis_listeners.append(listener)
+
+    def _analyses_changed(self) -> None:
+        for listener in self._analysis_listeners:
+            listener()
+
+    def analysis_versions(self, user_id: str, job_id: str) -> dict | None:
+        """What an analysis of the pair depends on; None when the user doesn't exist.
+
+        The CV path changes with every upload, and the job version is a hash of
+        its description, so an edited job gets analysed again.
+        """
+        user = self.get_user(user_id, "cv_url")
+        if user is None:
+            return None
+        return analysis_versions_of(user.get("cv_url"), self.job_description(job_id))
+
+    def find_analysis(self, user_id: str, job_id: str, versions: dict, max_age: float) -> dict | None:
+        """A done analysis of these versions, or one queued or running for at most max_age seconds."""
+        since = (datetime.now(timezone.utc) - timedelta(seconds=max_age)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        rows = (
+            self.client.table("application_analysis")
+            .select("id, status")
+            .eq("user_id", user_id)
+            .eq("job_id", job_id)
+            .eq("cv_version", versions["cv_version"])
+            .eq("job_version", versions["job_version"])
+            .or_(f"status.eq.done,and(status.neq.failed,created_at.gte.{since})")
+            .limit(5)
+            .execute()
+            .data
+            or []
+        )
+        done = [row for row in rows if row.get("status") == "done"]
+        return (done or rows or [None])[0]
+
+    def create_analysis(self, user_id: str, job_id: str, status: str, versions: dict | None = None) -> str | None:
+        """Insert a new analysis row; None when the user doesn't exist."""
+        from postgrest.exceptions import APIError
+
+        analysis_id = str(uuid4())
+        try:
+            self.client.table("application_analysis").insert({
+                "id": analysis_id,
+                "user_id": user_id,
+                "job_id": job_id,
+                "analysis": None,
+                "score": None,
+                "status": status,
+                **(versions or {}),
+            }).execute()
+        except APIError as e:
+            if e.code == FOREIGN_KEY_VIOLATION:
+                return None
+            raise
+        self._analyses_changed()
+        return analysis_id
+
+    def insert_analyses(self, rows: list[dict]) -> None:
+        if rows:
+            self.client.table("application_analysis").insert(rows).execute()
+            self._analyses_changed()
+
+    def analysis_context(self, analysis_id: str) -> dict | None:
+        """The analysis row with its job description and the user's CV path, in one query."""
+        rows = self.client.table("application_analysis").select(
+            "id, user_id, job_id, status, score, jobs(description), users(cv_url)"
+        ).eq("id", analysis_id).execute().data
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "job_id": row["job_id"],
+            "status": row.get("status"),
+            "score": row.get("score"),
+            "job_description": (row.get("jobs") or {}).get("description"),
+            "cv_path": (row.get("users") or {}).get("cv_url"),
+        }
+
+    def scored_analyses_page(self, after: str | None, limit: int, job_ids: list[str] | None = None,
+                             hr_id: str | None = None, since: str | None = None, until: str | None = None,
+                             prompt_version: str | None = None) -> list[dict]:
+        """Done analyses matching the filters, by id from after (keyset), with their version stamps."""
+        query = self.client.table("application_analysis").select(
+            "id, prompt_version, model_version, jobs!inner(user_id)"
+        ).eq("status", "done")
+        if job_ids:
+            query = query.in_("job_id", job_ids)
+        if hr_id:
+            # jobs.user_id is the HR user who posted the job
+            query = query.eq("jobs.user_id", hr_id)
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lt("created_at", until)
+        if prompt_version == "none":
+            query = query.is_("prompt_version", "null")
+        elif prompt_version:
+            query = query.eq("prompt_version", prompt_version)
+        if after:
+            query = query.gt("id", after)
+        return query.order("id").limit(limit).execute().data or []
+
+    def pending_analyses(self, before: str, limit: int = 500) -> list[str]:
+        """Ids of analyses still queued or running that were created before `before`, oldest first."""
+        rows = (
+            self.client.table("application_analysis")
+            .select("id")
+            .in_("status", ["queued", "running"])
+            .lt("created_at", before)
+            .order("created_at")
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+        return [row["id"] for row in rows]
+
+    def update_analysis(self, analysis_id: str, fields: dict) -> None:
+        self.client.table("application_analysis").update(fields).eq("id", analysis_id).execute()
+        self._analyses_changed()
+
+    def update_analyses(self, analysis_ids: list[str], fields: dict) -> None:
+        """Same fields on many rows: one request."""
+        if analysis_ids:
+            self.client.table("application_analysis").update(fields).in_("id", analysis_ids).execute()
+            self._analyses_changed()
+
+    def save_analyses(self, rows: list[dict]) -> None:
+        """Different fields per row: one upsert. Rows need id, user_id and job_id."""
+        if rows:
+            self.client.table("application_analysis").upsert(rows).execute()
+            self._analyses_changed()
+
+    def applications_page(self, hr_id: str, columns: str, limit: int, after: tuple | None = None,
+                          min_score: float | None = None) -> list[dict]:
+        """Applications to an HR user's jobs, best score first, keyset-paginated on (score, id)."""
+        # jobs.user_id is the HR user who posted the job
+        query = self.client.table("application_analysis").select(columns).eq("jobs.user_id", hr_id)
+        if min_score is not None:
+            query = query.gte("score", min_score)
+        if after:
+            score, analysis_id = after
+            if score is None:
+                query = query.is_("score", "null").lt("id", analysis_id)
+            else:
+                query = query.or_(f"score.lt.{score},and(score.eq.{score},id.lt.{analysis_id}),score.is.null")
+        return (
+            query.order("score", desc=True, nullsfirst=False)
+            .order("id", desc=True)
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+
+    def score_stats(self, hr_id: str | None = None, job_id: str | None = None) -> list[dict]:
+        """Per-job score aggregates of an HR user's jobs, or of one job.
+
+        job_score_stats is maintained by a trigger on application_analysis, so
+        this is one row per job however many applications there are.
+        """
+        query = self.client.table("job_score_stats").select(
+            "job_id, category, applications, scored, failed, score_sum, histogram, jobs(title)"
+        )
+        if hr_id is not None:
+            query = query.eq("hr_id", hr_id)
+        if job_id is not None:
+            query = query.eq("job_id", job_id)
+        return query.execute().data or []
+
+    def get_user(self, user_id: str, columns: str = "*") -> dict | None:
+        rows = self.client.table("users").select(columns).eq("id", user_id).execute().data
+        return rows[0] if rows else None
+
+    def job_description(self, job_id: str) -> str | None:
+        rows = self.client.table("jobs").select("description").eq("id", job_id).execute().data
+        return rows[0].get("description") if rows else None
+
+    def wait_for_job_description(self, job_id: str, timeout: float = JOB_DESCRIPTION_WAIT) -> str | None:
+        """Description of a job that may still be being written.
+
+        Re-reads as soon as notify_job_changed() reports a job write in this
+        process, and every JOB_DESCRIPTION_POLL seconds otherwise, since the
+        job may be written by another process or straight to the database;
+        None after timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._jobs_changed:
+                version = self._jobs_version
+            description = self.job_description(job_id)
+            if description:
+                return description
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._jobs_changed:
+                self._jobs_changed.wait_for(
+                    lambda: self._jobs_version != version, timeout=min(remaining, JOB_DESCRIPTION_POLL)
+                )
+
+    def notify_job_changed(self, job_id: str) -> None:
+        with self._jobs_changed:
+            self._jobs_version += 1
+            self._jobs_changed.notify_all()
+
+    def signed_cv_urls(self, cv_paths: list[str]) -> dict[str, str]:
+        """Signed URLs for many CVs, reusing cached ones and signing the rest in one request."""
+        return signed_url_cache.get_many(CV_BUCKET, cv_paths, self.client.storage.from_(CV_BUCKET).create_signed_urls)
+
+    def download_cv(self, cv_path: str) -> bytes:
+        # The service role can read the bucket directly; no signed URL round trip
+        return self.client.storage.from_(CV_BUCKET).download(cv_path)
+
+
+class LazyClient:
+    """Stands in for the Supabase client until the first attribute access creates it.
+
+    Importing supabase and building the client is a large share of cold start,
+    and routes like / and /metrics never touch the database.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def _create_client():
+    from supabase import create_client
+
+    return InstrumentedClient(create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
+
+
+# Every query and storage call through these clients shows up on /metrics
+supabase: "Client" = LazyClient(_create_client)
+repo = Repository(supabase)
+
+# The async client and the lock guarding its creation are bound to the event
+# loop they were made on, so there is one of each per loop. Setting
+# _async_supabase replaces them all (the benchmarks install a fake this way).
+_async_supabase: "AsyncClient | None" = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClient]" = weakref.WeakKeyDictionary()
+_async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+_async_locks_guard = threading.Lock()
+
+
+async def get_async_supabase() -> "AsyncClient":
+    if _async_supabase is not None:
+        return _async_supabase
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+    with _async_locks_guard:
+        lock = _async_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if loop not in _async_clients:
+            from supabase import acreate_client
+
+            _async_clients[loop] = InstrumentedClient(await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
+    return _async_clients[loop]
@@ -1,19 +1,12 @@
 from fastapi import BackgroundTasks, FastAPI, APIRouter
 from uuid import uuid4
 import time  
-from app.call_ollama import analyze_With_ollama
-from supabase import create_client, Client
-from dotenv import load_dotenv
-from pathlib import Path
+from app.call_ollama import analyze_With_ollama, TEST_PROVIDERS
+from app.llm_providers import get_llm
+from app.repository import supabase
+from app.analysis_result import ANALYSIS_RULES, complete_analysis, load_fields
 #from app.gemini import analyze_with_gemini
-import os
 
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 router = APIRouter()
 
@@ -51,31 +44,14 @@ def run_analysis_task(analysis_id: str):
     prompt = (
     f"Opis posla:\n{job_description}\n\n"
     "Sada slijedi analiza životopisa kandidata u odnosu na opis posla.\n\n"
-    "🔹 Na prvoj liniji **OBAVEZNO** napiši samo brojčanu ocjenu prikladnosti kandidata (npr. `7.5`).\n"
-    "🔹 Koristi decimalnu vrijednost sa jednom decimalom (obavezno).\n"
-    "🔹 Nakon toga, napiši **detaljnu analizu** zašto si dodijelio tu ocjenu.\n"
-    "🔹 Analiziraj kompetencije, iskustvo, edukaciju i kompatibilnost sa opisom posla.\n"
-    "🔹 Navedi koje su prednosti i nedostaci kandidata u odnosu na opisani posao.\n"
-    "🔹 Piši isključivo na bosanskom jeziku.\n"
-    "🔹 Format odgovora:\n"
-    "```\n"
-    "8.3\n"
-    "Kandidat ima bogato iskustvo u XYZ. Posebno se ističe u...\n"
-    "...\n"
-    "```"
+    f"{ANALYSIS_RULES}"
     )
 
 
     analysis_result = analyze_With_ollama(text, prompt)
+    result = complete_analysis(f"{prompt}\n\n{text}", load_fields(analysis_result), llm=get_llm(TEST_PROVIDERS))
 
-    import re
-    score_match = re.search(r"(\d{1,2}\.\d)", analysis_result)
-    score = float(score_match.group(1)) if score_match else 0.0
-
-    supabase.table("application_analysis").update({
-        "analysis": analysis_result,
-        "score": score
-    }).eq("id", analysis_id).execute()
+    supabase.table("application_analysis").update(result.columns()).eq("id", analysis_id).execute()
 
 
 #@router.get("/get-analysis/{analysis_id}")
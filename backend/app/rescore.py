@@ -0,0 +1,375 @@
+"""Re-score stored analyses with the current prompt and model.
+
+    cd backend
+    python -m app.rescore --stale --dry-run                # how many rows the current prompt/model would change
+    python -m app.rescore --job-id <id> --job-id <id>
+    python -m app.rescore --hr-id <id> --since 2026-01-01 --until 2026-07-01 --workers 4 --rpm gemini=60
+    python -m app.rescore --prompt-version none            # rows scored before versions were stamped
+    python -m app.rescore --stale --fake ./fixture         # local fake backend, see FakeBackend
+
+Progress is checkpointed per analysis in SQLite (--checkpoint). Running the
+same selection again resumes where the last run stopped and retries failed
+rows up to --max-attempts; --restart starts over. Each row is written with
+prompt_version, model_version and scored_at, like the live analysis path.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+RESCORE_CHECKPOINT_DB = os.getenv("RESCORE_CHECKPOINT_DB") or str(Path(__file__).parent / "rescore.db")
+RESCORE_WORKERS = int(os.getenv("RESCORE_WORKERS", "4"))
+# Requests per minute per provider, 0 for no limit
+RESCORE_RPM = os.getenv("RESCORE_RPM", "gemini=60,together=30,ollama=0,fake=0")
+RESCORE_MAX_ATTEMPTS = int(os.getenv("RESCORE_MAX_ATTEMPTS", "3"))
+SELECT_PAGE_SIZE = 500
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class Checkpoint:
+    """Per-analysis state of re-scoring runs, so a crashed or stopped run can resume."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rescore_runs (
+                id TEXT PRIMARY KEY,
+                selection TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rescore_items (
+                run_id TEXT NOT NULL,
+                analysis_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                score_before REAL,
+                score_after REAL,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, analysis_id)
+            )
+        """)
+
+    def start(self, run_id: str, selection: dict, prompt_version: str, model_version: str,
+              restart: bool = False) -> None:
+        with self._lock:
+            if restart:
+                self._conn.execute("DELETE FROM rescore_items WHERE run_id = ?", (run_id,))
+            self._conn.execute(
+                "INSERT OR IGNORE INTO rescore_runs (id, selection, prompt_version, model_version, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (run_id, json.dumps(selection, sort_keys=True), prompt_version, model_version, time.time()),
+            )
+
+    def add(self, run_id: str, analysis_ids: list[str]) -> None:
+        """Queue analyses; ones the run already knows keep their state."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO rescore_items (run_id, analysis_id, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_id, analysis_id, PENDING, now) for analysis_id in analysis_ids],
+            )
+
+    def todo(self, run_id: str, max_attempts: int) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT analysis_id FROM rescore_items WHERE run_id = ?"
+                " AND (status = ? OR (status = ? AND attempts < ?)) ORDER BY analysis_id",
+                (run_id, PENDING, FAILED, max_attempts),
+            ).fetchall()
+        return [row["analysis_id"] for row in rows]
+
+    def finish(self, run_id: str, analysis_id: str, score_before: float | None, score_after: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rescore_items SET status = ?, attempts = attempts + 1, score_before = ?, score_after = ?,"
+                " error = NULL, updated_at = ? WHERE run_id = ? AND analysis_id = ?",
+                (DONE, score_before, score_after, time.time(), run_id, analysis_id),
+            )
+
+    def fail(self, run_id: str, analysis_id: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rescore_items SET status = ?, attempts = attempts + 1, error = ?, updated_at = ?"
+                " WHERE run_id = ? AND analysis_id = ?",
+                (FAILED, error, time.time(), run_id, analysis_id),
+            )
+
+    def summary(self, run_id: str) -> dict:
+        with self._lock:
+            counts = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM rescore_items WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+            delta = self._conn.execute(
+                "SELECT AVG(score_after - score_before) AS mean, AVG(ABS(score_after - score_before)) AS mean_abs"
+                " FROM rescore_items WHERE run_id = ? AND status = ? AND score_before IS NOT NULL",
+                (run_id, DONE),
+            ).fetchone()
+        return {
+            **{row["status"]: row["n"] for row in counts},
+            "mean_score_change": round(delta["mean"], 3) if delta["mean"] is not None else None,
+            "mean_abs_score_change": round(delta["mean_abs"], 3) if delta["mean_abs"] is not None else None,
+        }
+
+
+class RateLimiter:
+    """At most per_minute calls a minute, evenly spaced, shared by every worker."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60 / per_minute
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+            return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimitedProvider:
+    """A provider whose calls (analysis and repair alike) go through its RateLimiter."""
+
+    def __init__(self, provider, limiter: RateLimiter):
+        self.provider = provider
+        self.limiter = limiter
+        self.name = provider.name
+        self.model = provider.model
+
+    def generate(self, prompt, schema=None, system=None):
+        self.limiter.wait()
+        return self.provider.generate(prompt, schema, system)
+
+    async def agenerate(self, prompt, schema=None, system=None):
+        await self.limiter.acquire()
+        return await self.provider.agenerate(prompt, schema, system)
+
+    def stream(self, prompt, system=None, schema=None):
+        self.limiter.wait()
+        yield from self.provider.stream(prompt, system, schema)
+
+
+def limit_providers(router, rpm: dict[str, int]) -> None:
+    """Rate-limit the shared router's providers; this process only re-scores, so all its calls count."""
+    router.providers = [
+        RateLimitedProvider(provider, RateLimiter(rpm[provider.name])) if rpm.get(provider.name) else provider
+        for provider in router.providers
+    ]
+
+
+class FakeBackend:
+    """--fake DIR: a FakeSupabase loaded from DIR, for trying the tool offline.
+
+    DIR/tables.json holds the tables ({"jobs": [...], "users": [...],
+    "application_analysis": [...]}) and DIR/storage/<bucket>/<path> the CV
+    files. Tables are written back after every re-scored row, so a resumed
+    run sees what the last one wrote.
+    """
+
+    def __init__(self, directory: str):
+        from app.fake_supabase import FakeSupabase
+
+        self.directory = Path(directory)
+        self.fake = FakeSupabase(json.loads((self.directory / "tables.json").read_text(encoding="utf-8")))
+        storage = self.directory / "storage"
+        for file in sorted(storage.rglob("*")) if storage.exists() else ():
+            if file.is_file():
+                bucket, *path = file.relative_to(storage).parts
+                self.fake.storage.from_(bucket).upload("/".join(path), file.read_bytes())
+
+    @staticmethod
+    def configure(directory: str) -> None:
+        """Fake LLM and local state files; must run before any app import."""
+        os.environ.setdefault("LLM_PROVIDERS", "fake")
+        os.environ.setdefault("LLM_CACHE_DB", os.path.join(directory, "llm_cache.db"))
+        os.environ.setdefault("JOB_QUEUE_DB", os.path.join(directory, "job_queue.db"))
+
+    def install(self) -> None:
+        from app.repository import repo
+        from app.metrics import InstrumentedClient
+
+        repo.client = InstrumentedClient(self.fake)
+
+    def save(self) -> None:
+        with self.fake.lock:
+            text = json.dumps(self.fake.tables, ensure_ascii=False, indent=1, default=str)
+        temporary = self.directory / "tables.json.tmp"
+        temporary.write_text(text, encoding="utf-8")
+        os.replace(temporary, self.directory / "tables.json")
+
+
+def run_id_for(selection: dict, prompt_version: str, model_version: str) -> str:
+    raw = json.dumps([selection, prompt_version, model_version], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def select(selection: dict, current: tuple[str, str], limit: int | None = None):
+    """Ids of the analyses to re-score, page by page."""
+    from app.repository import repo
+
+    filters = {key: selection[key] for key in ("job_ids", "hr_id", "since", "until", "prompt_version")}
+    after, count = None, 0
+    while True:
+        rows = repo.scored_analyses_page(after, SELECT_PAGE_SIZE, **filters)
+        for row in rows:
+            if selection["stale"] and (row.get("prompt_version"), row.get("model_version")) == current:
+                continue
+            yield row["id"]
+            count += 1
+            if limit and count >= limit:
+                return
+        if len(rows) < SELECT_PAGE_SIZE:
+            return
+        after = rows[-1]["id"]
+
+
+async def rescore_one(analysis_id: str) -> tuple[float | None, float]:
+    """Analyse the pair again with today's prompt and model: (old score, new score)."""
+    from app.repository import repo
+    from app.gemini import build_prompt, fetch_cv_text
+    from app.llm_providers import get_llm, record_answers
+    from app.analysis_result import ANALYSIS_SCHEMA, acomplete_analysis, load_fields, scoring_stamp
+
+    record = await asyncio.to_thread(repo.analysis_context, analysis_id)
+    if not record:
+        raise LookupError("Analiza ne postoji")
+    if not record["job_description"] or not record["cv_path"]:
+        raise LookupError("Nedostaje opis posla ili CV")
+    cv_text = await asyncio.to_thread(fetch_cv_text, record["cv_path"])
+    if not cv_text.strip():
+        raise ValueError("CV je prazan")
+
+    prompt = build_prompt(record["job_description"], cv_text)
+    tags = (f"user:{record['user_id']}", f"job:{record['job_id']}")
+    with record_answers() as answers:
+        fields = await get_llm().agenerate(
+            prompt, schema=ANALYSIS_SCHEMA, tags=tags, variant="analysis", parse=load_fields
+        )
+        result = await acomplete_analysis(prompt, fields, tags=tags)
+    stamp = scoring_stamp(answers=answers)
+    await asyncio.to_thread(
+        repo.update_analysis, analysis_id, {**result.columns(), **stamp, "status": DONE, "error": None}
+    )
+    return record.get("score"), result.score
+
+
+async def run_pool(analysis_ids: list[str], workers: int, handle) -> None:
+    """handle(analysis_id) for every id, with at most workers running at once."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for analysis_id in analysis_ids:
+        queue.put_nowait(analysis_id)
+
+    async def worker():
+        while not queue.empty():
+            await handle(queue.get_nowait())
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--job-id", action="append", help="only analyses for this job (repeatable)")
+    parser.add_argument("--hr-id", help="only analyses for this HR user's jobs")
+    parser.add_argument("--since", help="created at or after (ISO date/time)")
+    parser.add_argument("--until", help="created before (ISO date/time)")
+    parser.add_argument("--prompt-version", help="only rows with this prompt_version; none for unstamped rows")
+    parser.add_argument("--stale", action="store_true", help="skip rows already scored by the current prompt and model")
+    parser.add_argument("--limit", type=int, help="at most this many analyses")
+    parser.add_argument("--workers", type=int, default=RESCORE_WORKERS, help="analyses in flight at once")
+    parser.add_argument("--rpm", default=RESCORE_RPM, help="requests per minute per provider, e.g. gemini=60,together=30")
+    parser.add_argument("--max-attempts", type=int, default=RESCORE_MAX_ATTEMPTS)
+    parser.add_argument("--checkpoint", help=f"SQLite progress file (default {RESCORE_CHECKPOINT_DB})")
+    parser.add_argument("--restart", action="store_true", help="forget this selection's progress and start over")
+    parser.add_argument("--dry-run", action="store_true", help="only count the selected analyses")
+    parser.add_argument("--fake", metavar="DIR", help="run against a local fake backend (see FakeBackend)")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        FakeBackend.configure(args.fake)
+    from app.job_queue import parse_limits
+    from app.llm_providers import get_llm
+    from app.analysis_result import ANALYSIS_PROMPT_VERSION, model_version
+    from app.metrics import log_event
+
+    backend = None
+    if args.fake:
+        backend = FakeBackend(args.fake)
+        backend.install()
+    limit_providers(get_llm(), parse_limits(args.rpm))
+
+    current = (ANALYSIS_PROMPT_VERSION, model_version())
+    selection = {
+        "job_ids": sorted(args.job_id or []),
+        "hr_id": args.hr_id,
+        "since": args.since,
+        "until": args.until,
+        "prompt_version": args.prompt_version,
+        "stale": args.stale,
+    }
+    run_id = run_id_for(selection, *current)
+    checkpoint_path = args.checkpoint or (os.path.join(args.fake, "rescore.db") if args.fake else RESCORE_CHECKPOINT_DB)
+    checkpoint = Checkpoint(checkpoint_path)
+
+    selected = list(select(selection, current, args.limit))
+    if args.dry_run:
+        log_event("rescore_plan", run_id=run_id, selected=len(selected), prompt_version=current[0],
+                  model_version=current[1], selection=selection)
+        return 0
+
+    checkpoint.start(run_id, selection, *current, restart=args.restart)
+    checkpoint.add(run_id, selected)
+    todo = checkpoint.todo(run_id, args.max_attempts)
+    log_event("rescore_start", run_id=run_id, selected=len(selected), todo=len(todo), checkpoint=checkpoint_path,
+              prompt_version=current[0], model_version=current[1])
+
+    async def handle(analysis_id):
+        started = time.perf_counter()
+        try:
+            before, after = await rescore_one(analysis_id)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            checkpoint.fail(run_id, analysis_id, error)
+            log_event("rescore", run_id=run_id, analysis_id=analysis_id, status=FAILED, error=error)
+            return
+        checkpoint.finish(run_id, analysis_id, before, after)
+        if backend:
+            backend.save()
+        log_event("rescore", run_id=run_id, analysis_id=analysis_id, status=DONE, score_before=before,
+                  score_after=after, duration_ms=round((time.perf_counter() - started) * 1000, 3))
+
+    asyncio.run(run_pool(todo, args.workers, handle))
+    summary = checkpoint.summary(run_id)
+    log_event("rescore_summary", run_id=run_id, **summary)
+    return 1 if summary.get(FAILED) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
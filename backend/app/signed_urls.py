@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+SIGNED_URL_TTL = int(os.getenv("SIGNED_URL_TTL", "3600"))
+# A cached URL is not handed out once it has less than this many seconds left
+SIGNED_URL_MARGIN = int(os.getenv("SIGNED_URL_MARGIN", "300"))
+
+
+class SignedURLCache:
+    """Signed storage URLs by path, reused until SIGNED_URL_MARGIN before they expire."""
+
+    def __init__(self, ttl: int = SIGNED_URL_TTL, margin: int = SIGNED_URL_MARGIN):
+        self.ttl = ttl
+        self.margin = margin
+        self._urls: dict[tuple[str, str], tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.signed = 0
+
+    def get_many(self, bucket_name: str, paths: list[str], sign) -> dict[str, str]:
+        """{path: url}; paths not cached (or close to expiry) are signed in one sign(paths, ttl) call."""
+        now = time.time()
+        urls, missing = {}, []
+        with self._lock:
+            for path in dict.fromkeys(p for p in paths if p):
+                entry = self._urls.get((bucket_name, path))
+                if entry and entry[1] - self.margin > now:
+                    urls[path] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.append(path)
+
+        if missing:
+            expires_at = time.time() + self.ttl
+            signed = sign(missing, self.ttl)
+            with self._lock:
+                for item in signed:
+                    url = item.get("signedURL") or item.get("signedUrl")
+                    if url and not item.get("error"):
+                        self._urls[(bucket_name, item["path"])] = (url, expires_at)
+                        urls[item["path"]] = url
+                self.signed += len(missing)
+                self._prune(time.time())
+        return urls
+
+    def invalidate(self, bucket_name: str, path: str) -> None:
+        with self._lock:
+            self._urls.pop((bucket_name, path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._urls), "hits": self.hits, "signed": self.signed}
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, (_, expires_at) in self._urls.items() if expires_at - self.margin <= now]
+        for key in expired:
+            del self._urls[key]
+
+
+signed_url_cache = SignedURLCache()
@@ -0,0 +1,143 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from app.metrics import log_event
+
+# Cold start report for /startup: how long importing the app and the lifespan
+# took, which heavy dependencies were loaded by the time it served requests,
+# and what the background warm-up of each shared client cost.
+
+# Build the clients in a background thread once the app is serving, so the
+# first real request doesn't pay for them; 0 leaves everything to first use.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
+# The embedding model (torch, ~500 MB of RAM) only with its own opt-in: on a
+# 512 MB instance it would not fit next to the app; otherwise it loads with
+# the first semantic search
+STARTUP_WARM_EMBEDDINGS = os.getenv("STARTUP_WARM_EMBEDDINGS", "0") == "1"
+
+# Dependencies that should only be imported on first use (or by the warm-up)
+HEAVY_MODULES = (
+    "supabase", "numpy", "requests", "google.generativeai", "sentence_transformers",
+    "pdfplumber", "docx", "PIL", "pytesseract", "pdf2image",
+)
+
+
+def process_age() -> float | None:
+    """Seconds since this process started, interpreter start-up included (Linux only)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # starttime is field 22; split after the command name, which may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def loaded_modules() -> list[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def semantic_matching() -> bool:
+    """Whether the embedding model can be imported; checked without importing it."""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+
+class StartupReport:
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.ready: dict | None = None
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = round(seconds * 1000, 3)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def mark_ready(self) -> None:
+        """Snapshot taken when the app starts serving; logged once as a "startup" event."""
+        age = process_age()
+        self.ready = {
+            "process_age_ms": round(age * 1000, 3) if age is not None else None,
+            "heavy_modules_loaded": loaded_modules(),
+            "semantic_matching": semantic_matching(),
+        }
+        log_event("startup", **self.ready, phases_ms=dict(self.phases))
+        if not self.ready["semantic_matching"]:
+            print("⚠️ sentence-transformers nije instaliran (requirements-embeddings.txt): mode=semantic "
+                  "koristi hashing embedder i vraća mode=hashing (samo zajedničke riječi, bez sinonima i prijevoda)")
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "phases_ms": phases,
+            "ready": self.ready,
+            "heavy_modules_loaded": loaded_modules(),
+            "warmup": STARTUP_WARMUP,
+        }
+
+
+startup_report = StartupReport()
+
+
+def _warm_supabase():
+    from app.repository import supabase
+
+    supabase.get()
+
+
+def _warm_llm():
+    from app.llm_providers import get_llm
+
+    get_llm()
+
+
+def _warm_parser():
+    from app.document_parser import get_pool
+
+    # The spawned workers start (and import the parser) with their first task
+    get_pool().submit(os.getpid).result()
+
+
+def _warm_job_vectors():
+    from app.job_vectors import get_job_vectors
+
+    get_job_vectors()
+
+
+WARMUP_STEPS = (
+    ("supabase", _warm_supabase),
+    ("llm", _warm_llm),
+    ("parser_pool", _warm_parser),
+) + ((("job_vectors", _warm_job_vectors),) if STARTUP_WARM_EMBEDDINGS else ())
+
+
+def warm_up() -> None:
+    for name, step in WARMUP_STEPS:
+        try:
+            with startup_report.phase(f"warmup.{name}"):
+                step()
+        except Exception as e:
+            # Whatever failed here is simply created on first use instead
+            print(f"⚠️ Warm-up {name} nije uspio:", repr(e))
+    log_event("warmup", phases_ms=startup_report.as_dict()["phases_ms"])
+
+
+def start_warm_up() -> threading.Thread | None:
+    if not STARTUP_WARMUP:
+        return None
+    thread = threading.Thread(target=warm_up, name="startup-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,89 @@
+import math
+from fastapi import APIRouter, HTTPException
+from app.repository import repo
+
+router = APIRouter()
+
+# HR dashboard statistics from the per-job aggregates in job_score_stats. The
+# stored histogram has one slot per score step (0.0, 0.1 ... 10.0), so the
+# mean, percentiles and coarse buckets below are exact, not estimates.
+SCORE_SLOTS = 101
+SCORE_BUCKETS = 10
+PERCENTILES = (25, 50, 75, 90)
+OTHER_CATEGORY = "ostalo"
+
+
+def merge(rows: list[dict]) -> dict:
+    total = {"applications": 0, "scored": 0, "failed": 0, "score_sum": 0.0, "histogram": [0] * SCORE_SLOTS}
+    for row in rows:
+        for field in ("applications", "scored", "failed"):
+            total[field] += row.get(field) or 0
+        total["score_sum"] += row.get("score_sum") or 0
+        for slot, count in enumerate((row.get("histogram") or [])[:SCORE_SLOTS]):
+            total["histogram"][slot] += count
+    return total
+
+
+def percentile(histogram: list[int], scored: int, q: float) -> float | None:
+    """Nearest-rank percentile of the scores counted in histogram."""
+    if not scored:
+        return None
+    rank = max(1, math.ceil(q / 100 * scored))
+    seen = 0
+    for slot, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return slot / 10
+    return (SCORE_SLOTS - 1) / 10
+
+
+def summarize(rows: list[dict]) -> dict:
+    total = merge(rows)
+    histogram, scored = total["histogram"], total["scored"]
+    filled = [slot for slot, count in enumerate(histogram) if count]
+    buckets = [0] * SCORE_BUCKETS
+    for slot, count in enumerate(histogram):
+        # 10.0 belongs to the last bucket, [9, 10]
+        buckets[min(slot // 10, SCORE_BUCKETS - 1)] += count
+    return {
+        "applications": total["applications"],
+        "scored": scored,
+        "failed": total["failed"],
+        "pending": max(0, total["applications"] - scored - total["failed"]),
+        "mean": round(total["score_sum"] / scored, 2) if scored else None,
+        "min": filled[0] / 10 if filled else None,
+        "max": filled[-1] / 10 if filled else None,
+        "percentiles": {f"p{q}": percentile(histogram, scored, q) for q in PERCENTILES},
+        "histogram": [{"from": i, "to": i + 1, "count": count} for i, count in enumerate(buckets)],
+    }
+
+
+def job_summary(row: dict) -> dict:
+    return {
+        "job_id": row["job_id"],
+        "title": (row.get("jobs") or {}).get("title"),
+        "category": row.get("category") or OTHER_CATEGORY,
+        **summarize([row]),
+    }
+
+
+@router.get("/statistics/by_hr/{hr_id}")
+def get_statistics_by_hr(hr_id: str):
+    """Totals, a breakdown by job category and one entry per job of the HR user's applications."""
+    rows = repo.score_stats(hr_id=hr_id)
+    categories: dict[str, list[dict]] = {}
+    for row in rows:
+        categories.setdefault(row.get("category") or OTHER_CATEGORY, []).append(row)
+    return {
+        "total": summarize(rows),
+        "categories": {name: summarize(group) for name, group in sorted(categories.items())},
+        "jobs": sorted((job_summary(row) for row in rows), key=lambda job: -job["applications"]),
+    }
+
+
+@router.get("/statistics/job/{job_id}")
+def get_statistics_by_job(job_id: str):
+    rows = repo.score_stats(job_id=job_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Nema statistike za ovaj posao")
+    return job_summary(rows[0])
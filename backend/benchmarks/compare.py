@@ -0,0 +1,64 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.2
+
+Latencies (*_ms) and memory (*_mb) regress when they grow, throughput (*_rps)
+when it drops, by more than the threshold. Exits 1 if anything regressed.
+"""
+import argparse
+import json
+import sys
+
+LOWER_IS_BETTER = ("_ms", "_mb")
+HIGHER_IS_BETTER = ("_rps",)
+
+
+def flatten(node, prefix: str = "") -> dict[str, float]:
+    if isinstance(node, dict):
+        flat = {}
+        for key, value in node.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(node, (int, float)) and not isinstance(node, bool):
+        return {prefix: float(node)}
+    return {}
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[tuple[str, float, float, float, bool]]:
+    """(metric, baseline, current, change, regressed) for every metric present in both runs."""
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    rows = []
+    for metric in sorted(old.keys() & new.keys()):
+        if not metric.endswith(LOWER_IS_BETTER + HIGHER_IS_BETTER) or not old[metric]:
+            continue
+        change = new[metric] / old[metric] - 1
+        worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+        rows.append((metric, old[metric], new[metric], change, worse > threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative change (0.2 = 20%%)")
+    parser.add_argument("--all", action="store_true", help="list every metric, not only regressions")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    regressions = [row for row in rows if row[4]]
+    for metric, old, new, change, regressed in rows if args.all else regressions:
+        marker = "❌" if regressed else "  "
+        print(f"{marker} {metric}: {old:g} -> {new:g} ({change:+.1%})")
+    print(f"{len(regressions)} od {len(rows)} metrika lošije za više od {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
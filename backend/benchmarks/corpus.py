@@ -0,0 +1,161 @@
+"""Deterministic synthetic CVs and jobs for the benchmarks.
+
+Text PDFs are written by hand (no PDF library in the requirements), scanned
+PDFs and PNGs are rendered with Pillow, DOCX with python-docx. Files are named
+like backend/temp_uploads: <uuid>.<ext>.
+"""
+import io
+import random
+import uuid
+from pathlib import Path
+
+SKILLS = [
+    "Python", "Java", "JavaScript", "React", "SQL", "PostgreSQL", "Docker", "Kubernetes", "Linux", "Git",
+    "Excel", "racunovodstvo", "administracija", "kuhar", "konobar", "nastavnik", "medicinska sestra",
+    "CNC", "zavarivanje", "logistika", "prodaja", "marketing", "FastAPI", "Django", "AWS", "Azure",
+]
+COMPANIES = ["Infobip", "Symphony", "BH Telecom", "ASA Grupa", "Bingo", "Hotel Europe", "KCUS", "Prevent"]
+ROLES = ["Software Engineer", "Data Analyst", "Administrativni radnik", "Kuhar", "Konobar", "Nastavnik",
+         "Medicinska sestra", "CNC operater", "Prodavac", "Project Manager"]
+CATEGORIES = ["it", "administracija", "ugostiteljstvo", "proizvodnja", "obrazovanje", "zdravstvo"]
+
+LINES_PER_PAGE = 45
+
+
+def cv_lines(rng: random.Random, index: int, pages: int = 1) -> list[str]:
+    """CV text; the candidate number keeps every CV (and so every prompt) unique."""
+    lines = [
+        f"Kandidat {index} {rng.choice(['Hodzic', 'Kovacevic', 'Begic', 'Hadzic', 'Delic'])}",
+        f"Email: kandidat{index}@example.com",
+        f"Pozicija: {rng.choice(ROLES)}",
+        "",
+        "Vjestine",
+        ", ".join(rng.sample(SKILLS, 6)),
+        "",
+        "Iskustvo",
+    ]
+    while len(lines) < pages * LINES_PER_PAGE:
+        company = rng.choice(COMPANIES)
+        year = rng.randint(2005, 2023)
+        lines.append(f"{year} - {year + rng.randint(1, 4)}  {rng.choice(ROLES)}, {company}")
+        lines.extend(
+            f"- Rad sa {rng.choice(SKILLS)} i {rng.choice(SKILLS)} na projektima za {rng.choice(COMPANIES)}"
+            for _ in range(3)
+        )
+    return lines[: pages * LINES_PER_PAGE]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(lines: list[str]) -> bytes:
+    """A minimal PDF with a Helvetica text layer, LINES_PER_PAGE lines per page."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for page in pages:
+        body = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in page) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def docx_bytes(lines: list[str]) -> bytes:
+    from docx import Document
+
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def _render(lines: list[str]):
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("L", (1240, 1754), 255)  # A4 at 150 dpi
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    for row, line in enumerate(lines[:LINES_PER_PAGE]):
+        draw.text((80, 80 + row * 34), line, fill=0, font=font)
+    return image
+
+
+def scanned_pdf(lines: list[str]) -> bytes:
+    """Image-only PDF (no text layer), one rendered page per LINES_PER_PAGE lines."""
+    images = [_render(lines[i:i + LINES_PER_PAGE]) for i in range(0, len(lines), LINES_PER_PAGE)]
+    out = io.BytesIO()
+    images[0].save(out, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return out.getvalue()
+
+
+def png_bytes(lines: list[str]) -> bytes:
+    out = io.BytesIO()
+    _render(lines).save(out, "PNG")
+    return out.getvalue()
+
+
+KINDS = {
+    "pdf": ("pdf", text_pdf),
+    "docx": ("docx", docx_bytes),
+    "scanned_pdf": ("pdf", scanned_pdf),
+    "png": ("png", png_bytes),
+}
+
+
+def build_corpus(directory: str, count: int, pages: int = 2, seed: int = 0) -> list[dict]:
+    """count CVs of every kind; returns [{kind, path, pages, lines}]."""
+    rng = random.Random(seed)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    corpus = []
+    for index in range(count):
+        for kind, (extension, render) in KINDS.items():
+            doc_pages = 1 if kind == "png" else pages
+            lines = cv_lines(rng, index, doc_pages)
+            path = Path(directory) / f"{uuid.UUID(int=rng.getrandbits(128), version=4)}.{extension}"
+            path.write_bytes(render(lines))
+            corpus.append({"kind": kind, "path": str(path), "pages": doc_pages, "lines": lines})
+    return corpus
+
+
+def jobs(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"job-{i:06d}",
+            "title": rng.choice(ROLES),
+            "description": " ".join(
+                f"Trazimo {rng.choice(ROLES)} sa iskustvom u {rng.choice(SKILLS)} i {rng.choice(SKILLS)}."
+                for _ in range(6)
+            ),
+            "job_type": rng.choice(CATEGORIES),
+            "user_id": f"hr-{i % 10}",
+            "created_at": f"2026-01-01T00:00:{i % 60:02d}.{i:06d}",
+        }
+        for i in range(count)
+    ]
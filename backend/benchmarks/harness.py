@@ -0,0 +1,71 @@
+"""Offline wiring shared by the benchmark suites: settings, fakes and statistics."""
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+
+
+def configure(workdir: str, llm_latency: float, workers: int) -> None:
+    """Point every setting at the fakes and at workdir. Must run before any app import."""
+    # create_client only validates these; nothing is ever sent to them
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.bench")
+    os.environ.update({
+        "LLM_PROVIDERS": "fake",
+        "FAKE_LLM_LATENCY": str(llm_latency),
+        "LLM_CACHE_DB": os.path.join(workdir, "llm_cache.db"),
+        "JOB_QUEUE_DB": os.path.join(workdir, "job_queue.db"),
+        "JOB_VECTORS_DIR": os.path.join(workdir, "job_vectors"),
+        "JOB_WORKERS": str(workers),
+        # The parse suite measures OCR itself, not the page cache
+        "OCR_CACHE_PAGES": "0",
+    })
+
+
+def install(fake) -> None:
+    """Route the app's Supabase access (sync, async and storage) to a FakeSupabase."""
+    from app import repository, gemini, batch_analysis
+    from app.fake_supabase import AsyncFakeSupabase
+    from app.metrics import InstrumentedClient
+
+    # Instrumented like the real clients, so the numbers include that overhead
+    client = InstrumentedClient(fake)
+    repository.repo.client = client
+    repository.supabase = gemini.supabase = batch_analysis.supabase = client
+    repository._async_supabase = InstrumentedClient(AsyncFakeSupabase(fake))
+
+
+def workdir() -> str:
+    return tempfile.mkdtemp(prefix="cv-bench-")
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(seconds: list[float]) -> dict:
+    if not seconds:
+        return {"n": 0}
+    ordered = sorted(seconds)
+    ms = lambda value: round(value * 1000, 3)
+    return {
+        "n": len(ordered),
+        "mean_ms": ms(statistics.fmean(ordered)),
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p90_ms": ms(percentile(ordered, 90)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]),
+    }
+
+
+def peak_memory() -> dict:
+    """Peak resident set size so far: this process, and the parser worker processes."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return {
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
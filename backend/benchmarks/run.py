@@ -0,0 +1,323 @@
+"""Offline benchmarks for the CV pipeline.
+
+    cd backend
+    python -m benchmarks.run                       # every suite, JSON on stdout
+    python -m benchmarks.run --suite parse --suite matching --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Supabase, storage and the LLM are in-process fakes (app/fake_supabase.py and
+the "fake" provider), so the numbers are the app's own overhead plus the
+configured --llm-latency and --db-latency. App logging goes to stderr.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import corpus, harness
+
+SUITES = ("startup", "parse", "upload", "analyze", "matching")
+
+
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+from app.startup import startup_report, loaded_modules, process_age
+print(json.dumps({"import_s": time.perf_counter() - started, "age_s": process_age(), "loaded": loaded_modules()}))
+"""
+
+
+def bench_startup(repeats: int) -> dict:
+    """Cold import of app.main in fresh interpreters; the lifespan and warm-up are not run."""
+    imports, ages, loaded = [], [], set()
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        imports.append(probe["import_s"])
+        if probe["age_s"] is not None:
+            ages.append(probe["age_s"])
+        loaded.update(probe["loaded"])
+    return {
+        "import": harness.summarize(imports),
+        "process_age": harness.summarize(ages),
+        # Should stay empty: these are only imported on first use
+        "heavy_modules_loaded": sorted(loaded),
+    }
+
+
+def bench_parse(docs: list[dict], repeats: int) -> dict:
+    from app.document_parser import extract_text, mime_for, shutdown_pool, OCRUnavailable
+
+    # Worker process start-up is reported on its own, not folded into the first sample
+    shutdown_pool()
+    started = time.perf_counter()
+    extract_text(docs[0]["path"], mime_for(docs[0]["path"]))
+    results = {"pool_start_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    for kind in corpus.KINDS:
+        samples, per_page, chars = [], [], []
+        try:
+            for _ in range(repeats):
+                for doc in (d for d in docs if d["kind"] == kind):
+                    started = time.perf_counter()
+                    text = extract_text(doc["path"], mime_for(doc["path"]))
+                    elapsed = time.perf_counter() - started
+                    samples.append(elapsed)
+                    per_page.append(elapsed / doc["pages"])
+                    chars.append(len(text))
+        except OCRUnavailable as e:
+            results[kind] = {"skipped": str(e)}
+            continue
+        results[kind] = {
+            "document": harness.summarize(samples),
+            "per_page": harness.summarize(per_page),
+            "mean_chars": round(sum(chars) / len(chars)) if chars else 0,
+        }
+    return results
+
+
+async def run_concurrently(count: int, concurrency: int, request) -> tuple[list[float], int, float]:
+    """Run request(i) count times, at most concurrency at once: (latencies, errors, wall seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await request(i)
+            except Exception as e:
+                errors += 1
+                print("⚠️ benchmark request failed:", repr(e), file=sys.stderr)
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def load_report(latencies: list[float], errors: int, wall: float) -> dict:
+    return {
+        **harness.summarize(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0,
+    }
+
+
+async def bench_upload(client, fake, docs: list[dict], requests: int, concurrency: int) -> dict:
+    from app.document_parser import mime_for
+
+    uploads = [d for d in docs if d["kind"] in ("pdf", "docx")]
+    fake.tables["users"] = [{"id": f"upload-user-{i}"} for i in range(requests)]
+
+    async def upload(i):
+        doc = uploads[i % len(uploads)]
+        name = Path(doc["path"]).name
+        response = await client.post(
+            "/upload-cv",
+            data={"user_id": f"upload-user-{i}"},
+            files={"file": (name, Path(doc["path"]).read_bytes(), mime_for(name))},
+        )
+        response.raise_for_status()
+
+    # The ASGI transport returns once the app is done, so this includes the
+    # background profile refresh (parse, LLM profile, recommendations)
+    return load_report(*await run_concurrently(requests, concurrency, upload))
+
+
+async def bench_analyze(client, fake, docs: list[dict], job_rows: list[dict], requests: int,
+                        concurrency: int) -> dict:
+    from app.document_parser import mime_for
+
+    cvs = [d for d in docs if d["kind"] in ("pdf", "docx")]
+    fake.tables["users"] = []
+    for i, doc in enumerate(cvs):
+        path = f"analyze-user-{i}/{Path(doc['path']).name}"
+        fake.storage.from_("user-uploads").upload(path, Path(doc["path"]).read_bytes())
+        fake.tables["users"].append({"id": f"analyze-user-{i}", "cv_url": path})
+    fake.tables["application_analysis"] = []
+    enqueue = []
+
+    def status(analysis_id):
+        with fake.lock:
+            for row in fake.tables["application_analysis"]:
+                if row["id"] == analysis_id:
+                    return row.get("status")
+
+    async def analyze(i):
+        # Distinct (CV, job) pairs, so every request is an LLM cache miss
+        user = f"analyze-user-{i % len(cvs)}"
+        job = job_rows[(i // len(cvs)) % len(job_rows)]["id"]
+        started = time.perf_counter()
+        response = await client.post(f"/analyze-cv/{user}/{job}")
+        response.raise_for_status()
+        enqueue.append(time.perf_counter() - started)
+        analysis_id = response.json()["analysis_id"]
+        while (current := status(analysis_id)) not in ("done", "failed"):
+            await asyncio.sleep(0.002)
+        if current == "failed":
+            raise RuntimeError(f"analiza {analysis_id} nije uspjela")
+
+    report = load_report(*await run_concurrently(requests, concurrency, analyze))
+    return {"end_to_end": report, "enqueue": harness.summarize(enqueue)}
+
+
+def bench_matching(sizes: list[int], queries: int, workdir: str) -> dict:
+    from app.job_index import JobIndex
+    from app.job_vectors import HashingEmbedder, JobVectorStore
+
+    rng = random.Random(1)
+    query_keywords = [rng.sample(corpus.SKILLS, 6) for _ in range(queries)]
+    results = {}
+    for size in sizes:
+        job_rows = corpus.jobs(size)
+
+        index = JobIndex()
+        started = time.perf_counter()
+        for job in job_rows:
+            index.upsert(job)
+        build = time.perf_counter() - started
+        keyword_samples, category_samples = [], []
+        for keywords in query_keywords:
+            started = time.perf_counter()
+            index.search(keywords, None, 10)
+            keyword_samples.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            index.search(keywords, rng.choice(corpus.CATEGORIES), 10)
+            category_samples.append(time.perf_counter() - started)
+
+        embedder = HashingEmbedder()
+        store = JobVectorStore(os.path.join(workdir, f"vectors-{size}"), embedder)
+        started = time.perf_counter()
+        store.upsert_many(job_rows)
+        embed = time.perf_counter() - started
+        vectors = embedder.embed([" ".join(keywords) for keywords in query_keywords])
+        semantic_samples = []
+        for vector in vectors:
+            started = time.perf_counter()
+            store.search(vector, rng.choice(corpus.CATEGORIES), 10)
+            semantic_samples.append(time.perf_counter() - started)
+
+        results[str(size)] = {
+            "keyword_index_build_ms": round(build * 1000, 3),
+            "keyword_search": harness.summarize(keyword_samples),
+            "keyword_search_category": harness.summarize(category_samples),
+            "vector_build_ms": round(embed * 1000, 3),
+            "vector_search_category": harness.summarize(semantic_samples),
+        }
+    return results
+
+
+async def run_app_suites(args, docs: list[dict], workdir: str) -> dict:
+    import httpx
+    from app.fake_supabase import FakeSupabase
+    from app.main import app
+    from app.job_queue import worker_pool
+
+    job_rows = corpus.jobs(args.jobs)
+    fake = FakeSupabase({"jobs": job_rows, "users": [], "application_analysis": []}, latency=args.db_latency)
+    harness.install(fake)
+    worker_pool.start()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            if "upload" in args.suite:
+                results["upload"] = await bench_upload(client, fake, docs, args.requests, args.concurrency)
+                results["upload"]["memory"] = harness.peak_memory()
+            if "analyze" in args.suite:
+                results["analyze"] = await bench_analyze(client, fake, docs, job_rows, args.requests, args.concurrency)
+                results["analyze"]["memory"] = harness.peak_memory()
+    finally:
+        worker_pool.stop()
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="default: all suites")
+    parser.add_argument("--documents", type=int, default=3, help="CVs per kind in the corpus")
+    parser.add_argument("--pages", type=int, default=2, help="pages per PDF CV")
+    parser.add_argument("--repeats", type=int, default=3, help="parse passes over the corpus, cold imports")
+    parser.add_argument("--requests", type=int, default=40, help="requests per load suite")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="analysis worker threads (JOB_WORKERS)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per fake Supabase request")
+    parser.add_argument("--jobs", type=int, default=200, help="rows in the jobs table for the load suites")
+    parser.add_argument("--job-sizes", default="100,1000,10000", help="job table sizes for the matching suite")
+    parser.add_argument("--queries", type=int, default=50, help="searches per job table size")
+    parser.add_argument("--corpus-dir", help="keep the generated CVs here (default: a temp dir)")
+    parser.add_argument("--output", default="-", help="result file, - for stdout")
+    args = parser.parse_args(argv)
+    args.suite = args.suite or list(SUITES)
+
+    workdir = harness.workdir()
+    harness.configure(workdir, args.llm_latency, args.workers)
+    docs = corpus.build_corpus(args.corpus_dir or os.path.join(workdir, "corpus"), args.documents, args.pages)
+
+    stdout = sys.stdout
+    results = {}
+    # Keep the app's print logging out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        if "startup" in args.suite:
+            results["startup"] = bench_startup(args.repeats)
+        if "parse" in args.suite:
+            results["parse"] = bench_parse(docs, args.repeats)
+            results["parse"]["memory"] = harness.peak_memory()
+        if "upload" in args.suite or "analyze" in args.suite:
+            results.update(asyncio.run(run_app_suites(args, docs, workdir)))
+        if "matching" in args.suite:
+            sizes = [int(size) for size in args.job_sizes.split(",") if size.strip()]
+            results["matching"] = bench_matching(sizes, args.queries, workdir)
+            results["matching"]["memory"] = harness.peak_memory()
+
+        from app.document_parser import shutdown_pool
+        shutdown_pool()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text, file=stdout)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"📊 Rezultati: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
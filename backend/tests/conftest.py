@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# Tests import the app the way it runs (from app.x import ...) and never touch the real state files
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("JOB_QUEUE_DB", ":memory:")
+os.environ.setdefault("LLM_CACHE_DB", ":memory:")
+os.environ.setdefault("LLM_PROVIDERS", "fake")
@@ -0,0 +1,125 @@
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.admission import AnalysisFlights, Overloaded
+from app.fake_supabase import FakeSupabase
+
+
+def start(flights: AnalysisFlights, user_id: str, job_id: str, analysis_id: str) -> str:
+    analysis_id, shared = flights.run((user_id, job_id, "cv", "job"), lambda: None, lambda: analysis_id, lambda _: None)
+    assert not shared
+    return analysis_id
+
+
+def test_concurrent_requests_share_one_analysis():
+    flights = AnalysisFlights()
+    created = []
+    release = threading.Event()
+
+    def create():
+        created.append(1)
+        release.wait(5)
+        return "analysis-1"
+
+    results = []
+
+    def request():
+        results.append(flights.run(("u", "j", "cv", "job"), lambda: None, create, lambda _: None))
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(created) == 1
+    assert sorted(results) == [("analysis-1", False)] + [("analysis-1", True)] * 4
+    assert flights.stats()["joined"] == 4
+
+
+def test_stored_analysis_is_returned_without_creating_one():
+    flights = AnalysisFlights()
+    analysis_id, shared = flights.run(
+        ("u", "j", "cv", "job"), lambda: {"id": "old", "status": "done"}, lambda: pytest.fail("created"), None
+    )
+    assert (analysis_id, shared) == ("old", True)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_user_limit_rejects_with_retry_after_until_a_flight_finishes():
+    flights = AnalysisFlights(user_limit=2, global_limit=10)
+    first = start(flights, "u", "j1", "a1")
+    start(flights, "u", "j2", "a2")
+
+    with pytest.raises(Overloaded) as rejected:
+        start(flights, "u", "j3", "a3")
+    assert rejected.value.retry_after >= 1
+    # Other users are not held back by this one
+    start(flights, "other", "j3", "b1")
+
+    flights.finish(first)
+    start(flights, "u", "j3", "a3")
+    assert flights.stats()["rejected_user"] == 1
+
+
+def test_global_limit_counts_every_user():
+    flights = AnalysisFlights(user_limit=5, global_limit=2)
+    start(flights, "u1", "j", "a1")
+    start(flights, "u2", "j", "a2")
+    with pytest.raises(Overloaded):
+        start(flights, "u3", "j", "a3")
+    assert flights.stats()["rejected_global"] == 1
+
+
+def test_failed_create_lets_the_next_request_try_again():
+    flights = AnalysisFlights()
+
+    def broken():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        flights.run(("u", "j", "cv", "job"), lambda: None, broken, lambda _: None)
+    assert start(flights, "u", "j", "a1") == "a1"
+
+
+def test_batch_request_takes_one_slot_while_it_streams():
+    flights = AnalysisFlights(user_limit=1, global_limit=10)
+    batch = flights.admit_batch("u")
+    with pytest.raises(Overloaded):
+        start(flights, "u", "j", "a1")
+    with pytest.raises(Overloaded):
+        flights.admit_batch("u")
+
+    flights.finish_batch(batch)
+    start(flights, "u", "j", "a1")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app import gemini
+    from app.main import app
+    from app.repository import repo
+
+    fake = FakeSupabase({
+        "users": [{"id": "u", "cv_url": "u/cv.pdf"}],
+        "jobs": [{"id": f"j{i}", "description": f"Posao {i}"} for i in range(3)],
+        "application_analysis": [],
+    })
+    monkeypatch.setattr(repo, "client", fake)
+    monkeypatch.setattr(gemini, "analysis_flights", AnalysisFlights(user_limit=1, global_limit=10))
+    monkeypatch.setattr(gemini.worker_pool, "submit", lambda *args, **kwargs: None)
+    return TestClient(app)
+
+
+def test_analyze_cv_deduplicates_and_answers_429_past_the_limit(client):
+    first = client.post("/analyze-cv/u/j0")
+    again = client.post("/analyze-cv/u/j0")
+    assert first.status_code == again.status_code == 200
+    assert again.json() == {"analysis_id": first.json()["analysis_id"], "deduplicated": True}
+
+    rejected = client.post("/analyze-cv/u/j1")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import pytest
+from app.analysis_result import (
+    WIRE_KEYS, AnalysisResult, AnalysisSchemaError, StreamingAnalysis, acomplete_analysis, complete_analysis,
+    load_fields, render_analysis, to_wire,
+)
+
+FIELDS = {
+    "score": 7.5,
+    "competencies": 'Python i "SQL", čćžšđ',
+    "experience": "5 godina\nu razvoju",
+    "education": "FIT Mostar",
+    "compatibility": "Dobra",
+    "strengths": ["Brz", "Tačan"],
+    "weaknesses": ["Nema Jave"],
+    "recommendations": "Pozvati na intervju 😀",
+}
+
+
+class ScriptedLLM:
+    """Answers repair calls from a list and records the fields each one asked for."""
+
+    def __init__(self, *answers: dict):
+        self.answers = list(answers)
+        self.asked = []
+
+    def generate(self, prompt, schema=None, tags=(), variant="", parse=None):
+        self.asked.append(sorted(schema["properties"]))
+        return parse(json.dumps(self.answers.pop(0)))
+
+    async def agenerate(self, prompt, schema=None, tags=(), variant="", parse=None):
+        return self.generate(prompt, schema, tags, variant, parse)
+
+
+def feed_in_chunks(reader: StreamingAnalysis, raw: str, size: int) -> str:
+    return "".join(reader.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_streaming_reader_rebuilds_fields_and_rendered_text(size, ensure_ascii):
+    raw = json.dumps(to_wire(FIELDS), indent=2, ensure_ascii=ensure_ascii)
+    reader = StreamingAnalysis()
+
+    shown = feed_in_chunks(reader, raw, size)
+
+    assert reader.fields == FIELDS
+    assert reader.score == 7.5
+    assert shown == render_analysis(AnalysisResult.model_validate(FIELDS))
+
+
+def test_streaming_reader_reports_the_score_before_the_sections():
+    raw = json.dumps(to_wire(FIELDS))
+    reader = StreamingAnalysis()
+
+    shown = reader.feed(raw[: raw.index(WIRE_KEYS["competencies"])])
+
+    assert reader.score == 7.5
+    assert shown == "7.5\n"
+
+
+def test_streaming_reader_skips_unknown_nested_values():
+    raw = json.dumps({"extra": {"a": ["}", {"b": "]"}]}, **to_wire(FIELDS)})
+    reader = StreamingAnalysis()
+    reader.feed(raw)
+    assert {key: reader.fields[key] for key in FIELDS} == FIELDS
+
+
+def test_cut_off_answer_keeps_its_finished_fields():
+    raw = json.dumps(to_wire(FIELDS))
+    cut = raw[: raw.index(WIRE_KEYS["education"])]
+    assert load_fields(cut) == {"score": 7.5, "competencies": FIELDS["competencies"], "experience": FIELDS["experience"]}
+
+
+def test_repair_asks_only_for_the_failed_fields():
+    partial = {**FIELDS, "score": 14, "strengths": []}
+    partial.pop("recommendations")
+    llm = ScriptedLLM(to_wire({"score": 8.0, "strengths": ["Iskusan"], "recommendations": "Intervju"}))
+
+    result = complete_analysis("prompt", partial, llm=llm)
+
+    assert llm.asked == [sorted(WIRE_KEYS[field] for field in ("score", "strengths", "recommendations"))]
+    assert result.score == 8.0
+    assert result.strengths == ["Iskusan"]
+    assert result.competencies == FIELDS["competencies"]
+
+
+def test_repair_keeps_fields_fixed_by_earlier_attempts():
+    partial = {key: value for key, value in FIELDS.items() if key not in ("education", "weaknesses")}
+    llm = ScriptedLLM(
+        to_wire({"education": "FIT", "weaknesses": []}),
+        to_wire({"weaknesses": ["Nema Jave"]}),
+    )
+
+    result = complete_analysis("prompt", partial, llm=llm, attempts=2)
+
+    assert llm.asked == [sorted([WIRE_KEYS["education"], WIRE_KEYS["weaknesses"]]), [WIRE_KEYS["weaknesses"]]]
+    assert result.education == "FIT"
+    assert result.weaknesses == ["Nema Jave"]
+
+
+def test_repair_gives_up_after_its_attempts():
+    llm = ScriptedLLM({}, {})
+    with pytest.raises(AnalysisSchemaError, match="score"):
+        complete_analysis("prompt", {**FIELDS, "score": None}, llm=llm, attempts=2)
+    assert len(llm.asked) == 2
+
+
+def test_valid_fields_need_no_llm_call():
+    llm = ScriptedLLM()
+    assert asyncio.run(acomplete_analysis("prompt", FIELDS, llm=llm)).score == 7.5
+    assert llm.asked == []
+
+
+def test_batch_repair_names_the_pair():
+    llm = ScriptedLLM({"id": "pair-1", **to_wire({"score": 6.0})})
+    result = asyncio.run(acomplete_analysis("prompt", {**FIELDS, "score": "n/a"}, item_id="pair-1", llm=llm))
+    assert llm.asked == [sorted(["id", WIRE_KEYS["score"]])]
+    assert result.score == 6.0
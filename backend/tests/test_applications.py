@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.fake_supabase import FakeSupabase
+
+SCORES = {"a1": 9.0, "a2": 7.5, "a3": 7.5, "a4": 7.5, "a5": None, "a6": 3.0, "a7": None}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.applications import page_cache
+    from app.main import app
+    from app.repository import repo
+
+    fake = FakeSupabase({
+        "jobs": [{"id": "j1", "title": "Backend", "user_id": "hr"}, {"id": "j2", "title": "Frontend", "user_id": "other"}],
+        "users": [{"id": f"u{i}", "name": f"Kandidat {i}"} for i in range(10)],
+        "application_analysis": [
+            {"id": analysis_id, "job_id": "j1", "user_id": f"u{i}", "score": score, "status": "done"}
+            for i, (analysis_id, score) in enumerate(SCORES.items())
+        ] + [{"id": "b1", "job_id": "j2", "user_id": "u9", "score": 10.0, "status": "done"}],
+    })
+    monkeypatch.setattr(repo, "client", fake)
+    page_cache.clear()
+    yield TestClient(app)
+    page_cache.clear()
+
+
+def all_pages(client, **params) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        response = client.get("/applications/by_hr/hr", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([item["id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_pages_cover_every_application_once_best_score_first(client):
+    pages = all_pages(client, limit=2)
+    # Ties on score are ordered by id, unscored rows come last
+    assert pages == [["a1", "a4"], ["a3", "a2"], ["a6", "a7"], ["a5"]]
+
+
+def test_min_score_filters_before_paging(client):
+    assert all_pages(client, limit=2, min_score=7.5) == [["a1", "a4"], ["a3", "a2"]]
+
+
+def test_unchanged_page_answers_304_for_its_etag(client):
+    first = client.get("/applications/by_hr/hr")
+    etag = first.headers["ETag"]
+
+    again = client.get("/applications/by_hr/hr", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+
+def test_analysis_write_changes_the_etag(client):
+    from app.repository import repo
+
+    etag = client.get("/applications/by_hr/hr").headers["ETag"]
+    repo.update_analysis("a6", {"score": 9.5})
+
+    response = client.get("/applications/by_hr/hr", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [item["id"] for item in response.json()["items"]][:2] == ["a6", "a1"]
+
+
+def test_bad_cursor_is_rejected(client):
+    assert client.get("/applications/by_hr/hr", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,56 @@
+from app.compaction import PAGE_BREAK, compact, estimate_tokens, normalize, strip_boilerplate
+
+
+def section(title: str, lines: int) -> str:
+    return title + "\n" + "\n".join(f"Linija {i} sa nekoliko riječi o iskustvu" for i in range(lines))
+
+
+def test_text_under_budget_is_only_cleaned():
+    text = "Iskustvo\n\n  Python   developer,\t5 godina  \n\n\n\nEdukacija"
+    compacted = compact(text, 1000)
+    assert compacted.text == "Iskustvo\n\nPython developer, 5 godina\n\nEdukacija"
+    assert compacted.tokens_after == estimate_tokens(compacted.text)
+
+
+def test_over_budget_cuts_the_longest_sections_and_keeps_short_ones_whole():
+    sections = [section(f"Sekcija {i}", i * 10) for i in range(1, 5)]
+    text = "\n\n".join(sections + ["Kratko"])
+    budget = 120
+
+    compacted = compact(text, budget)
+    cut = compacted.text.count("…")
+
+    assert compacted.tokens_before == estimate_tokens(text)
+    # Every cut section gets one "…" marker on top of its share
+    assert compacted.tokens_after <= budget + cut
+    assert compacted.saved > 0
+    blocks = compacted.text.split("\n\n")
+    assert [block.split("\n")[0] for block in blocks] == ["Sekcija 1", "Sekcija 2", "Sekcija 3", "Sekcija 4", "Kratko"]
+    assert blocks[-1] == "Kratko"
+
+
+def test_contact_details_page_numbers_and_consent_are_dropped():
+    text = "\n".join([
+        "Curriculum Vitae",
+        "Amra Hodžić",
+        "amra.hodzic@example.com | +387 61 123 456",
+        "www.linkedin.com/in/amra",
+        "Email:",
+        "Iskustvo: GDPR usklađivanje za banku",
+        "Stranica 1 od 2",
+        "Dajem saglasnost za obradu mojih ličnih podataka.",
+    ])
+    cleaned = strip_boilerplate(normalize(text))
+    assert cleaned.split("\n") == ["Amra Hodžić", "Iskustvo: GDPR usklađivanje za banku"]
+
+
+def test_running_header_is_kept_once_but_repeated_content_lines_stay():
+    page_one = "Amra Hodžić - CV\nIskustvo\nBackend developer\nVještine\n- Python"
+    page_two = "Amra Hodžić - CV\n- Python\nDjango\nSQL\nPostgreSQL"
+    text = normalize(f"{page_one}{PAGE_BREAK}{page_two}")
+
+    lines = strip_boilerplate(text).split("\n")
+
+    assert lines.count("Amra Hodžić - CV") == 1
+    # At the bottom of one page and the top of the next: content, not a header or footer
+    assert lines.count("- Python") == 2
@@ -0,0 +1,92 @@
+import threading
+import time
+from app.cv_cache import CVTextCache, content_key
+
+
+def loader(data: bytes, calls: list):
+    def download():
+        calls.append("download")
+        return data
+    return download
+
+
+def parser(calls: list):
+    def parse(data: bytes) -> str:
+        calls.append("parse")
+        return data.decode("utf-8").upper()
+    return parse
+
+
+def test_path_is_downloaded_and_parsed_once():
+    cache = CVTextCache(1024)
+    calls = []
+
+    first = cache.load("u/cv_1.pdf", loader(b"python", calls), parser(calls))
+    second = cache.load("u/cv_1.pdf", loader(b"python", calls), parser(calls))
+
+    assert first == second == "PYTHON"
+    assert calls == ["download", "parse"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_same_content_under_a_new_path_is_not_parsed_again():
+    cache = CVTextCache(1024)
+    calls = []
+    cache.load("u/cv_1.pdf", loader(b"python", calls), parser(calls))
+    cache.load("u/cv_2.pdf", loader(b"python", calls), parser(calls))
+    assert calls == ["download", "parse", "download"]
+
+
+def test_concurrent_loads_of_one_path_share_the_download():
+    cache = CVTextCache(1024)
+    calls = []
+
+    def slow_download():
+        calls.append("download")
+        time.sleep(0.05)
+        return b"python"
+
+    texts = []
+    threads = [
+        threading.Thread(target=lambda: texts.append(cache.load("u/cv.pdf", slow_download, parser(calls))))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert texts == ["PYTHON"] * 5
+    assert calls == ["download", "parse"]
+
+
+def test_least_recently_used_text_is_evicted_past_max_bytes():
+    cache = CVTextCache(max_bytes=10)
+    cache.put("a", b"a", "aaaa")
+    cache.put("b", b"b", "bbbb")
+    assert cache.get("a") == "aaaa"
+
+    cache.put("c", b"c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_text_larger_than_the_cache_is_not_kept():
+    cache = CVTextCache(max_bytes=4)
+    cache.put("a", b"a", "too long")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    CVTextCache(1024, str(tmp_path)).put("u/cv.pdf", b"python", "PYTHON")
+
+    restarted = CVTextCache(1024, str(tmp_path))
+    calls = []
+
+    assert restarted.load("u/cv.pdf", loader(b"python", calls), parser(calls)) == "PYTHON"
+    assert calls == []
+    assert (tmp_path / f"{content_key(b'python')}.txt").exists()
@@ -0,0 +1,108 @@
+import pytest
+from app import recommendations
+from app.fake_supabase import FakeSupabase
+from app.job_index import JobIndex
+
+
+def job(job_id: str, title: str, job_type: str = "IT", updated_at: str = "2026-01-01T00:00:00+00:00", **fields) -> dict:
+    return {"id": job_id, "title": title, "description": "", "job_type": job_type,
+            "created_at": updated_at, "updated_at": updated_at, **fields}
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase({
+        "jobs": [
+            job("1", "Python developer"),
+            job("2", "Java developer"),
+            job("3", "Računovođa", job_type="Finance"),
+            job("4", "Python i Django inženjer"),
+        ],
+        "users": [{"id": "u", "job_keywords": ["python"], "job_category": "IT"}],
+        "user_recommendations": [],
+    })
+
+
+@pytest.fixture
+def index(db, monkeypatch):
+    index = JobIndex()
+    index.refresh(db)
+    monkeypatch.setattr(recommendations, "job_index", index)
+    return index
+
+
+def resync(index: JobIndex, db) -> None:
+    index.last_synced = 0
+    index.refresh(db)
+
+
+def test_search_ranks_matches_and_pads_within_the_category(index):
+    ranked = index.search(["python"], "IT", k=3)
+    assert [job_id for job_id, _ in ranked[:2]] in (["1", "4"], ["4", "1"])
+    assert ranked[2] == ("2", 0.0)
+    assert [job_id for job_id, _ in index.search(["računovođa"], "finance")] == ["3"]
+
+
+def test_refresh_picks_up_edits_and_deletes(index, db):
+    changes = []
+    index.on_change(lambda job_id, old_category: changes.append((job_id, old_category)))
+    db.tables["jobs"][1].update(title="Python backend", job_type="Backend", updated_at="2026-02-01T00:00:00+00:00")
+    db.tables["jobs"].pop(0)
+    db.tables["jobs"].append(job("5", "Python junior", updated_at="2026-03-01T00:00:00+00:00"))
+
+    resync(index, db)
+
+    assert sorted(changes) == [("1", "it"), ("2", "it")]
+    assert index.category_of("1") is None
+    assert index.category_of("2") == "backend"
+    assert index.last_updated_at == "2026-03-01T00:00:00+00:00"
+    assert {job_id for job_id, score in index.search(["python"]) if score} == {"2", "4", "5"}
+
+
+def test_recommendations_are_stored_and_new_jobs_merged_without_a_full_search(index, db, monkeypatch):
+    ranked = recommendations.recommended(db, "u", ["python"], "IT")
+    assert {job_id for job_id, score in ranked if score} == {"1", "4"}
+    assert len(db.tables["user_recommendations"]) == 1
+
+    db.tables["jobs"].append(job("5", "Senior Python developer", updated_at="2026-02-01T00:00:00+00:00"))
+    resync(index, db)
+    monkeypatch.setattr(index, "search", lambda *args, **kwargs: pytest.fail("full search"))
+
+    ranked = recommendations.recommended(db, "u", ["python"], "IT")
+
+    assert "5" in [job_id for job_id, _ in ranked]
+    assert db.tables["user_recommendations"][0]["as_of"] == "2026-02-01T00:00:00+00:00"
+
+
+def test_deleted_or_moved_job_rebuilds_the_stored_list(index, db):
+    recommendations.recommended(db, "u", ["python"], "IT")
+    db.tables["jobs"].pop(0)
+    resync(index, db)
+
+    ranked = recommendations.recommended(db, "u", ["python"], "IT")
+
+    assert "1" not in [job_id for job_id, _ in ranked]
+    assert "1" not in [item["job_id"] for item in db.tables["user_recommendations"][0]["jobs"]]
+
+
+def test_old_rows_are_recomputed(index, db, monkeypatch):
+    recommendations.recommended(db, "u", ["python"], "IT")
+    db.tables["user_recommendations"][0]["updated_at"] = "2020-01-01T00:00:00+00:00"
+    searched = []
+    search = index.search
+    monkeypatch.setattr(index, "search", lambda *args, **kwargs: searched.append(1) or search(*args, **kwargs))
+
+    recommendations.recommended(db, "u", ["python"], "IT")
+
+    assert searched == [1]
+
+
+def test_job_change_updates_the_stored_lists_of_its_category(index, db):
+    recommendations.recommended(db, "u", ["python"], "IT")
+    edited = job("2", "Python developer", updated_at="2026-02-01T00:00:00+00:00")
+    index.upsert(edited)
+
+    assert recommendations.apply_job_change(db, "2", "it") == 1
+
+    stored = {item["job_id"]: item["score"] for item in db.tables["user_recommendations"][0]["jobs"]}
+    assert stored["2"] > 0
@@ -0,0 +1,178 @@
+import threading
+import time
+import pytest
+from app.job_queue import SQLiteJobQueue, WorkerPool, PermanentJobError, QUEUED, RUNNING, DONE, FAILED
+
+
+@pytest.fixture
+def queue():
+    return SQLiteJobQueue(":memory:")
+
+
+def run_one(pool: WorkerPool) -> dict:
+    """Claim and execute the next ready job on this thread, like a worker would."""
+    job = pool.queue.claim()
+    assert job is not None
+    pool._execute(job)
+    return pool.queue.get(job["id"])
+
+
+def make_ready(queue: SQLiteJobQueue, job_id: str) -> None:
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET run_at = 0 WHERE id = ?", (job_id,))
+
+
+def test_failed_job_is_retried_with_exponential_backoff(queue):
+    pool = WorkerPool(queue, provider_limits={}, backoff=10)
+    statuses = []
+    pool.register("flaky", lambda payload: 1 / 0, on_status=lambda payload, status, error: statuses.append(status))
+    job_id = pool.submit("flaky", {"n": 1})
+
+    delays = []
+    for attempt in range(1, 4):
+        started = time.time()
+        job = run_one(pool)
+        assert job["status"] == QUEUED
+        assert job["attempts"] == attempt
+        assert "ZeroDivisionError" in job["last_error"]
+        delays.append(job["run_at"] - started)
+        make_ready(queue, job_id)
+
+    # backoff * 2^(attempt - 1), with +-20% jitter
+    for attempt, delay in enumerate(delays, start=1):
+        expected = 10 * 2 ** (attempt - 1)
+        assert 0.8 * expected - 0.1 <= delay <= 1.2 * expected + 0.1
+    assert statuses == [RUNNING, QUEUED] * 3
+
+
+def test_job_fails_after_max_attempts(queue):
+    pool = WorkerPool(queue, provider_limits={}, backoff=0)
+    errors = []
+    pool.register("flaky", lambda payload: 1 / 0, on_status=lambda payload, status, error: errors.append((status, error)))
+    job_id = pool.submit("flaky", {})
+    max_attempts = queue.get(job_id)["max_attempts"]
+
+    for _ in range(max_attempts):
+        job = run_one(pool)
+    assert job["status"] == FAILED
+    assert job["attempts"] == max_attempts
+    assert queue.claim() is None
+    assert errors[-1][0] == FAILED and "ZeroDivisionError" in errors[-1][1]
+
+
+def test_permanent_error_is_not_retried(queue):
+    def handler(payload):
+        raise PermanentJobError("CV je prazan")
+
+    pool = WorkerPool(queue, provider_limits={}, backoff=0)
+    pool.register("analyze", handler)
+    pool.submit("analyze", {})
+
+    job = run_one(pool)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1
+    assert queue.claim() is None
+
+
+def test_job_succeeds_on_retry(queue):
+    calls = []
+
+    def handler(payload):
+        calls.append(payload)
+        if len(calls) < 2:
+            raise RuntimeError("timeout")
+
+    pool = WorkerPool(queue, provider_limits={}, backoff=0)
+    pool.register("analyze", handler)
+    job_id = pool.submit("analyze", {"analysis_id": "a1"})
+
+    assert run_one(pool)["status"] == QUEUED
+    make_ready(queue, job_id)
+    job = run_one(pool)
+    assert job["status"] == DONE
+    assert job["attempts"] == 2
+    assert calls == [{"analysis_id": "a1"}] * 2
+
+
+def test_unknown_kind_fails(queue):
+    pool = WorkerPool(queue, provider_limits={})
+    pool.submit("missing", {})
+    assert run_one(pool)["status"] == FAILED
+
+
+def test_claim_skips_excluded_providers_and_unclaim_restores_attempts(queue):
+    gemini = queue.enqueue("analyze", {"n": 1}, provider="gemini")
+    together = queue.enqueue("analyze", {"n": 2}, provider="together")
+
+    job = queue.claim(exclude_providers=["gemini"])
+    assert job["id"] == together
+    queue.unclaim(job["id"])
+    assert queue.get(together)["status"] == QUEUED
+    assert queue.get(together)["attempts"] == 0
+    assert queue.claim(exclude_providers=["together"])["id"] == gemini
+
+
+def test_provider_limits_cap_concurrent_jobs(queue):
+    lock = threading.Lock()
+    running = {"gemini": 0, "together": 0}
+    peak = {"gemini": 0, "together": 0}
+    done = threading.Event()
+    finished = []
+
+    def handler(payload):
+        provider = payload["provider"]
+        with lock:
+            running[provider] += 1
+            peak[provider] = max(peak[provider], running[provider])
+        time.sleep(0.05)
+        with lock:
+            running[provider] -= 1
+            finished.append(payload)
+            if len(finished) == 9:
+                done.set()
+
+    pool = WorkerPool(queue, workers=6, provider_limits={"gemini": 2, "together": 1}, poll_interval=0.01)
+    pool.register("analyze", handler)
+    for i in range(6):
+        pool.submit("analyze", {"provider": "gemini", "n": i}, provider="gemini")
+    for i in range(3):
+        pool.submit("analyze", {"provider": "together", "n": i}, provider="together")
+
+    pool.start()
+    try:
+        assert done.wait(10)
+    finally:
+        pool.stop()
+
+    assert peak == {"gemini": 2, "together": 1}
+    assert queue.counts() == {DONE: 9}
+
+
+def test_start_requeues_jobs_left_running(queue):
+    job_id = queue.enqueue("analyze", {})
+    queue.claim()
+    assert queue.get(job_id)["status"] == RUNNING
+
+    assert queue.requeue_running() == 1
+    assert queue.get(job_id)["status"] == QUEUED
+
+
+def test_recover_queues_only_pending_work_the_queue_lost(queue):
+    pool = WorkerPool(queue, provider_limits={})
+    rows = [{"analysis_id": "kept"}, {"analysis_id": "lost-1"}, {"analysis_id": "lost-2"}]
+    pool.register("analyze_cv", lambda payload: None, recover=lambda: [(row, "gemini") for row in rows])
+    pool.submit("analyze_cv", {"analysis_id": "kept"}, provider="gemini")
+
+    assert pool.recover() == 2
+    assert sorted(p["analysis_id"] for p in queue.pending("analyze_cv")) == ["kept", "lost-1", "lost-2"]
+    # Running it again (e.g. the next restart with the same disk) adds nothing
+    assert pool.recover() == 0
+
+
+def test_recover_failure_does_not_stop_the_pool(queue):
+    def recover():
+        raise ConnectionError("supabase nije dostupan")
+
+    pool = WorkerPool(queue, provider_limits={})
+    pool.register("analyze_cv", lambda payload: None, recover=recover)
+    assert pool.recover() == 0
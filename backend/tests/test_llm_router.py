@@ -0,0 +1,136 @@
+import asyncio
+import time
+from uuid import uuid4
+import pytest
+from app.llm_providers import Completion, LLMError, LLMProvider, LLMRouter, Usage, record_answers
+from app.metrics import LLM_TOKENS
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers "<name> answer" after delay, or fails; streams the answer in two chunks."""
+
+    def __init__(self, name: str, delay: float = 0, fail: bool = False, fail_mid_stream: bool = False,
+                 usage: Usage | None = None):
+        super().__init__(model=f"{name}-model")
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.fail_mid_stream = fail_mid_stream
+        self.usage = usage
+        self.calls = 0
+
+    def generate(self, prompt, schema=None, system=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return Completion(f"{self.name} answer", self.usage)
+
+    def stream(self, prompt, system=None, schema=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        yield f"{self.name} "
+        if self.fail_mid_stream:
+            raise RuntimeError(f"{self.name} cut off")
+        yield "answer"
+        if self.usage:
+            yield self.usage
+
+
+def prompt() -> str:
+    # The response cache is shared by the whole test run
+    return f"prompt {uuid4()}"
+
+
+def test_failover_answers_from_the_next_provider_without_caching_it():
+    primary, fallback = ScriptedProvider("primary", fail=True), ScriptedProvider("fallback")
+    router = LLMRouter([primary, fallback], hedge_after=5)
+    text = prompt()
+
+    with record_answers() as answers:
+        assert router.generate(text) == "fallback answer"
+    assert answers == ["fallback:fallback-model"]
+
+    primary.fail = False
+    assert router.generate(text) == "primary answer"
+    assert primary.calls == 2
+
+
+def test_primary_answer_is_cached():
+    primary = ScriptedProvider("primary")
+    router = LLMRouter([primary, ScriptedProvider("fallback")])
+    text = prompt()
+
+    assert router.generate(text) == router.generate(text) == "primary answer"
+    assert asyncio.run(router.agenerate(text)) == "primary answer"
+    assert primary.calls == 1
+
+
+def test_slow_primary_is_hedged():
+    router = LLMRouter([ScriptedProvider("slow", delay=1), ScriptedProvider("fast")], hedge_after=0.05)
+    started = time.perf_counter()
+    assert router.generate(prompt()) == "fast answer"
+    assert time.perf_counter() - started < 1
+
+    async def timed():
+        # Timed inside the loop: asyncio.run waits for the abandoned worker thread on exit
+        started = time.perf_counter()
+        assert await router.agenerate(prompt()) == "fast answer"
+        return time.perf_counter() - started
+
+    assert asyncio.run(timed()) < 1
+
+
+def test_every_provider_failing_raises():
+    router = LLMRouter([ScriptedProvider("a", fail=True), ScriptedProvider("b", fail=True)])
+    with pytest.raises(LLMError, match="a: a down; b: b down"):
+        router.generate(prompt())
+    with pytest.raises(LLMError):
+        list(router.stream(prompt()))
+
+
+def test_stream_hedges_a_slow_first_chunk_and_fails_over_before_it():
+    slow = LLMRouter([ScriptedProvider("slow", delay=1), ScriptedProvider("fast")], hedge_after=0.05)
+    started = time.perf_counter()
+    assert list(slow.stream(prompt())) == ["fast ", "answer"]
+    assert time.perf_counter() - started < 1
+
+    broken = LLMRouter([ScriptedProvider("broken", fail=True), ScriptedProvider("fallback")], hedge_after=5)
+    with record_answers() as answers:
+        assert "".join(broken.stream(prompt())) == "fallback answer"
+    assert answers == ["fallback:fallback-model"]
+
+
+def test_stream_error_after_the_first_chunk_is_raised():
+    router = LLMRouter([ScriptedProvider("cut", fail_mid_stream=True), ScriptedProvider("fallback")], hedge_after=5)
+    chunks = []
+    with pytest.raises(RuntimeError, match="cut off"):
+        for chunk in router.stream(prompt()):
+            chunks.append(chunk)
+    assert chunks == ["cut "]
+
+
+def test_streamed_primary_answer_is_cached_unless_rejected():
+    primary = ScriptedProvider("primary")
+    router = LLMRouter([primary])
+    kept, rejected = prompt(), prompt()
+
+    assert list(router.stream(kept)) == ["primary ", "answer"]
+    assert list(router.stream(kept)) == ["primary answer"]
+    list(router.stream(rejected, accept=lambda text: False))
+    list(router.stream(rejected))
+    assert primary.calls == 3
+
+
+def test_reported_usage_survives_the_thread_hop():
+    name = f"usage-{uuid4().hex[:8]}"
+    router = LLMRouter([ScriptedProvider(name, usage=Usage(70, 30))])
+
+    # The base agenerate runs generate in a worker thread
+    asyncio.run(router.agenerate(prompt(), variant="v"))
+    list(router.stream(prompt(), variant="v"))
+
+    assert LLM_TOKENS._values[(name, "v", "input")] == 140
+    assert LLM_TOKENS._values[(name, "v", "output")] == 60
@@ -72,7 +72,14 @@ export default function JobDescription() {
 
     try {
       const res = await fetch(`${API_BASE}/analyze-cv/${user.id}/${job.id}`, { method: "POST" })
-      
+
+      if (res.status === 429) {
+        const retryAfter = res.headers.get("Retry-After") || "nekoliko"
+        setAiLoading(false)
+        showError(`⏳ Previše analiza u toku. Pokušajte ponovo za ${retryAfter} s.`)
+        return
+      }
+
       if (!res.ok) {
         throw new Error('Greška pri pokretanju analize')
       }
@@ -80,37 +87,42 @@ export default function JobDescription() {
       const data = await res.json()
       const analysisId = data.analysis_id
 
-      // Simulate progress updates
-      const progressInterval = setInterval(() => {
-        setAnalysisProgress(prev => {
-          if (prev >= 90) return prev
-          return prev + Math.random() * 10
+      const stageProgress = { queued: 5, running: 10, downloading: 20, parsing: 35, generating: 50 }
+      let partial = ""
+      const events = new EventSource(`${API_BASE}/analysis-stream/${analysisId}`)
+
+      Object.entries(stageProgress).forEach(([stage, value]) => {
+        events.addEventListener(stage, () => {
+          if (stage === "generating") partial = ""
+          setAnalysisProgress(prev => Math.max(prev, value))
         })
-      }, 2000)
-
-      const checkInterval = setInterval(async () => {
-        try {
-          const check = await fetch(`${API_BASE}/get-analysis/${analysisId}`)
-          const result = await check.json()
-
-          if (result.analysis) {
-            setAiResult(result.analysis)
-            setAnalysisProgress(100)
-            clearInterval(checkInterval)
-            clearInterval(progressInterval)
-            setAiLoading(false)
-            showSuccess("✅ AI analiza je završena!")
-          }
-        } catch (error) {
-          console.error('Error checking analysis:', error)
-        }
-      }, 10000)
+      })
+
+      events.addEventListener("token", (e) => {
+        partial += JSON.parse(e.data).text
+        setAiResult(partial)
+        setAnalysisProgress(prev => Math.min(95, prev + 1))
+      })
+
+      events.addEventListener("done", (e) => {
+        const result = JSON.parse(e.data)
+        events.close()
+        setAiResult(result.analysis)
+        setAnalysisProgress(100)
+        setAiLoading(false)
+        showSuccess("✅ AI analiza je završena!")
+      })
+
+      events.addEventListener("failed", () => {
+        events.close()
+        setAiLoading(false)
+        showError("❌ AI analiza nije uspjela. Molimo pokušajte ponovo.")
+      })
 
       // Timeout after 5 minutes
       setTimeout(() => {
-        if (aiLoading) {
-          clearInterval(checkInterval)
-          clearInterval(progressInterval)
+        if (events.readyState !== EventSource.CLOSED) {
+          events.close()
           setAiLoading(false)
           showError("⏰ Analiza je predugo trajala. Molimo pokušajte ponovo.")
         }
@@ -47,7 +47,7 @@ export default function Profil() {
       }
 
       setUploadedPath(data.cv_url)
-      showSuccess("✅ CV uspješno uploadovan i analiziran!")
+      showSuccess("✅ CV uspješno uploadovan! Analiza profila je u toku i biće gotova za nekoliko trenutaka.")
     } catch (err) {
       console.error("❌ Upload greška:", err)
       showError("Greška pri slanju fajla.")
@@ -122,7 +122,7 @@ export default function Profil() {
       }}
     >
       <Navbar user={user} loading={loading} />
-      <LoadingSpinner loading={isAnalyzing} message="Analiziram CV..." />
+      <LoadingSpinner loading={isAnalyzing} message="Uploadujem CV..." />
       <Box sx={{ px: 3, py: 6, display: "flex", justifyContent: "center" }}>
         {loading ? (
           <CircularProgress sx={{ color: "#ff1a1a", mt: 8 }} />
@@ -295,13 +295,13 @@ export default function Profil() {
                         📄 Trenutni CV: {uploadedPath.split('/').pop()}
                       </Typography>
                       <Typography sx={{ color: "#aaa", fontSize: "0.9rem" }}>
-                        Vaš CV je uspješno uploadovan i analiziran. Možete ga pregledati ili uploadovati novi.
+                        Vaš CV je uspješno uploadovan. Možete ga pregledati ili uploadovati novi.
                       </Typography>
                     </Box>
 
                     <Input
                       type="file"
-                      inputProps={{ accept: ".pdf,.docx" }}
+                      inputProps={{ accept: ".pdf,.docx,.png,.jpg,.jpeg" }}
                       onChange={(e) => setCvFile(e.target.files[0])}
                       sx={{
                         mb: 3,
@@ -414,7 +414,7 @@ export default function Profil() {
                       textAlign: "center"
                     }}>
                       <Typography sx={{ color: "#ff4d4d", fontWeight: "600", mb: 2 }}>
-                        📎 Podržani formati: PDF, DOCX
+                        📎 Podržani formati: PDF, DOCX, PNG, JPG
                       </Typography>
                       <Typography sx={{ color: "#aaa", fontSize: "0.9rem" }}>
                         Maksimalna veličina: 10MB
@@ -423,7 +423,7 @@ export default function Profil() {
 
                     <Input
                       type="file"
-                      inputProps={{ accept: ".pdf,.docx" }}
+                      inputProps={{ accept: ".pdf,.docx,.png,.jpg,.jpeg" }}
                       onChange={(e) => setCvFile(e.target.files[0])}
                       sx={{
                         mb: 3,
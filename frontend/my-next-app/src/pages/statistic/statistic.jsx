@@ -41,6 +41,7 @@ import MarkdownViewer from "@/components/MarkdownViewer"
 
 export default function Statistic() {
   const { user, loading: userLoading } = useUser()
+  const API_BASE = process.env.NEXT_PUBLIC_API_BASE
   // Simple notification functions
   const showError = (message) => {
     console.error(message)
@@ -155,12 +156,20 @@ export default function Statistic() {
       if (user.role === "hr") {
         const { data: jobs } = await supabase.from("jobs").select("*").eq("user_id", realUserId)
 
+        // Counts and scores come from the backend aggregates; only the latest
+        // three applications per job are loaded for the preview
+        const res = await fetch(`${API_BASE}/statistics/by_hr/${realUserId}`)
+        const statistics = res.ok ? await res.json() : { jobs: [] }
+        const statsByJob = Object.fromEntries(statistics.jobs.map((item) => [item.job_id, item]))
+
         const stats = await Promise.all(
           (jobs || []).map(async (job) => {
             const { data: applications } = await supabase
               .from("application_analysis")
-              .select("id, analysis, user_id, score, created_at")
+              .select("id, user_id, score, created_at")
               .eq("job_id", job.id)
+              .order("created_at", { ascending: false })
+              .limit(3)
 
             const enriched = await Promise.all(
               (applications || []).map(async (app) => {
@@ -184,6 +193,7 @@ export default function Statistic() {
             return {
               ...job,
               applications: enriched,
+              stats: statsByJob[job.id] || { applications: 0, mean: null, max: null },
             }
           }),
         )
@@ -470,7 +480,7 @@ export default function Statistic() {
                       }}>
                         <Box sx={{ textAlign: "center" }}>
                           <Typography variant="h3" sx={{ color: "#00e6b8", fontWeight: "700", mb: 1 }}>
-                            {job.applications.length}
+                            {job.stats.applications}
                           </Typography>
                           <Typography sx={{ color: "#aaa", fontSize: "0.9rem" }}>
                             Ukupno prijava
@@ -478,10 +488,7 @@ export default function Statistic() {
                         </Box>
                         <Box sx={{ textAlign: "center" }}>
                           <Typography variant="h3" sx={{ color: "#f59e0b", fontWeight: "700", mb: 1 }}>
-                            {job.applications.length > 0 
-                              ? Math.round(job.applications.reduce((sum, app) => sum + app.score, 0) / job.applications.length * 10) / 10
-                              : 0
-                            }
+                            {job.stats.mean ?? 0}
                           </Typography>
                           <Typography sx={{ color: "#aaa", fontSize: "0.9rem" }}>
                             Prosječna ocjena
@@ -489,10 +496,7 @@ export default function Statistic() {
                         </Box>
                         <Box sx={{ textAlign: "center" }}>
                           <Typography variant="h3" sx={{ color: "#ef4444", fontWeight: "700", mb: 1 }}>
-                            {job.applications.length > 0 
-                              ? Math.max(...job.applications.map(app => app.score))
-                              : 0
-                            }
+                            {job.stats.max ?? 0}
                           </Typography>
                           <Typography sx={{ color: "#aaa", fontSize: "0.9rem" }}>
                             Najbolja ocjena
@@ -515,7 +519,7 @@ export default function Statistic() {
                       {job.applications.length > 0 && (
                         <Box>
                           <Typography variant="h6" sx={{ color: "#fff", mb: 2, fontWeight: "600" }}>
-                            👥 Poslednje prijave ({Math.min(3, job.applications.length)} od {job.applications.length})
+                            👥 Poslednje prijave ({job.applications.length} od {job.stats.applications})
                           </Typography>
                           <Box sx={{ display: "flex", gap: 2, flexWrap: "wrap" }}>
                             {job.applications
@@ -552,9 +556,9 @@ export default function Statistic() {
                                 </Paper>
                               ))}
                           </Box>
-                          {job.applications.length > 3 && (
+                          {job.stats.applications > 3 && (
                             <Typography sx={{ color: "#00e6b8", mt: 2, textAlign: "center", fontWeight: "500" }}>
-                              Klikni za pregled svih {job.applications.length} prijava →
+                              Klikni za pregled svih {job.stats.applications} prijava →
                             </Typography>
                           )}
                         </Box>
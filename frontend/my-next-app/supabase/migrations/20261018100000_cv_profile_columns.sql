@@ -0,0 +1,4 @@
+-- Seniority and skills returned by the single-call CV profiling stage
+alter table public.users
+  add column if not exists job_seniority text,
+  add column if not exists job_skills jsonb;
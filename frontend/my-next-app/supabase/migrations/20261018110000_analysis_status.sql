@@ -0,0 +1,11 @@
+-- Lifecycle of an analysis job: queued -> running -> done | failed
+alter table public.application_analysis
+  add column if not exists status text not null default 'queued',
+  add column if not exists error text;
+
+update public.application_analysis
+  set status = 'done'
+  where analysis is not null;
+
+create index if not exists application_analysis_status_idx
+  on public.application_analysis (status);
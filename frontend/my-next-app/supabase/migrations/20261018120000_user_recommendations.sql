@@ -0,0 +1,12 @@
+-- Materialized job recommendations, one row per user: top-N {job_id, score}
+-- for the keywords/category identified by profile_hash
+create table if not exists public.user_recommendations (
+  user_id uuid primary key references public.users (id) on delete cascade,
+  profile_hash text not null,
+  jobs jsonb not null default '[]'::jsonb,
+  as_of text,
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists users_job_category_idx
+  on public.users (job_category);
@@ -0,0 +1,8 @@
+-- Short projection of the analysis text for list views, plus the index behind
+-- the HR applications keyset pagination (score desc, id desc)
+alter table public.application_analysis
+  add column if not exists summary text
+  generated always as (left(analysis, 300)) stored;
+
+create index if not exists application_analysis_job_score_idx
+  on public.application_analysis (job_id, score desc nulls last, id desc);
@@ -0,0 +1,16 @@
+-- Structured analysis output: one column per section, so score and sections can
+-- be filtered and sorted without parsing the rendered text
+alter table public.application_analysis
+  add column if not exists competencies text,
+  add column if not exists experience text,
+  add column if not exists education text,
+  add column if not exists compatibility text,
+  add column if not exists strengths text[],
+  add column if not exists weaknesses text[],
+  add column if not exists recommendations text;
+
+alter table public.application_analysis
+  drop constraint if exists application_analysis_score_range;
+alter table public.application_analysis
+  add constraint application_analysis_score_range
+  check (score is null or score between 0 and 10) not valid;
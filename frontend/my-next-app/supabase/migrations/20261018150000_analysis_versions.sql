@@ -0,0 +1,8 @@
+-- What an analysis was computed from, so /analyze-cv can hand back an existing
+-- analysis of the same CV upload and job description instead of starting another
+alter table public.application_analysis
+  add column if not exists cv_version text,
+  add column if not exists job_version text;
+
+create index if not exists application_analysis_versions_idx
+  on public.application_analysis (user_id, job_id, cv_version, job_version);
@@ -0,0 +1,109 @@
+-- Running score aggregates per job, kept up to date by a trigger on every
+-- insert/update/delete of application_analysis, so the HR statistics read one
+-- row per job instead of every analysis. histogram[i] counts the scores equal
+-- to (i - 1) / 10, which is exact since scores are stored with one decimal.
+create table if not exists public.job_score_stats (
+  job_id uuid primary key references public.jobs (id) on delete cascade,
+  hr_id uuid,
+  category text,
+  applications integer not null default 0,
+  scored integer not null default 0,
+  failed integer not null default 0,
+  score_sum double precision not null default 0,
+  histogram integer[] not null default array_fill(0, array[101]),
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists job_score_stats_hr_idx
+  on public.job_score_stats (hr_id);
+
+create or replace function public.bump_job_score_stats(p_job_id uuid, p_sign integer, p_score numeric, p_status text)
+returns void
+language plpgsql
+as $$
+declare
+  slot integer := case when p_score is null then null
+                       else least(100, greatest(0, round(p_score * 10)))::integer + 1 end;
+begin
+  if p_job_id is null then
+    return;
+  end if;
+
+  insert into public.job_score_stats (job_id, hr_id, category)
+    select id, user_id, job_type from public.jobs where id = p_job_id
+    on conflict (job_id) do nothing;
+
+  update public.job_score_stats set
+    applications = applications + p_sign,
+    scored = scored + case when slot is null then 0 else p_sign end,
+    failed = failed + case when p_status = 'failed' then p_sign else 0 end,
+    score_sum = score_sum + coalesce(p_score, 0) * p_sign,
+    updated_at = now()
+  where job_id = p_job_id;
+
+  if slot is not null then
+    update public.job_score_stats set histogram[slot] = histogram[slot] + p_sign
+    where job_id = p_job_id;
+  end if;
+end;
+$$;
+
+create or replace function public.apply_job_score_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'UPDATE'
+     and old.job_id is not distinct from new.job_id
+     and old.score is not distinct from new.score
+     and (old.status = 'failed') is not distinct from (new.status = 'failed') then
+    -- queued -> running and text-only updates don't move any aggregate
+    return null;
+  end if;
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform public.bump_job_score_stats(old.job_id, -1, old.score, old.status);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform public.bump_job_score_stats(new.job_id, 1, new.score, new.status);
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists application_analysis_score_stats on public.application_analysis;
+create trigger application_analysis_score_stats
+  after insert or update of job_id, score, status or delete on public.application_analysis
+  for each row execute function public.apply_job_score_stats();
+
+-- Backfill from the analyses written so far
+insert into public.job_score_stats (job_id, hr_id, category, applications, scored, failed, score_sum, histogram)
+select
+  j.id,
+  j.user_id,
+  j.job_type,
+  count(a.id),
+  count(a.score),
+  count(a.id) filter (where a.status = 'failed'),
+  coalesce(sum(a.score), 0),
+  (
+    select array_agg(coalesce(h.n, 0) order by s.slot)
+    from generate_series(0, 100) as s (slot)
+    left join (
+      select least(100, greatest(0, round(score * 10)))::integer as slot, count(*)::integer as n
+      from public.application_analysis
+      where job_id = j.id and score is not null
+      group by 1
+    ) h using (slot)
+  )
+from public.jobs j
+left join public.application_analysis a on a.job_id = j.id
+group by j.id, j.user_id, j.job_type
+on conflict (job_id) do update set
+  hr_id = excluded.hr_id,
+  category = excluded.category,
+  applications = excluded.applications,
+  scored = excluded.scored,
+  failed = excluded.failed,
+  score_sum = excluded.score_sum,
+  histogram = excluded.histogram,
+  updated_at = now();
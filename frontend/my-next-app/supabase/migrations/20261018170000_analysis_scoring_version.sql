@@ -0,0 +1,9 @@
+-- Which prompt and model produced a score, so scores from different versions
+-- aren't compared and the re-scoring tool (app/rescore.py) can find stale rows
+alter table public.application_analysis
+  add column if not exists prompt_version text,
+  add column if not exists model_version text,
+  add column if not exists scored_at timestamptz;
+
+create index if not exists application_analysis_prompt_version_idx
+  on public.application_analysis (prompt_version);
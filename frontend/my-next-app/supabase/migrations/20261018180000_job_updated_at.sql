@@ -0,0 +1,23 @@
+-- jobs.updated_at, bumped by a trigger on every update, so the backend's job
+-- index and vectors sync edits incrementally instead of only rows with a newer
+-- created_at (deleted jobs are swept by comparing ids)
+alter table public.jobs
+  add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.touch_job_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists jobs_touch_updated_at on public.jobs;
+create trigger jobs_touch_updated_at
+  before update on public.jobs
+  for each row execute function public.touch_job_updated_at();
+
+create index if not exists jobs_updated_at_idx
+  on public.jobs (updated_at);
@@ -0,0 +1,15 @@
+-- The job_score_stats backfill bucketed scores without the trigger's clamp, so
+-- a score outside 0..10 was left out of the histogram. Rebuild the histograms
+-- the same way bump_job_score_stats buckets them.
+update public.job_score_stats s set
+  histogram = (
+    select array_agg(coalesce(h.n, 0) order by b.slot)
+    from generate_series(0, 100) as b (slot)
+    left join (
+      select least(100, greatest(0, round(score * 10)))::integer as slot, count(*)::integer as n
+      from public.application_analysis
+      where job_id = s.job_id and score is not null
+      group by 1
+    ) h using (slot)
+  ),
+  updated_at = now();